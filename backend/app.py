@@ -1,19 +1,46 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
 import os
 import secrets
-import smtplib
-from datetime import datetime, timedelta, timezone
-from email.message import EmailMessage
+import sys
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from functools import wraps
+from urllib.parse import urlencode
 
-from flask import Flask, jsonify, request, session, send_from_directory
+import click
+from flask import Blueprint, Flask, current_app, g, jsonify, request, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy import text
-from sqlalchemy import or_, func
+from sqlalchemy import and_, event, exists, literal, or_, func, select, union_all
 from dotenv import load_dotenv
 
+import assets
+import bulk
+import database
+import events
+import geo
+import mailer
+import matching
+import metrics
+import passwords
+import ratelimit
+import recommend
+import retention
+import search
+import serialization
+import stats
+import synthetic
+from migrations import MIGRATIONS
+from pricing import parse_price
+from sessions import Principal, PrincipalCache
+from cache import VersionedCache, make_backend
+
 
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_DIR = BASE_DIR.parent / "frontend"
@@ -23,19 +50,44 @@ DATA_DIR.mkdir(exist_ok=True)
 load_dotenv(BASE_DIR / ".env")
 
 
-app = Flask(__name__)
-app.config["SECRET_KEY"] = os.environ.get("EDUGLOW_SECRET_KEY", "dev-secret-key-change")
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DATA_DIR / 'eduglow.db'}"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SESSION_COOKIE_SAMESITE"] = "None"
-app.config["SESSION_COOKIE_SECURE"] = True
-app.config["SESSION_COOKIE_HTTPONLY"] = True
-
-CORS(app, supports_credentials=True, origins=["https://eduglow1512.netlify.app"])
-db = SQLAlchemy(app)
+db = SQLAlchemy(session_options={"class_": database.RoutingSession})
+# cli_group=None keeps the commands at `flask --app app <command>`.
+api = Blueprint("api", __name__, cli_group=None)
 
 APP_BASE_URL = os.environ.get("EDUGLOW_BASE_URL", "http://127.0.0.1:5000")
 
+DEFAULT_TEACHER_PRICE = "INR 500/hr"
+DEFAULT_TEACHER_IMAGE = "http://static.photos/people/200x200/10"
+TUTOR_PAGE_SIZE = 24
+TUTOR_PAGE_MAX = 100
+# sort key -> (catalog column, descending)
+TUTOR_SORTS = {
+    "rating": ("rating", True),
+    "price": ("price_amount", False),
+    "name": ("name", False),
+}
+# Sort key for tutors whose price could not be parsed ("Negotiable"): last, and never a null cursor.
+UNPRICED_SORT_AMOUNT = 1e12
+# default and largest /api/tutors/nearby radius, in km
+NEARBY_RADIUS_KM = 10.0
+NEARBY_RADIUS_MAX = 100.0
+TRIAL_PAGE_SIZE = 50
+TRIAL_PAGE_MAX = 200
+BOOKING_PAGE_SIZE = 20
+BOOKING_PAGE_MAX = 100
+TEACHER_DASHBOARD_FIELDS = ("profile", "skills", "bookings", "trials")
+STUDENT_DASHBOARD_FIELDS = ("profile", "trials")
+SSE_MAX_STREAMS = int(os.environ.get("EDUGLOW_SSE_MAX_STREAMS", "1000"))
+SSE_STREAM_SECONDS = float(os.environ.get("EDUGLOW_SSE_STREAM_SECONDS", "300"))
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("EDUGLOW_SSE_HEARTBEAT_SECONDS", "15"))
+# stats period -> (default buckets, max buckets, bucket width)
+STATS_WINDOWS = {"day": (30, 366, timedelta(days=1)), "week": (12, 104, timedelta(weeks=1))}
+SESSION_TTL = timedelta(days=int(os.environ.get("EDUGLOW_SESSION_DAYS", "7")))
+CATALOG_CACHE_CONTROL = os.environ.get("EDUGLOW_CATALOG_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+CATALOG_TUTOR = 0
+CATALOG_TEACHER = 1
+DEFAULT_TEACHER_PRICE_AMOUNT = parse_price(DEFAULT_TEACHER_PRICE)[0]
+
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,10 +98,25 @@ class User(db.Model):
     subject = db.Column(db.String(120), nullable=True)
     rating = db.Column(db.Float, nullable=True)
     price = db.Column(db.String(50), nullable=True)
+    price_amount = db.Column(db.Float, nullable=True)
+    currency = db.Column(db.String(3), nullable=True)
+    unit = db.Column(db.String(10), nullable=True)
     city = db.Column(db.String(80), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geo_cell = db.Column(db.Integer, nullable=True)
     image = db.Column(db.String(255), nullable=True)
+    profile_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def set_price(self, price):
+        self.price = price
+        self.price_amount, self.currency, self.unit = parse_price(price)
+
+    def set_location(self, latitude=None, longitude=None):
+        # Explicit coordinates win; otherwise the city centre, if the city is known.
+        self.latitude, self.longitude, self.geo_cell = geo.locate(self.city, latitude, longitude)
+
     def to_public(self):
         return {
             "id": self.id,
@@ -59,7 +126,12 @@ class User(db.Model):
             "subject": self.subject,
             "rating": self.rating,
             "price": self.price,
+            "price_amount": self.price_amount,
+            "currency": self.currency,
+            "unit": self.unit,
             "city": self.city,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
             "image": self.image,
         }
 
@@ -77,9 +149,29 @@ class Tutor(db.Model):
     level = db.Column(db.String(120), nullable=False)
     rating = db.Column(db.Float, nullable=False)
     price = db.Column(db.String(50), nullable=False)
+    price_amount = db.Column(db.Float, nullable=True)
+    currency = db.Column(db.String(3), nullable=True)
+    unit = db.Column(db.String(10), nullable=True)
     city = db.Column(db.String(80), nullable=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geo_cell = db.Column(db.Integer, nullable=True)
     image = db.Column(db.String(255), nullable=False)
 
+    def set_price(self, price):
+        self.price = price
+        self.price_amount, self.currency, self.unit = parse_price(price)
+
+    def set_location(self, latitude=None, longitude=None):
+        # Explicit coordinates win; otherwise the city centre, if the city is known.
+        self.latitude, self.longitude, self.geo_cell = geo.locate(self.city, latitude, longitude)
+
+
+class CatalogVersion(db.Model):
+    __tablename__ = "catalog_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+
 
 class TrialRequest(db.Model):
     __tablename__ = "trial_request"
@@ -91,6 +183,54 @@ class TrialRequest(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class MatchTerm(db.Model):
+    __tablename__ = "match_term"
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(120), unique=True, nullable=False)
+
+
+class TeacherTerm(db.Model):
+    __tablename__ = "teacher_term"
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey("match_term.id"), primary_key=True, index=True)
+
+
+class TrialMatch(db.Model):
+    __tablename__ = "trial_match"
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    trial_id = db.Column(db.Integer, db.ForeignKey("trial_request.id"), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (db.Index("ix_trial_match_teacher_created", "teacher_id", "created_at", "trial_id"),)
+
+
+class TeacherStat(db.Model):
+    __tablename__ = "teacher_stat"
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True)
+    metric = db.Column(db.String(40), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TeacherEvent(db.Model):
+    __tablename__ = "teacher_event"
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (db.Index("ix_teacher_event_teacher_id", "teacher_id", "id"),)
+
+
+class AuthSession(db.Model):
+    __tablename__ = "auth_session"
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+
+
 class PasswordResetToken(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -98,6 +238,24 @@ class PasswordResetToken(db.Model):
     expires_at = db.Column(db.DateTime, nullable=False)
 
 
+class OutboxEmail(db.Model):
+    __tablename__ = "email_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    text_body = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=mailer.STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim = db.Column(db.String(32), nullable=True, index=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index("ix_email_outbox_status_next", "status", "next_attempt_at"),)
+
+
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -109,15 +267,98 @@ class Booking(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+# Rows moved out of the hot tables by the retention janitor (retention.py).
+class TrialRequestArchive(db.Model):
+    __tablename__ = "trial_request_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(40), nullable=False)
+    subject = db.Column(db.String(120), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class TrialMatchArchive(db.Model):
+    __tablename__ = "trial_match_archive"
+    teacher_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    trial_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+class BookingArchive(db.Model):
+    __tablename__ = "booking_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, nullable=False, index=True)
+    teacher_id = db.Column(db.Integer, nullable=False, index=True)
+    subject = db.Column(db.String(120), nullable=True)
+    price = db.Column(db.String(50), nullable=True)
+    phone = db.Column(db.String(40), nullable=True)
+    status = db.Column(db.String(30), nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+event_broker = events.make_broker()
+principal_cache = PrincipalCache(ttl=int(os.environ.get("EDUGLOW_SESSION_CACHE_TTL", "300")))
+rate_limiter = ratelimit.RateLimiter.from_env()
+password_routes = ratelimit.ConcurrencyCap.from_env("password")
+email_routes = ratelimit.ConcurrencyCap.from_env("email")
+recommendations = recommend.CatalogIndex(default_rating=4.5, default_price=DEFAULT_TEACHER_PRICE_AMOUNT)
+
+
+def auth_session_query(sid):
+    return (
+        select(AuthSession.user_id, User.profile_version)
+        .join(User, User.id == AuthSession.user_id)
+        .where(AuthSession.id == sid, AuthSession.revoked_at.is_(None), AuthSession.expires_at > datetime.utcnow())
+    )
+
+
+def skills_query(teacher_id):
+    return select(TeacherSkill.name).where(TeacherSkill.teacher_id == teacher_id).order_by(TeacherSkill.id)
+
+
+def current_principal():
+    # One primary-key join validates the session, once per request; the profile snapshot comes from the cache.
+    if "checked_principal" not in g:
+        g.checked_principal = load_principal()
+    return g.checked_principal
+
+
+def load_principal():
+    sid = session.get("sid")
+    if not sid:
+        return None
+    row = db.session.execute(auth_session_query(sid)).first()
+    if row is None:
+        return None
+    user_id, version = row
+    principal = principal_cache.get(user_id, version)
+    if principal is None:
+        user = db.session.get(User, user_id)
+        skills = db.session.execute(skills_query(user_id)).scalars().all() if user.role == "teacher" else []
+        principal = Principal(user.to_public(), skills)
+        principal_cache.put(version, principal)
+    return principal
+
+
+def bump_profile_version(user_id):
+    User.query.filter_by(id=user_id).update({"profile_version": User.profile_version + 1})
+
+
 def login_required(role=None):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user_id = session.get("user_id")
-            if not user_id:
+            principal = current_principal()
+            if principal is None:
+                session.clear()
                 return jsonify({"error": "unauthorized"}), 401
-            if role and session.get("role") != role:
+            if role and principal.role != role:
                 return jsonify({"error": "forbidden"}), 403
+            g.principal = principal
             return fn(*args, **kwargs)
 
         return wrapper
@@ -125,45 +366,154 @@ def login_required(role=None):
     return decorator
 
 
-def ensure_schema():
-    with db.engine.begin() as conn:
-        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(trial_request)")).fetchall()]
-        if "user_id" not in columns:
-            conn.execute(text("ALTER TABLE trial_request ADD COLUMN user_id INTEGER"))
-        booking_columns = [row[1] for row in conn.execute(text("PRAGMA table_info(booking)")).fetchall()]
-        if booking_columns:
-            if "phone" not in booking_columns:
-                conn.execute(text("ALTER TABLE booking ADD COLUMN phone TEXT"))
+def request_email():
+    return ((request.get_json(silent=True) or {}).get("email") or "").strip().lower() or None
+
+
+def signed_in_user():
+    principal = current_principal()
+    return principal.id if principal else None
+
+
+def rate_limited(name, account=None):
+    """Spend a token of limit ``name`` per client IP, per ``account()`` key and per route; else 429."""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            rate_limiter.check(name, request.remote_addr, account() if account else None)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def concurrency_capped(cap):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with cap:
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def admin_required(fn):
+    # Operations endpoints take a bearer token, not a user session; unset means disabled.
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get("EDUGLOW_ADMIN_TOKEN")
+        if not token:
+            return jsonify({"error": "admin API disabled"}), 404
+        if not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return jsonify({"error": "unauthorized"}), 401
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def load_catalog_version():
+    return db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar() or 0
+
+
+catalog_cache = VersionedCache(
+    "catalog",
+    load_catalog_version,
+    make_backend(),
+    version_ttl=float(os.environ.get("EDUGLOW_CATALOG_VERSION_TTL", "2")),
+)
+
+
+def bump_catalog_version():
+    # Runs inside the caller's transaction so the version only moves when the data does;
+    # the cached version is dropped once that commits (see invalidate_catalog_on_commit).
+    db.session.execute(
+        CatalogVersion.__table__.update().where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1)
+    )
+    db.session.info["catalog_changed"] = True
+
+
+@event.listens_for(database.RoutingSession, "after_commit")
+def invalidate_catalog_on_commit(session):
+    # Invalidating before the commit would let a concurrent request re-read and cache the old version.
+    if session.info.pop("catalog_changed", False):
+        catalog_cache.invalidate()
+
+
+@event.listens_for(database.RoutingSession, "after_rollback")
+def forget_catalog_change(session):
+    session.info.pop("catalog_changed", None)
+
+
+def catalog_cached(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = catalog_cache.version()
+        key = f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+        etag = f"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            body = catalog_cache.get(version, key)
+            if body is None:
+                result = view(*args, **kwargs)
+                if not isinstance(result, current_app.response_class) or result.status_code != 200:
+                    return result
+                body = result.get_data()
+                catalog_cache.set(version, key, body)
+            response = current_app.response_class(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+        return response
+
+    return wrapper
+
+
+smtp_settings = mailer.SMTPSettings.from_env()
+# "thread" sends from each web worker; "external" leaves it to `flask --app app dispatch-email`.
+EMAIL_DISPATCH_MODE = os.environ.get("EDUGLOW_MAIL_DISPATCHER", "thread")
 
 
 def send_email(to_email, subject, text_body, html_body=None):
-    host = os.environ.get("EDUGLOW_SMTP_HOST")
-    port = int(os.environ.get("EDUGLOW_SMTP_PORT", "587"))
-    user = os.environ.get("EDUGLOW_SMTP_USER")
-    password = os.environ.get("EDUGLOW_SMTP_PASS")
-    from_email = os.environ.get("EDUGLOW_SMTP_FROM", user)
-    use_tls = os.environ.get("EDUGLOW_SMTP_TLS", "true").lower() in {"1", "true", "yes"}
-
-    if not host or not from_email:
+    # Queues the message in the current transaction; call notify_email_dispatcher() after commit.
+    if not smtp_settings.configured:
         raise RuntimeError("SMTP not configured")
+    mailer.enqueue(db.session, OutboxEmail.__table__, to_email, subject, text_body, html_body)
+
+
+def queue_notifications(recipients, subject, text_body):
+    # Best-effort notices: skipped entirely when SMTP is not configured.
+    if not smtp_settings.configured or not recipients:
+        return
+    mailer.enqueue_many(
+        db.session,
+        OutboxEmail.__table__,
+        [{"to_email": to_email, "subject": subject, "text_body": text_body} for to_email in recipients],
+    )
 
-    msg = EmailMessage()
-    msg["From"] = from_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.set_content(text_body)
-    if html_body:
-        msg.add_alternative(html_body, subtype="html")
 
-    with smtplib.SMTP(host, port) as server:
-        if use_tls:
-            server.starttls()
-        if user and password:
-            server.login(user, password)
-        server.send_message(msg)
+def notify_email_dispatcher():
+    if EMAIL_DISPATCH_MODE != "thread" or not smtp_settings.configured:
+        return
+    dispatcher = current_app.extensions["email_dispatcher"]
+    dispatcher.start()
+    dispatcher.wake()
+
+
+@api.before_app_request
+def start_email_dispatcher():
+    # Started on a worker's first request, like the janitor, so rows left pending or in
+    # backoff by a restart go out without waiting for the next enqueue.
+    dispatcher = current_app.extensions["email_dispatcher"]
+    if EMAIL_DISPATCH_MODE == "thread" and smtp_settings.configured and not dispatcher.running:
+        dispatcher.start()
 
 
 def seed_data():
+    seeded = False
     if Tutor.query.count() == 0:
         tutors = [
             Tutor(name="Priya Sharma", subject="Mathematics", level="Class 9-12", rating=4.9, price="INR 600/hr", city="Delhi", image="http://static.photos/people/200x200/1"),
@@ -173,20 +523,28 @@ def seed_data():
             Tutor(name="Sakshi Rao", subject="Computer Science", level="College", rating=4.8, price="INR 800/hr", city="Kolkata", image="http://static.photos/people/200x200/5"),
             Tutor(name="Vikram Patel", subject="Maths", level="Class 6-10", rating=4.5, price="INR 300/hr", city="Delhi", image="http://static.photos/people/200x200/6"),
         ]
+        for tutor in tutors:
+            tutor.set_price(tutor.price)
+            tutor.set_location()
         db.session.add_all(tutors)
+        db.session.flush()
+        for tutor in tutors:
+            search.index_tutor(db.session, tutor.id)
+        seeded = True
 
     if User.query.filter_by(email="teacher@example.com").first() is None:
         teacher = User(
             email="teacher@example.com",
-            password_hash=generate_password_hash("password123"),
+            password_hash=passwords.hash_password("password123"),
             role="teacher",
             name="John Doe",
             subject="Mathematics",
             rating=4.8,
-            price="INR 600/hr",
             city="Delhi",
             image="http://static.photos/people/200x200/10",
         )
+        teacher.set_price("INR 600/hr")
+        teacher.set_location()
         db.session.add(teacher)
         db.session.flush()
         skills = [
@@ -195,31 +553,195 @@ def seed_data():
             TeacherSkill(teacher_id=teacher.id, name="Trigonometry"),
         ]
         db.session.add_all(skills)
+        db.session.flush()
+        search.index_teacher(db.session, teacher.id)
+        matching.sync_teacher(db.session, teacher.id)
+        stats.refresh_teacher_trials(db.session, teacher.id)
+        seeded = True
 
     if User.query.filter_by(email="student@example.com").first() is None:
         student = User(
             email="student@example.com",
-            password_hash=generate_password_hash("password123"),
+            password_hash=passwords.hash_password("password123"),
             role="student",
             name="Student User",
         )
         db.session.add(student)
 
+    if seeded:
+        bump_catalog_version()
     db.session.commit()
 
 
-with app.app_context():
+def migrate_schema():
     db.create_all()
-    ensure_schema()
-    seed_data()
+    return database.migrate(db.engine, MIGRATIONS)
+
+
+@api.cli.command("migrate")
+def migrate_command():
+    """Create missing tables and apply pending schema migrations."""
+    applied = migrate_schema()
+    click.echo(f"applied migrations: {', '.join(map(str, applied)) or 'none'}")
 
 
-@app.get("/api/health")
+@api.cli.command("seed")
+def seed_command():
+    """Insert the demo tutors and accounts if they are missing."""
+    seed_data()
+    click.echo("seed data ok")
+
+
+@api.cli.command("generate-data")
+@click.option("--teachers", default=100_000, show_default=True)
+@click.option("--students", default=100_000, show_default=True)
+@click.option("--tutors", default=10_000, show_default=True)
+@click.option("--trials", default=1_000_000, show_default=True)
+@click.option("--bookings", default=1_000_000, show_default=True)
+@click.option("--skills-per-teacher", default=3, show_default=True)
+@click.option("--topics", "topic_count", default=5000, show_default=True, help="Trial subject vocabulary size.")
+@click.option("--seed", default=42, show_default=True)
+def generate_data_command(**options):
+    """Fill a migrated scratch database with reproducible synthetic data."""
+    synthetic.generate(db.engine, passwords.hash_password(synthetic.PASSWORD), progress=click.echo, **options)
+
+
+@api.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Recompute the teacher_stat rollups from bookings and trial matches."""
+    stats.rebuild(db.session)
+    db.session.commit()
+    click.echo("teacher stats rebuilt")
+
+
+@api.cli.command("export")
+@click.argument("name", type=click.Choice(sorted(bulk.EXPORTS)))
+@click.option("--format", "fmt", type=click.Choice(sorted(bulk.FORMATS)), default="ndjson", show_default=True)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-", help="File to write; stdout by default.")
+def export_command(name, fmt, output):
+    """Stream every trial, booking, tutor or teacher record as NDJSON or CSV."""
+    for chunk in bulk.export(db.engine, name, fmt):
+        output.write(chunk)
+
+
+@api.cli.command("import-tutors")
+@click.argument("source", type=click.File("rb"))
+@click.option("--format", "fmt", type=click.Choice(sorted(bulk.FORMATS)), default=None, help="Defaults to the file extension.")
+def import_tutors_command(source, fmt):
+    """Bulk-insert tutors from an NDJSON or CSV file ('-' for stdin)."""
+    fmt = fmt or ("csv" if source.name.endswith(".csv") else "ndjson")
+    result = import_tutors(source, fmt)
+    for error in result["errors"]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"inserted {result['inserted']} tutors, skipped {result['skipped']}")
+
+
+def import_tutors(stream, fmt):
+    # bulk bumps the version in every batch's transaction; drop this worker's cached
+    # version even when a later batch fails.
+    try:
+        return bulk.import_tutors(db.engine, stream, fmt)
+    finally:
+        catalog_cache.invalidate()
+
+
+@api.cli.command("dispatch-email")
+def dispatch_email_command():
+    """Drain the email outbox in the foreground."""
+    current_app.extensions["email_dispatcher"].run_forever()
+
+
+# "thread" runs the janitor in each web worker; "external" leaves it to `flask --app app janitor`.
+JANITOR_MODE = os.environ.get("EDUGLOW_JANITOR", "thread")
+
+
+@api.before_app_request
+def start_janitor():
+    # Started on a worker's first request, not in the factory: threads do not survive gunicorn's fork.
+    janitor = current_app.extensions["janitor"]
+    if JANITOR_MODE == "thread" and not janitor.running:
+        janitor.start()
+
+
+@api.cli.command("janitor")
+@click.option("--once", is_flag=True, help="Run one pass and exit.")
+@click.option(
+    "--enable-incremental-vacuum",
+    is_flag=True,
+    help="Convert an existing SQLite file to incremental auto-vacuum first (rewrites it under an exclusive lock).",
+)
+def janitor_command(once, enable_incremental_vacuum):
+    """Purge expired rows, archive old trials and bookings, and compact the database."""
+    janitor = current_app.extensions["janitor"]
+    if enable_incremental_vacuum:
+        enabled = retention.enable_incremental_vacuum(db.engine)
+        click.echo(f"incremental vacuum {'enabled' if enabled else 'not available'}")
+    if not once:
+        janitor.run_forever(delay=0)
+        return
+    for name, count in janitor.run_once().items():
+        click.echo(f"{name}: {count}")
+
+
+@api.app_errorhandler(passwords.HashingBusy)
+def hashing_busy(exc):
+    response = jsonify({"error": "server busy, please retry"})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(passwords.RETRY_AFTER)
+    return response
+
+
+@api.app_errorhandler(ratelimit.Busy)
+def route_busy(exc):
+    response = jsonify({"error": "server busy, please retry"})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@api.app_errorhandler(ratelimit.RateLimited)
+def rate_limit_exceeded(exc):
+    response = jsonify({"error": "too many requests, please retry later"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@api.get("/metrics")
+def metrics_endpoint():
+    token = os.environ.get("EDUGLOW_METRICS_TOKEN")
+    if token and not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "unauthorized"}), 401
+    return current_app.response_class(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@api.get("/api/admin/export/<name>")
+@admin_required
+def admin_export(name):
+    fmt = request.args.get("format", "ndjson")
+    if name not in bulk.EXPORTS or fmt not in bulk.FORMATS:
+        return jsonify({"error": f"export one of {','.join(sorted(bulk.EXPORTS))} as {' or '.join(sorted(bulk.FORMATS))}"}), 400
+    # Chunked: the generator holds its own connection, not the request's session.
+    response = current_app.response_class(bulk.export(db.engine, name, fmt), mimetype=bulk.FORMATS[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename={name}.{fmt}"
+    return response
+
+
+@api.post("/api/admin/import/tutors")
+@admin_required
+def admin_import_tutors():
+    fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    return jsonify(import_tutors(request.stream, fmt))
+
+
+@api.get("/api/health")
 def health():
     return jsonify({"status": "ok"})
 
 
-@app.post("/api/auth/register")
+@api.post("/api/auth/register")
+@rate_limited("register")
+@concurrency_capped(password_routes)
 def register():
     payload = request.get_json(silent=True) or {}
     email = (payload.get("email") or "").strip().lower()
@@ -235,48 +757,65 @@ def register():
 
     user = User(
         email=email,
-        password_hash=generate_password_hash(password),
+        password_hash=passwords.hash_password(password),
         role=role,
         name=name,
     )
     db.session.add(user)
+    if role == "teacher":
+        db.session.flush()
+        search.index_teacher(db.session, user.id)
+        bump_catalog_version()
     db.session.commit()
     return jsonify({"message": "registered", "user": user.to_public()})
 
 
-@app.post("/api/auth/login")
+@api.post("/api/auth/login")
+@rate_limited("login", account=request_email)
+@concurrency_capped(password_routes)
 def login():
     payload = request.get_json(silent=True) or {}
     email = (payload.get("email") or "").strip().lower()
     password = payload.get("password") or ""
     role = payload.get("role")
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not passwords.verify_password(user.password_hash, password):
         return jsonify({"error": "invalid credentials"}), 401
     if role and user.role != role:
         return jsonify({"error": "role mismatch"}), 403
+    if passwords.needs_rehash(user.password_hash):
+        user.password_hash = passwords.hash_password(password)
 
+    sid = secrets.token_urlsafe(32)
+    db.session.add(AuthSession(id=sid, user_id=user.id, expires_at=datetime.utcnow() + SESSION_TTL))
+    db.session.commit()
+    session.clear()
+    session["sid"] = sid
     session["user_id"] = user.id
     session["role"] = user.role
     return jsonify({"message": "logged_in", "user": user.to_public()})
 
 
-@app.post("/api/auth/logout")
+@api.post("/api/auth/logout")
 def logout():
+    sid = session.get("sid")
+    if sid:
+        AuthSession.query.filter_by(id=sid, revoked_at=None).update({"revoked_at": datetime.utcnow()})
+        db.session.commit()
     session.clear()
     return jsonify({"message": "logged_out"})
 
 
-@app.get("/api/me")
+@api.get("/api/me")
 @login_required()
+@database.read_replica
 def me():
-    user = db.session.get(User, session["user_id"])
-    if not user:
-        return jsonify({"error": "not found"}), 404
-    return jsonify({"user": user.to_public()})
+    return jsonify({"user": g.principal.user})
 
 
-@app.post("/api/auth/forgot")
+@api.post("/api/auth/forgot")
+@rate_limited("forgot", account=request_email)
+@concurrency_capped(email_routes)
 def forgot_password():
     payload = request.get_json(silent=True) or {}
     email = (payload.get("email") or "").strip().lower()
@@ -287,7 +826,6 @@ def forgot_password():
     expires_at = datetime.utcnow() + timedelta(hours=1)
     PasswordResetToken.query.filter_by(user_id=user.id).delete()
     db.session.add(PasswordResetToken(user_id=user.id, token=token, expires_at=expires_at))
-    db.session.commit()
     reset_link = f"{APP_BASE_URL}/reset/{token}"
     text_body = (
         "You requested a password reset for EduGlow.\n"
@@ -302,11 +840,16 @@ def forgot_password():
     try:
         send_email(user.email, "EduGlow password reset", text_body, html_body)
     except RuntimeError as exc:
+        db.session.rollback()
         return jsonify({"error": str(exc)}), 500
+    db.session.commit()
+    notify_email_dispatcher()
     return jsonify({"message": "reset_email_sent"})
 
 
-@app.post("/api/auth/reset")
+@api.post("/api/auth/reset")
+@rate_limited("reset")
+@concurrency_capped(password_routes)
 def reset_password():
     payload = request.get_json(silent=True) or {}
     token = payload.get("token") or ""
@@ -322,59 +865,300 @@ def reset_password():
     if not user:
         return jsonify({"error": "user not found"}), 404
 
-    user.password_hash = generate_password_hash(new_password)
+    user.password_hash = passwords.hash_password(new_password)
     db.session.delete(record)
+    AuthSession.query.filter(AuthSession.user_id == user.id, AuthSession.revoked_at.is_(None)).update(
+        {"revoked_at": datetime.utcnow()}
+    )
     db.session.commit()
     return jsonify({"message": "password_updated"})
 
 
-@app.get("/api/tutors")
-def list_tutors():
-    tutors = Tutor.query.all()
-    teachers = User.query.filter_by(role="teacher").all()
-    teacher_ids = [t.id for t in teachers]
+def catalog_arms():
+    tutor_columns = {
+        "name": Tutor.name,
+        "subject": Tutor.subject,
+        "level": Tutor.level,
+        "rating": Tutor.rating,
+        "price": Tutor.price,
+        "city": Tutor.city,
+        "image": Tutor.image,
+        "price_amount": Tutor.price_amount,
+    }
+    teacher_columns = {
+        "name": func.coalesce(User.name, "Teacher"),
+        "subject": func.coalesce(User.subject, "Subject"),
+        "level": literal(""),
+        "rating": func.coalesce(User.rating, 4.5),
+        "price": func.coalesce(User.price, DEFAULT_TEACHER_PRICE),
+        "city": func.coalesce(User.city, "City"),
+        "image": func.coalesce(User.image, DEFAULT_TEACHER_IMAGE),
+        "price_amount": func.coalesce(User.price_amount, DEFAULT_TEACHER_PRICE_AMOUNT),
+    }
+    return [
+        (CATALOG_TUTOR, Tutor, tutor_columns, []),
+        (CATALOG_TEACHER, User, teacher_columns, [User.role == "teacher"]),
+    ]
+
+
+def prefix_range(expr, prefix):
+    # Range form of LIKE 'prefix%' so the lower(...) expression indexes are usable.
+    # Trailing U+10FFFF has no successor; with nothing left the range is open-ended.
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return expr >= prefix
+    return and_(expr >= prefix, expr < stem[:-1] + chr(ord(stem[-1]) + 1))
+
+
+def subject_filter(kind, model, subject):
+    # Prefix of the subject, or for teachers of any skill, so "Algebra" finds a Mathematics teacher
+    # who lists it. Both sides are index ranges (ix_*_subject_lower, ix_teacher_skill_name_lower).
+    prefix = subject.lower()
+    matches = prefix_range(func.lower(model.subject), prefix)
+    if kind != CATALOG_TEACHER:
+        return matches
+    skilled = select(TeacherSkill.teacher_id).where(prefix_range(func.lower(TeacherSkill.name), prefix))
+    return or_(matches, model.id.in_(skilled))
+
+
+def keyset_after(key, descending, kind, id_column, cursor):
+    value, cursor_kind, cursor_id = cursor
+    past = key < value if descending else key > value
+    if kind > cursor_kind:
+        return or_(past, key == value)
+    if kind == cursor_kind:
+        return or_(past, and_(key == value, id_column > cursor_id))
+    return past
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size, key_type=(int, float, str)):
+    # [sort key, ..ids]: the key must be a key_type value, every other element an integer.
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    key = values[0]
+    if not isinstance(key, key_type) or isinstance(key, bool) or (isinstance(key, float) and not math.isfinite(key)):
+        return None
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in values[1:]):
+        return None
+    return values
+
+
+def tutor_page(filters, sort, cursor, limit):
+    column, descending = TUTOR_SORTS[sort]
+    arms = []
+    for kind, model, columns, where in catalog_arms():
+        if filters.get("skill") and kind == CATALOG_TUTOR:
+            continue
+        key = columns[column]
+        if column == "price_amount":
+            key = func.coalesce(key, UNPRICED_SORT_AMOUNT)
+        stmt = select(
+            literal(kind).label("kind"),
+            model.id.label("id"),
+            *[expr.label(name) for name, expr in columns.items()],
+            key.label("sort_key"),
+        ).where(*where)
+        if filters.get("subject"):
+            stmt = stmt.where(subject_filter(kind, model, filters["subject"]))
+        if filters.get("city"):
+            stmt = stmt.where(func.lower(model.city) == filters["city"].lower())
+        if filters.get("skill"):
+            stmt = stmt.where(
+                exists().where(
+                    TeacherSkill.teacher_id == User.id,
+                    func.lower(TeacherSkill.name) == filters["skill"].lower(),
+                )
+            )
+        if filters.get("min_rating") is not None:
+            stmt = stmt.where(columns["rating"] >= filters["min_rating"])
+        if filters.get("max_price") is not None:
+            stmt = stmt.where(columns["price_amount"] <= filters["max_price"])
+        if cursor:
+            stmt = stmt.where(keyset_after(key, descending, kind, model.id, cursor))
+        stmt = stmt.order_by(key.desc() if descending else key.asc(), model.id).limit(limit + 1)
+        arms.append(select(stmt.subquery()))
+
+    if not arms:
+        return [], None
+    catalog = (arms[0] if len(arms) == 1 else union_all(*arms)).subquery("catalog")
+    sort_column = catalog.c.sort_key
+    rows = db.session.execute(
+        select(catalog)
+        .order_by(sort_column.desc() if descending else sort_column.asc(), catalog.c.kind, catalog.c.id)
+        .limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.sort_key, last.kind, last.id])
+    return rows, next_cursor
+
+
+def catalog_rows(keys):
+    # Load catalog rows for [(kind, id), ...] and keep the caller's order.
+    wanted = {}
+    for kind, row_id in keys:
+        wanted.setdefault(kind, []).append(row_id)
+    found = {}
+    for kind, model, columns, where in catalog_arms():
+        if not wanted.get(kind):
+            continue
+        stmt = select(
+            literal(kind).label("kind"),
+            model.id.label("id"),
+            *[expr.label(name) for name, expr in columns.items()],
+        ).where(*where, model.id.in_(wanted[kind]))
+        for row in db.session.execute(stmt):
+            found[(row.kind, row.id)] = row
+    return [found[key] for key in keys if key in found]
+
+
+def serialize_catalog(rows):
+    teacher_ids = [row.id for row in rows if row.kind == CATALOG_TEACHER]
     skills_map = {}
     if teacher_ids:
-        rows = TeacherSkill.query.filter(TeacherSkill.teacher_id.in_(teacher_ids)).all()
-        for row in rows:
-            skills_map.setdefault(row.teacher_id, []).append(row.name)
-    return jsonify(
-        {
-            "tutors": (
-                [
-                    {
-                        "id": t.id,
-                        "name": t.name,
-                        "subject": t.subject,
-                        "level": t.level,
-                        "rating": t.rating,
-                        "price": t.price,
-                        "city": t.city,
-                        "image": t.image,
-                        "skills": [],
-                    }
-                    for t in tutors
-                ]
-                + [
-                    {
-                        "id": f"teacher-{t.id}",
-                        "name": t.name or "Teacher",
-                        "subject": t.subject or "Subject",
-                        "level": ", ".join(skills_map.get(t.id, [])) or "All levels",
-                        "rating": t.rating or 4.5,
-                        "price": t.price or "INR 500/hr",
-                        "city": t.city or "City",
-                        "image": t.image or "http://static.photos/people/200x200/10",
-                        "skills": skills_map.get(t.id, []),
-                    }
-                    for t in teachers
-                ]
-            )
-        }
-    )
+        skill_rows = db.session.execute(
+            select(TeacherSkill.teacher_id, TeacherSkill.name).where(TeacherSkill.teacher_id.in_(teacher_ids))
+        )
+        for teacher_id, name in skill_rows:
+            skills_map.setdefault(teacher_id, []).append(name)
+    tutors = []
+    for row in rows:
+        skills = skills_map.get(row.id, []) if row.kind == CATALOG_TEACHER else []
+        tutors.append(
+            {
+                "id": f"teacher-{row.id}" if row.kind == CATALOG_TEACHER else row.id,
+                "name": row.name,
+                "subject": row.subject,
+                "level": row.level if row.kind == CATALOG_TUTOR else (", ".join(skills) or "All levels"),
+                "rating": row.rating,
+                "price": row.price,
+                "price_amount": row.price_amount,
+                "city": row.city,
+                "image": row.image,
+                "skills": skills,
+            }
+        )
+    return tutors
 
 
-@app.post("/api/trials")
+@api.get("/api/tutors")
+@database.read_replica
+@catalog_cached
+def list_tutors():
+    args = request.args
+    filters = {name: (args.get(name) or "").strip() for name in ["subject", "city", "skill"]}
+    try:
+        filters["min_rating"] = float(args["min_rating"]) if args.get("min_rating") else None
+        filters["max_price"] = float(args["max_price"]) if args.get("max_price") else None
+        limit = min(max(int(args.get("limit", TUTOR_PAGE_SIZE)), 1), TUTOR_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "min_rating, max_price and limit must be numbers"}), 400
+    sort = args.get("sort") or "rating"
+    if sort not in TUTOR_SORTS:
+        return jsonify({"error": "invalid sort"}), 400
+    cursor = None
+    if args.get("cursor"):
+        cursor = decode_cursor(args["cursor"], 3, str if sort == "name" else (int, float))
+        if cursor is None or cursor[1] not in {CATALOG_TUTOR, CATALOG_TEACHER}:
+            return jsonify({"error": "invalid cursor"}), 400
+
+    rows, next_cursor = tutor_page(filters, sort, cursor, limit)
+    return jsonify({"tutors": serialize_catalog(rows), "next_cursor": next_cursor})
+
+
+@api.get("/api/tutors/search")
+@database.read_replica
+@catalog_cached
+def search_tutors():
+    query = (request.args.get("q") or "").strip()
+    try:
+        limit = min(max(int(request.args.get("limit", TUTOR_PAGE_SIZE)), 1), TUTOR_PAGE_MAX)
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be numbers"}), 400
+    if not query:
+        return jsonify({"error": "q required"}), 400
+    keys = search.search(db.session, query, limit, offset)
+    return jsonify({"tutors": serialize_catalog(catalog_rows(keys)), "query": query})
+
+
+def nearby_page(latitude, longitude, radius_km, subject, limit):
+    """The ``limit`` closest catalog entries within ``radius_km``, closest first.
+
+    Each arm probes the geo_cell index for the cells around the point and
+    ranks candidates by equirectangular distance, exact enough at city scale.
+    """
+    south, north, west, east = geo.bounding_box(latitude, longitude, radius_km)
+    ranges = geo.cell_ranges(latitude, longitude, radius_km)
+    lon_scale = geo.KM_PER_DEGREE * math.cos(math.radians(latitude))
+    arms = []
+    for kind, model, columns, where in catalog_arms():
+        north_km = (model.latitude - latitude) * geo.KM_PER_DEGREE
+        east_km = (model.longitude - longitude) * lon_scale
+        distance = north_km * north_km + east_km * east_km
+        stmt = select(
+            literal(kind).label("kind"),
+            model.id.label("id"),
+            *[expr.label(name) for name, expr in columns.items()],
+            model.latitude.label("latitude"),
+            model.longitude.label("longitude"),
+            distance.label("distance"),
+        ).where(
+            *where,
+            or_(*[model.geo_cell.between(first, last) for first, last in ranges]),
+            model.latitude.between(south, north),
+            model.longitude.between(west, east),
+            distance <= radius_km * radius_km,
+        )
+        if subject:
+            stmt = stmt.where(subject_filter(kind, model, subject))
+        stmt = stmt.order_by(distance, columns["rating"].desc(), model.id).limit(limit)
+        arms.append(select(stmt.subquery()))
+    nearby = union_all(*arms).subquery("nearby")
+    return db.session.execute(
+        select(nearby)
+        .order_by(nearby.c.distance, nearby.c.rating.desc(), nearby.c.kind, nearby.c.id)
+        .limit(limit)
+    ).all()
+
+
+@api.get("/api/tutors/nearby")
+@database.read_replica
+def nearby_tutors():
+    args = request.args
+    try:
+        latitude, longitude = geo.coordinates(args.get("lat"), args.get("lon"))
+    except ValueError:
+        return jsonify({"error": "lat and lon required, within -90..90 and -180..180"}), 400
+    try:
+        radius = float(args.get("radius", NEARBY_RADIUS_KM))
+        limit = min(max(int(args.get("limit", TUTOR_PAGE_SIZE)), 1), TUTOR_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "radius and limit must be numbers"}), 400
+    if not 0 < radius <= NEARBY_RADIUS_MAX:
+        return jsonify({"error": f"radius must be more than 0 and at most {NEARBY_RADIUS_MAX:g} km"}), 400
+
+    rows = nearby_page(latitude, longitude, radius, (args.get("subject") or "").strip(), limit)
+    tutors = serialize_catalog(rows)
+    for tutor, row in zip(tutors, rows):
+        tutor["distance_km"] = round(geo.distance_km(latitude, longitude, row.latitude, row.longitude), 2)
+    return jsonify({"tutors": tutors, "radius_km": radius})
+
+
+@api.post("/api/trials")
+@rate_limited("trials", account=signed_in_user)
 def create_trial():
     payload = request.get_json(silent=True) or {}
     name = payload.get("name")
@@ -385,19 +1169,38 @@ def create_trial():
     clean_phone = str(phone).replace(" ", "").replace("-", "").replace("+", "")
     if not clean_phone.isdigit():
         return jsonify({"error": "phone must be numeric"}), 400
+    principal = current_principal()
     trial = TrialRequest(
         name=name,
         phone=clean_phone,
         subject=subject,
-        user_id=session.get("user_id"),
+        user_id=principal.id if principal else None,
     )
     db.session.add(trial)
+    db.session.flush()
+    matching.match_trial(db.session, trial.id)
+    stats.record_trial_matches(db.session, trial.id, trial.created_at)
+    events.record_trial_matches(
+        db.session, trial.id, serialize_matched_trial(trial, principal.user["name"] if principal else None)
+    )
+    teachers = db.session.execute(
+        select(User.id, User.email).join(TrialMatch, TrialMatch.teacher_id == User.id).where(TrialMatch.trial_id == trial.id)
+    ).all()
+    queue_notifications(
+        [email for _, email in teachers],
+        "New EduGlow trial request",
+        f"A student has requested a trial class for {subject}.\n"
+        f"See the details on your dashboard: {APP_BASE_URL}/teacher-dashboard.html",
+    )
     db.session.commit()
+    notify_email_dispatcher()
+    event_broker.publish([teacher_id for teacher_id, _ in teachers])
     return jsonify({"message": "trial_submitted"})
 
 
-@app.post("/api/bookings")
+@api.post("/api/bookings")
 @login_required(role="student")
+@rate_limited("bookings", account=lambda: g.principal.id)
 def create_booking():
     payload = request.get_json(silent=True) or {}
     teacher_id = payload.get("teacher_id")
@@ -414,189 +1217,583 @@ def create_booking():
         return jsonify({"error": "teacher not found"}), 404
 
     booking = Booking(
-        student_id=session["user_id"],
+        student_id=g.principal.id,
         teacher_id=teacher.id,
         subject=subject or teacher.subject or "General",
         price=teacher.price or "INR 500/hr",
         phone=phone,
         status="requested",
+        created_at=datetime.utcnow(),
     )
     db.session.add(booking)
+    db.session.flush()
+    stats.record_booking(db.session, teacher.id, booking.status, booking.created_at)
+    events.record(
+        db.session, teacher.id, "booking", serialize_booking(booking, g.principal.user["name"], g.principal.user["email"])
+    )
+    queue_notifications(
+        [teacher.email],
+        "New EduGlow booking request",
+        f"You have a new booking request for {booking.subject}.\n"
+        f"Student phone: {phone}\n"
+        f"See the details on your dashboard: {APP_BASE_URL}/teacher-dashboard.html",
+    )
     db.session.commit()
+    notify_email_dispatcher()
+    event_broker.publish([teacher.id])
     return jsonify({"message": "booking_created", "booking_id": booking.id})
 
 
-@app.get("/api/teacher/bookings")
+def page_limit(name, default, maximum):
+    # Raises ValueError for non-numeric input; callers turn that into a 400.
+    return min(max(int(request.args.get(name, default)), 1), maximum)
+
+
+def decode_created_cursor(token):
+    cursor = decode_cursor(token, 2, str)
+    try:
+        return (datetime.fromisoformat(cursor[0]), cursor[1]) if cursor else None
+    except (TypeError, ValueError):
+        return None
+
+
+def created_before(created_column, id_column, cursor):
+    created_at, row_id = cursor
+    return or_(created_column < created_at, and_(created_column == created_at, id_column < row_id))
+
+
+def serialize_booking(booking, student_name, student_email):
+    return {
+        "id": booking.id,
+        "subject": booking.subject,
+        "price": booking.price,
+        "status": booking.status,
+        "created_at": f"{booking.created_at.isoformat()}Z",
+        "student_name": student_name or "Student",
+        "student_email": student_email or "",
+        "student_phone": booking.phone or "",
+    }
+
+
+def serialize_matched_trial(trial, student_name):
+    return {
+        "id": trial.id,
+        "subject": trial.subject,
+        "created_at": f"{trial.created_at.isoformat()}Z",
+        "student_name": student_name or trial.name,
+        "student_phone": trial.phone,
+    }
+
+
+BOOKING_COLUMNS = {
+    "id": Booking.id,
+    "subject": Booking.subject,
+    "price": Booking.price,
+    "status": Booking.status,
+    "created_at": serialization.timestamp_text(Booking.created_at),
+    "student_name": func.coalesce(User.name, "Student"),
+    "student_email": func.coalesce(User.email, ""),
+    "student_phone": func.coalesce(Booking.phone, ""),
+}
+MATCHED_TRIAL_COLUMNS = {
+    "id": TrialRequest.id,
+    "subject": TrialRequest.subject,
+    "created_at": serialization.timestamp_text(TrialRequest.created_at),
+    "student_name": func.coalesce(User.name, TrialRequest.name),
+    "student_phone": TrialRequest.phone,
+}
+STUDENT_TRIAL_COLUMNS = {
+    "id": TrialRequest.id,
+    "name": TrialRequest.name,
+    "phone": TrialRequest.phone,
+    "subject": TrialRequest.subject,
+    "created_at": serialization.timestamp_text(TrialRequest.created_at),
+}
+# Same objects as serialize_booking / serialize_matched_trial, built from projected rows.
+booking_row = serialization.row_serializer(BOOKING_COLUMNS)
+matched_trial_row = serialization.row_serializer(MATCHED_TRIAL_COLUMNS)
+student_trial_row = serialization.row_serializer(STUDENT_TRIAL_COLUMNS)
+
+
+def projected(columns):
+    return [expr.label(name) for name, expr in columns.items()]
+
+
+def booking_page_query(teacher_id, cursor=None, limit=None):
+    query = (
+        select(*projected(BOOKING_COLUMNS))
+        .select_from(Booking)
+        .outerjoin(User, User.id == Booking.student_id)
+        .where(Booking.teacher_id == teacher_id)
+    )
+    if cursor:
+        query = query.where(created_before(Booking.created_at, Booking.id, cursor))
+    query = query.order_by(Booking.created_at.desc(), Booking.id.desc())
+    if limit:
+        query = query.limit(limit + 1)
+    return query
+
+
+def booking_page_result(rows, limit):
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at, rows[-1].id])
+    return [booking_row(row) for row in rows], next_cursor
+
+
+def booking_page(teacher_id, cursor=None, limit=None):
+    """Newest bookings first with the student joined in; one statement."""
+    rows = db.session.execute(booking_page_query(teacher_id, cursor, limit)).all()
+    return booking_page_result(rows, limit)
+
+
+def matched_trial_page_query(teacher_id, cursor=None, limit=TRIAL_PAGE_SIZE):
+    query = (
+        select(
+            *projected(MATCHED_TRIAL_COLUMNS),
+            serialization.timestamp_text(TrialMatch.created_at).label("matched_at"),
+        )
+        .select_from(TrialRequest)
+        .join(TrialMatch, TrialMatch.trial_id == TrialRequest.id)
+        .outerjoin(User, User.id == TrialRequest.user_id)
+        .where(TrialMatch.teacher_id == teacher_id)
+    )
+    if cursor:
+        query = query.where(created_before(TrialMatch.created_at, TrialMatch.trial_id, cursor))
+    return query.order_by(TrialMatch.created_at.desc(), TrialMatch.trial_id.desc()).limit(limit + 1)
+
+
+def matched_trial_page_result(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].matched_at, rows[-1].id])
+    return [matched_trial_row(row) for row in rows], next_cursor
+
+
+def matched_trial_page(teacher_id, cursor=None, limit=TRIAL_PAGE_SIZE):
+    """Newest matched trial requests first with the student joined in; one statement."""
+    rows = db.session.execute(matched_trial_page_query(teacher_id, cursor, limit)).all()
+    return matched_trial_page_result(rows, limit)
+
+
+def student_trial_page_query(student_id, cursor=None, limit=None):
+    query = select(*projected(STUDENT_TRIAL_COLUMNS)).where(TrialRequest.user_id == student_id)
+    if cursor:
+        query = query.where(created_before(TrialRequest.created_at, TrialRequest.id, cursor))
+    query = query.order_by(TrialRequest.created_at.desc(), TrialRequest.id.desc())
+    if limit:
+        query = query.limit(limit + 1)
+    return query
+
+
+def student_trial_page_result(rows, limit):
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at, rows[-1].id])
+    return [student_trial_row(row) for row in rows], next_cursor
+
+
+def student_trial_page(student_id, cursor=None, limit=None):
+    rows = db.session.execute(student_trial_page_query(student_id, cursor, limit)).all()
+    return student_trial_page_result(rows, limit)
+
+
+def page_args(default, maximum, optional=False):
+    """(cursor, limit) from ?cursor=&limit=; raises ValueError with the message for a 400.
+
+    Optional pages return everything when neither is given, as before.
+    """
+    cursor = None
+    if request.args.get("cursor"):
+        cursor = decode_created_cursor(request.args["cursor"])
+        if cursor is None:
+            raise ValueError("invalid cursor")
+    if optional and "limit" not in request.args and not cursor:
+        return None, None
+    try:
+        return cursor, page_limit("limit", default, maximum)
+    except ValueError:
+        raise ValueError("limit must be a number") from None
+
+
+def teacher_dashboard_args():
+    fields = requested_fields(TEACHER_DASHBOARD_FIELDS)
+    if fields is None:
+        raise ValueError(f"fields must be a subset of {','.join(TEACHER_DASHBOARD_FIELDS)}")
+    try:
+        bookings_limit = page_limit("bookings_limit", BOOKING_PAGE_SIZE, BOOKING_PAGE_MAX)
+        trials_limit = page_limit("trials_limit", TRIAL_PAGE_SIZE, TRIAL_PAGE_MAX)
+    except ValueError:
+        raise ValueError("bookings_limit and trials_limit must be numbers") from None
+    return fields, bookings_limit, trials_limit
+
+
+def student_dashboard_args():
+    fields = requested_fields(STUDENT_DASHBOARD_FIELDS)
+    if fields is None:
+        raise ValueError(f"fields must be a subset of {','.join(STUDENT_DASHBOARD_FIELDS)}")
+    try:
+        trials_limit = page_limit("trials_limit", TRIAL_PAGE_SIZE, TRIAL_PAGE_MAX)
+    except ValueError:
+        raise ValueError("trials_limit must be a number") from None
+    return fields, trials_limit
+
+
+def requested_fields(available):
+    # ?fields=profile,trials narrows a dashboard response; None means an unknown field was asked for.
+    raw = request.args.get("fields")
+    if not raw:
+        return set(available)
+    fields = {name.strip() for name in raw.split(",") if name.strip()}
+    return fields if fields <= set(available) else None
+
+
+@api.get("/api/teacher/bookings")
 @login_required(role="teacher")
+@database.read_replica
 def teacher_bookings():
-    teacher_id = session["user_id"]
-    bookings = Booking.query.filter_by(teacher_id=teacher_id).order_by(Booking.created_at.desc()).all()
-    students = {u.id: u for u in User.query.filter(User.id.in_([b.student_id for b in bookings])).all()}
-    return jsonify(
-        {
-            "bookings": [
-                {
-                    "id": b.id,
-                    "subject": b.subject,
-                    "price": b.price,
-                    "status": b.status,
-                    "created_at": f"{b.created_at.isoformat()}Z",
-                    "student_name": students.get(b.student_id).name if students.get(b.student_id) else "Student",
-                    "student_email": students.get(b.student_id).email if students.get(b.student_id) else "",
-                    "student_phone": b.phone or "",
-                }
-                for b in bookings
-            ]
-        }
-    )
+    try:
+        cursor, limit = page_args(BOOKING_PAGE_SIZE, BOOKING_PAGE_MAX, optional=True)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    bookings, next_cursor = booking_page(g.principal.id, cursor, limit)
+    return jsonify({"bookings": bookings, "next_cursor": next_cursor})
 
 
-@app.get("/api/teacher/trials")
+@api.get("/api/teacher/trials")
 @login_required(role="teacher")
+@database.read_replica
 def teacher_trials():
-    teacher = db.session.get(User, session["user_id"])
-    skills = [s.name for s in TeacherSkill.query.filter_by(teacher_id=teacher.id).all()]
-    terms = []
-    if teacher.subject:
-        terms.append(teacher.subject)
-    terms.extend(skills)
-    terms = [t.strip() for t in terms if t and t.strip()]
-
-    if not terms:
-        return jsonify({"trials": []})
-
-    conditions = []
-    for term in terms:
-        like = f"%{term.lower()}%"
-        conditions.append(func.lower(TrialRequest.subject).like(like))
-
-    trials = TrialRequest.query.filter(or_(*conditions)).order_by(TrialRequest.created_at.desc()).all()
-    students = {u.id: u for u in User.query.filter(User.id.in_([t.user_id for t in trials if t.user_id])).all()}
-    return jsonify(
-        {
-            "trials": [
-                {
-                    "id": t.id,
-                    "subject": t.subject,
-                    "created_at": f"{t.created_at.isoformat()}Z",
-                    "student_name": students.get(t.user_id).name if students.get(t.user_id) else t.name,
-                    "student_phone": t.phone,
-                }
-                for t in trials
-            ]
-        }
+    try:
+        cursor, limit = page_args(TRIAL_PAGE_SIZE, TRIAL_PAGE_MAX)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    trials, next_cursor = matched_trial_page(g.principal.id, cursor, limit)
+    return jsonify({"trials": trials, "next_cursor": next_cursor})
+
+
+@api.get("/api/teacher/events")
+@login_required(role="teacher")
+def teacher_events():
+    # Streams hold no DB connection or request context while idle; run web workers
+    # with an async worker class (see gunicorn.conf.py) so they hold no thread either.
+    if event_broker.active() >= SSE_MAX_STREAMS:
+        return event_streams_busy()
+    try:
+        last_id = requested_event_id()
+    except ValueError:
+        return jsonify({"error": "invalid Last-Event-ID"}), 400
+    if last_id is None:
+        last_id = events.latest_id(db.session, g.principal.id)
+    body = events.stream(
+        db.engine, event_broker, g.principal.id, last_id, lifetime=SSE_STREAM_SECONDS, heartbeat=SSE_HEARTBEAT_SECONDS
+    )
+    return event_stream_response(body)
+
+
+def event_streams_busy():
+    response = jsonify({"error": "too many event streams, please retry"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+def requested_event_id():
+    # Browsers resend the last id they saw on reconnect; None means "from now on".
+    raw = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return int(raw) if raw else None
+
+
+def event_stream_response(body):
+    return current_app.response_class(
+        body, mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@app.get("/api/student/profile")
+
+@api.get("/api/teacher/dashboard")
+@login_required(role="teacher")
+@database.read_replica
+def teacher_dashboard():
+    try:
+        fields, bookings_limit, trials_limit = teacher_dashboard_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    payload = {}
+    if "profile" in fields:
+        payload["profile"] = g.principal.user
+    if "skills" in fields:
+        payload["skills"] = g.principal.skills
+    if "bookings" in fields:
+        payload["bookings"], payload["bookings_next_cursor"] = booking_page(g.principal.id, limit=bookings_limit)
+    if "trials" in fields:
+        payload["trials"], payload["trials_next_cursor"] = matched_trial_page(g.principal.id, limit=trials_limit)
+    return jsonify(payload)
+
+
+@api.get("/api/student/dashboard")
+@login_required(role="student")
+@database.read_replica
+def student_dashboard():
+    try:
+        fields, trials_limit = student_dashboard_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    payload = {}
+    if "profile" in fields:
+        payload["profile"] = g.principal.user
+    if "trials" in fields:
+        payload["trials"], payload["trials_next_cursor"] = student_trial_page(g.principal.id, limit=trials_limit)
+    return jsonify(payload)
+
+
+@api.get("/api/student/recommendations")
+@login_required(role="student")
+@database.read_replica
+def student_recommendations():
+    args = request.args
+    try:
+        limit = page_limit("limit", TUTOR_PAGE_SIZE, TUTOR_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if "lat" in args or "lon" in args:
+        try:
+            latitude, longitude = geo.coordinates(args.get("lat"), args.get("lon"))
+        except ValueError:
+            return jsonify({"error": "lat and lon must be given together, within -90..90 and -180..180"}), 400
+    else:
+        latitude, longitude = geo.centroid(g.principal.user.get("city")) or (None, None)
+    try:
+        recommendations.sync(db.session, catalog_cache.version())
+    except RuntimeError as exc:
+        return jsonify({"error": str(exc)}), 503
+    ranked = recommendations.recommend(db.session, g.principal.id, limit, latitude, longitude)
+    scores = {(kind, row_id): score for kind, row_id, score in ranked}
+    rows = catalog_rows(list(scores))
+    tutors = serialize_catalog(rows)
+    for tutor, row in zip(tutors, rows):
+        tutor["score"] = scores[(row.kind, row.id)]
+    return jsonify({"tutors": tutors})
+
+
+@api.get("/api/student/profile")
 @login_required(role="student")
+@database.read_replica
 def student_profile():
-    student = db.session.get(User, session["user_id"])
-    if not student:
-        return jsonify({"error": "not found"}), 404
-    return jsonify({"profile": student.to_public()})
+    return jsonify({"profile": g.principal.user})
 
 
-@app.get("/api/student/trials")
+@api.get("/api/student/trials")
 @login_required(role="student")
+@database.read_replica
 def student_trials():
-    student_id = session["user_id"]
-    trials = TrialRequest.query.filter_by(user_id=student_id).order_by(TrialRequest.created_at.desc()).all()
-    return jsonify(
-        {
-            "trials": [
-                {
-                    "id": t.id,
-                    "name": t.name,
-                    "phone": t.phone,
-                    "subject": t.subject,
-                    "created_at": f"{t.created_at.isoformat()}Z",
-                }
-                for t in trials
-            ]
-        }
-    )
+    try:
+        cursor, limit = page_args(TRIAL_PAGE_SIZE, TRIAL_PAGE_MAX, optional=True)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    trials, next_cursor = student_trial_page(g.principal.id, cursor, limit)
+    return jsonify({"trials": trials, "next_cursor": next_cursor})
 
 
-@app.get("/api/teacher/profile")
+@api.get("/api/teacher/profile")
 @login_required(role="teacher")
+@database.read_replica
 def teacher_profile():
-    teacher = db.session.get(User, session["user_id"])
-    skills = [s.name for s in TeacherSkill.query.filter_by(teacher_id=teacher.id).all()]
-    return jsonify({"profile": teacher.to_public(), "skills": skills})
+    return jsonify({"profile": g.principal.user, "skills": g.principal.skills})
 
 
-@app.put("/api/teacher/profile")
+@api.put("/api/teacher/profile")
 @login_required(role="teacher")
 def update_teacher_profile():
     payload = request.get_json(silent=True) or {}
-    teacher = db.session.get(User, session["user_id"])
-    for field in ["name", "subject", "price", "city", "image"]:
+    for field in ["name", "subject", "city", "image"]:
+        if payload.get(field) is not None and not isinstance(payload[field], str):
+            return jsonify({"error": f"{field} must be a string"}), 400
+    if ("latitude" in payload) != ("longitude" in payload):
+        return jsonify({"error": "latitude and longitude must be given together"}), 400
+    latitude, longitude = payload.get("latitude"), payload.get("longitude")
+    if latitude is not None or longitude is not None:
+        try:
+            latitude, longitude = geo.coordinates(latitude, longitude)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+    teacher = db.session.get(User, g.principal.id)
+    for field in ["name", "subject", "city", "image"]:
         if field in payload:
             setattr(teacher, field, payload[field])
+    if "price" in payload:
+        if payload["price"] is not None and not isinstance(payload["price"], (str, int, float)):
+            return jsonify({"error": "price must be a string or a number"}), 400
+        teacher.set_price(payload["price"])
     if "rating" in payload:
         try:
             teacher.rating = float(payload["rating"])
         except (TypeError, ValueError):
             return jsonify({"error": "rating must be a number"}), 400
+    if "city" in payload or "latitude" in payload:
+        teacher.set_location(latitude, longitude)
+    teacher.profile_version = User.profile_version + 1
+    db.session.flush()
+    search.index_teacher(db.session, teacher.id)
+    matching.sync_teacher(db.session, teacher.id)
+    stats.refresh_teacher_trials(db.session, teacher.id)
+    bump_catalog_version()
     db.session.commit()
     return jsonify({"message": "profile_updated", "profile": teacher.to_public()})
 
 
-@app.post("/api/teacher/skills")
+@api.post("/api/teacher/skills")
 @login_required(role="teacher")
 def add_skill():
     payload = request.get_json(silent=True) or {}
     name = (payload.get("name") or "").strip()
     if not name:
         return jsonify({"error": "skill name required"}), 400
-    teacher_id = session["user_id"]
+    teacher_id = g.principal.id
     existing = TeacherSkill.query.filter_by(teacher_id=teacher_id, name=name).first()
     if existing:
         return jsonify({"message": "skill_exists"})
     db.session.add(TeacherSkill(teacher_id=teacher_id, name=name))
+    bump_profile_version(teacher_id)
+    db.session.flush()
+    search.index_teacher(db.session, teacher_id)
+    matching.sync_teacher(db.session, teacher_id)
+    stats.refresh_teacher_trials(db.session, teacher_id)
+    bump_catalog_version()
     db.session.commit()
     return jsonify({"message": "skill_added", "skill": name})
 
 
-@app.delete("/api/teacher/skills")
+@api.delete("/api/teacher/skills")
 @login_required(role="teacher")
 def remove_skill():
     payload = request.get_json(silent=True) or {}
     name = (payload.get("name") or "").strip()
     if not name:
         return jsonify({"error": "skill name required"}), 400
-    teacher_id = session["user_id"]
+    teacher_id = g.principal.id
     deleted = TeacherSkill.query.filter_by(teacher_id=teacher_id, name=name).delete()
+    if deleted:
+        bump_profile_version(teacher_id)
+        search.index_teacher(db.session, teacher_id)
+        matching.sync_teacher(db.session, teacher_id)
+        stats.refresh_teacher_trials(db.session, teacher_id)
+        bump_catalog_version()
     db.session.commit()
     if not deleted:
         return jsonify({"error": "skill not found"}), 404
     return jsonify({"message": "skill_removed", "skill": name})
 
 
-@app.get("/api/teacher/stats")
+@api.get("/api/teacher/stats")
 @login_required(role="teacher")
+@database.read_replica
 def teacher_stats():
-    total_trials = TrialRequest.query.count()
-    return jsonify({"trials": total_trials})
+    period = request.args.get("period") or "day"
+    if period not in STATS_WINDOWS:
+        return jsonify({"error": f"period must be one of {','.join(STATS_WINDOWS)}"}), 400
+    default, maximum, step = STATS_WINDOWS[period]
+    try:
+        count = page_limit("buckets", default, maximum)
+    except ValueError:
+        return jsonify({"error": "buckets must be a number"}), 400
+    current = date.fromisoformat(stats.buckets(datetime.utcnow())[period])
+    labels = [(current - step * i).isoformat() for i in reversed(range(count))]
+    totals, by_bucket = stats.series(db.session, g.principal.id, period, labels[0])
+    prefix = f"{stats.BOOKINGS}_"
+    return jsonify(
+        {
+            "trials": totals.get(stats.TRIALS_MATCHED, 0),
+            "totals": {
+                "bookings": totals.get(stats.BOOKINGS, 0),
+                "bookings_by_status": {m[len(prefix):]: n for m, n in totals.items() if m.startswith(prefix)},
+                "trials_matched": totals.get(stats.TRIALS_MATCHED, 0),
+            },
+            "period": period,
+            "series": [
+                {
+                    "bucket": label,
+                    "bookings": by_bucket.get(label, {}).get(stats.BOOKINGS, 0),
+                    "trials_matched": by_bucket.get(label, {}).get(stats.TRIALS_MATCHED, 0),
+                }
+                for label in labels
+            ],
+        }
+    )
 
 
-@app.get("/reset/<token>")
+@api.get("/reset/<token>")
 def reset_page(token):
-    file_path = FRONTEND_DIR / "reset.html"
-    if file_path.exists():
-        return send_from_directory(FRONTEND_DIR, "reset.html")
-    return jsonify({"error": "reset page not found"}), 404
+    asset = current_app.extensions["assets"].get("reset.html")
+    if asset is None:
+        return jsonify({"error": "reset page not found"}), 404
+    return assets.respond(asset, request, current_app.response_class)
 
 
-@app.route("/", defaults={"path": "index.html"})
-@app.route("/<path:path>")
+@api.route("/", defaults={"path": "index.html"})
+@api.route("/<path:path>")
 def serve_frontend(path):
-    file_path = FRONTEND_DIR / path
-    if file_path.exists() and file_path.is_file():
-        return send_from_directory(FRONTEND_DIR, path)
-    return jsonify({"error": "not found"}), 404
+    # Answered from the startup manifest; no filesystem lookups per request.
+    asset = current_app.extensions["assets"].get(path)
+    if asset is None:
+        return jsonify({"error": "not found"}), 404
+    return assets.respond(asset, request, current_app.response_class)
+
+
+def create_app(config=None):
+    """Build the app without touching the database; schema and seed data come from `flask migrate` / `flask seed`."""
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = os.environ.get("EDUGLOW_SECRET_KEY", "dev-secret-key-change")
+    app.config["SQLALCHEMY_DATABASE_URI"] = database.database_url(f"sqlite:///{DATA_DIR / 'eduglow.db'}")
+    if database.replica_url():
+        app.config["SQLALCHEMY_BINDS"] = {
+            database.REPLICA_BIND: {"url": database.replica_url(), **database.engine_options(database.replica_url())}
+        }
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SESSION_COOKIE_SAMESITE"] = "None"
+    app.config["SESSION_COOKIE_SECURE"] = True
+    app.config["SESSION_COOKIE_HTTPONLY"] = True
+    app.config.update(config or {})
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", database.engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+    )
+
+    serialization.install(app)
+    # The Procfile deployment sits behind one platform router; set 0 when clients connect directly.
+    proxy_hops = int(os.environ.get("EDUGLOW_PROXY_HOPS", "1"))
+    if proxy_hops:
+        # Client IPs (for rate limits) come from X-Forwarded-For, set by this many trusted proxies.
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    CORS(app, supports_credentials=True, origins=["https://eduglow1512.netlify.app"])
+    app.extensions["assets"] = assets.AssetManifest(
+        FRONTEND_DIR, memory_limit=int(os.environ.get("EDUGLOW_ASSET_MEMORY_LIMIT", str(512 * 1024)))
+    ).build()
+    db.init_app(app)
+    app.register_blueprint(api)
+
+    with app.app_context():
+        # Engines connect lazily, so nothing here opens a connection before gunicorn forks.
+        database.install(db.engine)
+        if database.REPLICA_BIND in db.engines:
+            database.install(db.engines[database.REPLICA_BIND], read_only=True)
+        metrics.install(app, db.engines.values())
+        app.extensions["email_dispatcher"] = mailer.Dispatcher(
+            db.engine,
+            OutboxEmail.__table__,
+            mailer.SMTPPool(smtp_settings, size=int(os.environ.get("EDUGLOW_SMTP_POOL_SIZE", "2"))),
+            batch_size=int(os.environ.get("EDUGLOW_MAIL_BATCH", "20")),
+            max_attempts=int(os.environ.get("EDUGLOW_MAIL_MAX_ATTEMPTS", "5")),
+        )
+        app.extensions["janitor"] = retention.Janitor.from_env(db.engine)
+    return app
 
 
 if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        migrate_schema()
+        seed_data()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,285 @@
+"""ASGI entry point: ``uvicorn --factory asgi:create_asgi_app``.
+
+The read-heavy dashboard routes and the teacher event stream run on the
+event loop against an async engine (aiosqlite or asyncpg, picked from
+``EDUGLOW_DATABASE_URL``), so a request waiting on the database or an idle
+event stream is a parked coroutine rather than a blocked thread. They reuse
+the Flask app's query builders, argument parsing, session cookie, hooks and
+JSON, so responses are identical. Every other route (auth, writes, catalog,
+static files) is the unchanged Flask app behind a2wsgi, on a bounded thread pool.
+The WSGI deployment (``gunicorn "app:create_app()"``) is unaffected.
+"""
+
+import asyncio
+import os
+from functools import wraps
+from io import BytesIO
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import g, jsonify, session
+
+import app as web
+import database
+import events
+import metrics
+from sessions import Principal
+
+
+ROUTES = {}
+
+
+def route(path, role=None, replica=True):
+    """Register a native GET handler; it gets an ``AsyncSession`` and runs inside a Flask request context."""
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(server):
+            engine = server.read_engine if replica else server.engine
+            async with server.session_factory(bind=engine) as db_session:
+                if role is not None:
+                    principal = await current_principal(db_session)
+                    if principal is None:
+                        session.clear()
+                        return jsonify({"error": "unauthorized"}), 401
+                    if principal.role != role:
+                        return jsonify({"error": "forbidden"}), 403
+                    g.principal = principal
+                return await fn(server, db_session)
+
+        ROUTES[path] = wrapper
+        return wrapper
+
+    return decorator
+
+
+async def current_principal(db_session):
+    # Same checks and cache as app.current_principal.
+    sid = session.get("sid")
+    if not sid:
+        return None
+    row = (await db_session.execute(web.auth_session_query(sid))).first()
+    if row is None:
+        return None
+    user_id, version = row
+    principal = web.principal_cache.get(user_id, version)
+    if principal is None:
+        user = await db_session.get(web.User, user_id)
+        skills = (await db_session.execute(web.skills_query(user_id))).scalars().all() if user.role == "teacher" else []
+        principal = Principal(user.to_public(), list(skills))
+        web.principal_cache.put(version, principal)
+    return principal
+
+
+@route("/api/health")
+async def health(server, db_session):
+    return jsonify({"status": "ok"})
+
+
+@route("/api/teacher/bookings", role="teacher")
+async def teacher_bookings(server, db_session):
+    try:
+        cursor, limit = web.page_args(web.BOOKING_PAGE_SIZE, web.BOOKING_PAGE_MAX, optional=True)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    rows = (await db_session.execute(web.booking_page_query(g.principal.id, cursor, limit))).all()
+    bookings, next_cursor = web.booking_page_result(rows, limit)
+    return jsonify({"bookings": bookings, "next_cursor": next_cursor})
+
+
+@route("/api/teacher/trials", role="teacher")
+async def teacher_trials(server, db_session):
+    try:
+        cursor, limit = web.page_args(web.TRIAL_PAGE_SIZE, web.TRIAL_PAGE_MAX)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    rows = (await db_session.execute(web.matched_trial_page_query(g.principal.id, cursor, limit))).all()
+    trials, next_cursor = web.matched_trial_page_result(rows, limit)
+    return jsonify({"trials": trials, "next_cursor": next_cursor})
+
+
+@route("/api/teacher/dashboard", role="teacher")
+async def teacher_dashboard(server, db_session):
+    try:
+        fields, bookings_limit, trials_limit = web.teacher_dashboard_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    payload = {}
+    if "profile" in fields:
+        payload["profile"] = g.principal.user
+    if "skills" in fields:
+        payload["skills"] = g.principal.skills
+    if "bookings" in fields:
+        rows = (await db_session.execute(web.booking_page_query(g.principal.id, limit=bookings_limit))).all()
+        payload["bookings"], payload["bookings_next_cursor"] = web.booking_page_result(rows, bookings_limit)
+    if "trials" in fields:
+        rows = (await db_session.execute(web.matched_trial_page_query(g.principal.id, limit=trials_limit))).all()
+        payload["trials"], payload["trials_next_cursor"] = web.matched_trial_page_result(rows, trials_limit)
+    return jsonify(payload)
+
+
+@route("/api/student/trials", role="student")
+async def student_trials(server, db_session):
+    try:
+        cursor, limit = web.page_args(web.TRIAL_PAGE_SIZE, web.TRIAL_PAGE_MAX, optional=True)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    rows = (await db_session.execute(web.student_trial_page_query(g.principal.id, cursor, limit))).all()
+    trials, next_cursor = web.student_trial_page_result(rows, limit)
+    return jsonify({"trials": trials, "next_cursor": next_cursor})
+
+
+@route("/api/student/dashboard", role="student")
+async def student_dashboard(server, db_session):
+    try:
+        fields, trials_limit = web.student_dashboard_args()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    payload = {}
+    if "profile" in fields:
+        payload["profile"] = g.principal.user
+    if "trials" in fields:
+        rows = (await db_session.execute(web.student_trial_page_query(g.principal.id, limit=trials_limit))).all()
+        payload["trials"], payload["trials_next_cursor"] = web.student_trial_page_result(rows, trials_limit)
+    return jsonify(payload)
+
+
+@route("/api/teacher/events", role="teacher", replica=False)
+async def teacher_events(server, db_session):
+    if web.event_broker.active() >= web.SSE_MAX_STREAMS:
+        return web.event_streams_busy()
+    try:
+        last_id = web.requested_event_id()
+    except ValueError:
+        return jsonify({"error": "invalid Last-Event-ID"}), 400
+    if last_id is None:
+        last_id = await events.alatest_id(db_session, g.principal.id)
+    body = events.astream(
+        server.engine,
+        web.event_broker,
+        g.principal.id,
+        last_id,
+        lifetime=web.SSE_STREAM_SECONDS,
+        heartbeat=web.SSE_HEARTBEAT_SECONDS,
+    )
+    return web.event_stream_response(body)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def encode_headers(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+class AsgiServer:
+    def __init__(self, flask_app, threads=16):
+        self.flask_app = flask_app
+        # Request bodies, streamed responses and disconnects of the Flask routes are a2wsgi's job.
+        self.wsgi = WSGIMiddleware(flask_app, workers=threads)
+        self.engine = None
+        self.read_engine = None
+        self.session_factory = None
+
+    def startup(self):
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # Created per worker process, after gunicorn forks.
+        self.engine = database.async_engine(self.flask_app.config["SQLALCHEMY_DATABASE_URI"])
+        replica = database.replica_url()
+        self.read_engine = database.async_engine(replica, read_only=True) if replica else self.engine
+        for engine in {self.engine, self.read_engine}:
+            metrics.install_engine(engine.sync_engine)
+        self.session_factory = async_sessionmaker(expire_on_commit=False)
+
+    async def shutdown(self):
+        for engine in {self.engine, self.read_engine} - {None}:
+            await engine.dispose()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            handler = ROUTES.get(scope["path"]) if scope["method"] == "GET" else None
+            if handler is not None:
+                await self.call_native(handler, scope, receive, send)
+            else:
+                await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.startup()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def call_native(self, handler, scope, receive, send):
+        if self.session_factory is None:
+            self.startup()  # servers without lifespan support
+        environ = build_environ(scope, BytesIO(await read_body(receive)))
+        app = self.flask_app
+        # Flask's request globals are context variables, so each connection's task keeps its own.
+        ctx = app.request_context(environ)
+        ctx.push()
+        error = None
+        try:
+            response = app.preprocess_request()
+            if response is None:
+                response = await handler(self)
+            response = app.process_response(app.make_response(response))
+        except Exception as exc:
+            # As Flask's full_dispatch_request: HTTP errors and registered handlers first.
+            try:
+                response = app.process_response(app.make_response(app.handle_user_exception(exc)))
+            except Exception as unhandled:
+                error = unhandled
+                response = app.handle_exception(unhandled)
+        finally:
+            ctx.pop(error)
+        headers = encode_headers(response.headers.to_wsgi_list())
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        if hasattr(response.response, "__aiter__"):
+            await self.stream(response.response, receive, send)
+        else:
+            await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def stream(self, body, receive, send):
+        async def pump():
+            async for chunk in body:
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        # Whichever ends first: the stream's lifetime or the client going away.
+        tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await body.aclose()
+
+
+def create_asgi_app(config=None):
+    return AsgiServer(web.create_app(config), threads=int(os.environ.get("EDUGLOW_ASGI_THREADS", "16")))
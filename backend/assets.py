@@ -0,0 +1,136 @@
+"""In-memory manifest of the frontend's static files.
+
+Built once in ``create_app`` (before gunicorn forks, with ``--preload``):
+every file under frontend/ is hashed, CSS/JS get a fingerprinted name
+(``style.3f2a9c1b0d4e.css``) that HTML pages are rewritten to reference, and
+compressible files get gzip and, when the ``brotli`` package is installed,
+brotli variants. Requests are answered from the manifest without touching
+the filesystem; fingerprinted URLs are cached as immutable, everything else
+revalidates with an ETag.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from flask import send_file
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+FINGERPRINTED = {".css", ".js"}
+COMPRESSIBLE = {".css", ".js", ".html", ".json", ".svg", ".txt", ".xml"}
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+_REFERENCE_RE = re.compile(r'(\b(?:src|href)=")([^":?#]+\.(?:css|js))(")')
+
+
+class Asset:
+    def __init__(self, name, path, body, mimetype, digest, immutable=False):
+        self.name = name
+        self.path = path
+        self.mimetype = mimetype
+        self.digest = digest
+        self.immutable = immutable
+        # encoding -> bytes; None body means "too big, stream from disk".
+        self.variants = {"identity": body}
+
+    def fingerprinted_name(self):
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.digest}{ext}"
+
+    def pinned(self):
+        # Same bytes under the fingerprinted name, cacheable forever.
+        asset = Asset(self.fingerprinted_name(), self.path, None, self.mimetype, self.digest, immutable=True)
+        asset.variants = self.variants
+        return asset
+
+
+class AssetManifest:
+    def __init__(self, root, memory_limit=512 * 1024):
+        self.root = Path(root)
+        self.memory_limit = memory_limit
+        self.assets = {}
+
+    def build(self):
+        files = sorted(p for p in self.root.rglob("*") if p.is_file() and not p.name.startswith("."))
+        sources = {p.relative_to(self.root).as_posix(): p for p in files}
+        assets = {}
+        for name, path in sources.items():
+            if os.path.splitext(name)[1] != ".html":
+                assets[name] = self._load(name, path, path.read_bytes())
+        # Pages are loaded last so they can point at the fingerprinted names.
+        for name, path in sources.items():
+            if os.path.splitext(name)[1] == ".html":
+                assets[name] = self._load(name, path, self._rewrite(name, path.read_bytes(), assets))
+        for asset in list(assets.values()):
+            if os.path.splitext(asset.name)[1] in FINGERPRINTED:
+                pinned = asset.pinned()
+                assets[pinned.name] = pinned
+        self.assets = assets
+        return self
+
+    def _load(self, name, path, data):
+        ext = os.path.splitext(name)[1]
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(name, path, None, mimetype, hashlib.sha256(data).hexdigest()[:12])
+        if len(data) > self.memory_limit:
+            return asset
+        asset.variants["identity"] = data
+        if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                asset.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    asset.variants["br"] = compressed
+        return asset
+
+    def _rewrite(self, page, data, assets):
+        base = os.path.dirname(page)
+
+        def replace(match):
+            target = os.path.normpath(os.path.join(base, match.group(2))).replace(os.sep, "/")
+            asset = assets.get(target)
+            if asset is None:
+                return match.group(0)
+            # Absolute, so pages served from nested routes (/reset/<token>) still resolve.
+            return f"{match.group(1)}/{asset.fingerprinted_name()}{match.group(3)}"
+
+        return _REFERENCE_RE.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+    def get(self, name):
+        return self.assets.get(name)
+
+
+def pick_encoding(asset, accept_encodings):
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and accept_encodings[encoding]:
+            return encoding
+    return "identity"
+
+
+def respond(asset, request, response_class):
+    encoding = pick_encoding(asset, request.accept_encodings)
+    etag = asset.digest if encoding == "identity" else f"{asset.digest}-{encoding}"
+    body = asset.variants[encoding]
+    if request.if_none_match.contains(etag):
+        response = response_class(status=304)
+    elif body is None:
+        response = send_file(asset.path, mimetype=asset.mimetype, etag=False, conditional=False)
+    else:
+        response = response_class(body, mimetype=asset.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,373 @@
+"""Drive every /api route and report throughput and p50/p95/p99 latency.
+
+Point it at a scratch database filled by ``flask --app app generate-data``
+(the run writes trials, bookings, skills and users). Each scenario runs
+``--requests`` requests over ``--concurrency`` threads, either in-process
+through the Flask test client or over HTTP against a real gunicorn (WSGI)
+or uvicorn (ASGI, ``asgi.py``).
+
+    EDUGLOW_DATABASE_URL=sqlite:////tmp/load.db flask --app app migrate
+    EDUGLOW_DATABASE_URL=sqlite:////tmp/load.db flask --app app generate-data --teachers 20000 --trials 200000
+    python benchmarks/load_test.py --database-url sqlite:////tmp/load.db --target both --save-baseline local
+    python benchmarks/load_test.py --database-url sqlite:////tmp/load.db --compare local
+
+Baselines are JSON files in ``benchmarks/baselines/``. ``--compare`` exits
+non-zero when a scenario's p95 grows or its throughput drops by more than
+``--tolerance``.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "baselines")
+sys.path.insert(0, BACKEND_DIR)
+
+# Queue mail without ever sending it, whatever backend/.env says. Every request
+# comes from one IP, so per-IP rate limits would turn most of the run into 429s.
+LOAD_TEST_ENV = {
+    "EDUGLOW_SMTP_HOST": "smtp.invalid",
+    "EDUGLOW_SMTP_FROM": "load-test@example.test",
+    "EDUGLOW_MAIL_DISPATCHER": "external",
+    "EDUGLOW_RATE_LIMITS": "off",
+    "EDUGLOW_JANITOR": "external",
+}
+PASSWORD = "password123"
+EMAIL_DOMAIN = "synthetic.eduglow.test"
+
+
+class FlaskClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        return self.client.open(path, method=method, json=payload).status_code
+
+
+class HttpClient:
+    def __init__(self, port, timeout=30):
+        self.port = port
+        self.timeout = timeout
+        self.cookie = None
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        body = json.dumps(payload) if payload is not None else None
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.timeout)
+            raise
+        response.read()
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return response.status
+
+
+def login(client, email):
+    status = client.request("POST", "/api/auth/login", {"email": email, "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"login as {email} failed with {status}; did you run generate-data?")
+    return client
+
+
+class Scenario:
+    def __init__(self, name, method, path, role=None, payload=None, expect=(200,), setup=None, serial=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.role = role
+        self.payload = payload
+        self.expect = expect
+        self.setup = setup
+        # Scenarios sharing one account's state (reset tokens) run on a single thread.
+        self.serial = serial
+
+
+def scenarios(ctx):
+    counter = itertools.count()
+
+    def fresh_email():
+        return f"load-{os.getpid()}-{time.time_ns()}-{next(counter)}@example.test"
+
+    def teacher_id():
+        return random.choice(ctx["teacher_ids"])
+
+    return [
+        Scenario("health", "GET", "/api/health"),
+        Scenario("tutors", "GET", "/api/tutors"),
+        Scenario("tutors_filtered", "GET", lambda: f"/api/tutors?subject=Physics&city={random.choice(['Delhi', 'Pune'])}&sort=price"),
+        Scenario("tutors_price_range", "GET", "/api/tutors?min_rating=4.5&max_price=700&sort=price&limit=50"),
+        Scenario("tutors_search", "GET", lambda: f"/api/tutors/search?q={random.choice(['alg', 'physics', 'priya', 'calc'])}"),
+        Scenario("tutors_nearby", "GET", lambda: f"/api/tutors/nearby?lat={random.uniform(12.8, 28.7):.4f}&lon={random.uniform(72.8, 88.4):.4f}&radius=25"),
+        Scenario("register", "POST", "/api/auth/register", payload=lambda: {"email": fresh_email(), "password": PASSWORD}),
+        Scenario("login", "POST", "/api/auth/login", payload=lambda: {"email": random.choice(ctx["student_emails"]), "password": PASSWORD}),
+        Scenario("logout", "POST", "/api/auth/logout", setup=lambda client: login(client, random.choice(ctx["student_emails"]))),
+        Scenario("forgot", "POST", "/api/auth/forgot", payload=lambda: {"email": ctx["reset_email"]}),
+        Scenario("reset", "POST", "/api/auth/reset", payload=lambda: {"token": ctx["reset_token"](), "new_password": PASSWORD},
+                 setup=lambda client: (client.request("POST", "/api/auth/forgot", {"email": ctx["reset_email"]}), client)[1],
+                 serial=True),
+        Scenario("me", "GET", "/api/me", role="student"),
+        Scenario("student_profile", "GET", "/api/student/profile", role="student"),
+        Scenario("student_trials", "GET", "/api/student/trials", role="student"),
+        Scenario("student_dashboard", "GET", "/api/student/dashboard", role="student"),
+        Scenario("create_trial", "POST", "/api/trials", role="student",
+                 payload=lambda: {"name": "Load Test", "phone": "9000000000", "subject": random.choice(ctx["topics"])}),
+        Scenario("create_booking", "POST", "/api/bookings", role="student",
+                 payload=lambda: {"teacher_id": teacher_id(), "subject": "Mathematics", "phone": "9000000000"}),
+        Scenario("teacher_profile", "GET", "/api/teacher/profile", role="teacher"),
+        Scenario("teacher_trials", "GET", "/api/teacher/trials", role="teacher"),
+        Scenario("teacher_bookings", "GET", "/api/teacher/bookings", role="teacher"),
+        Scenario("teacher_stats", "GET", "/api/teacher/stats", role="teacher"),
+        Scenario("teacher_dashboard", "GET", "/api/teacher/dashboard", role="teacher"),
+        Scenario("update_teacher_profile", "PUT", "/api/teacher/profile", role="teacher",
+                 payload=lambda: {"city": random.choice(["Delhi", "Pune", "Jaipur"])}),
+        Scenario("add_skill", "POST", "/api/teacher/skills", role="teacher", payload=lambda: {"name": f"load skill {random.randrange(10 ** 6)}"}),
+        Scenario("remove_skill", "DELETE", "/api/teacher/skills", role="teacher", payload={"name": "no such skill"}, expect=(200, 404)),
+    ]
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def run_scenario(scenario, make_client, ctx, requests, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = itertools.count()
+    workers = 1 if scenario.serial else concurrency
+    ready = threading.Barrier(workers + 1)
+
+    def worker(index):
+        client = make_client()
+        try:
+            if scenario.role:
+                login(client, ctx[f"{scenario.role}_emails"][index % len(ctx[f"{scenario.role}_emails"])])
+        finally:
+            ready.wait()
+        while next(remaining) < requests:
+            if scenario.setup:
+                client = scenario.setup(make_client())
+            path = scenario.path() if callable(scenario.path) else scenario.path
+            payload = scenario.payload() if callable(scenario.payload) else scenario.payload
+            start = time.perf_counter()
+            try:
+                status = client.request(scenario.method, path, payload)
+            except (http.client.HTTPException, OSError):
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status not in scenario.expect:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()  # logins are not part of the measurement
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def load_context(database_url):
+    from sqlalchemy import create_engine, text
+
+    import synthetic
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        def emails(role):
+            return conn.execute(
+                text("SELECT email FROM \"user\" WHERE role = :role AND email LIKE :pattern ORDER BY id LIMIT 200"),
+                {"role": role, "pattern": f"%@{EMAIL_DOMAIN}"},
+            ).scalars().all()
+
+        students = emails("student")
+        teachers = emails("teacher")
+        teacher_ids = conn.execute(
+            text("SELECT id FROM \"user\" WHERE role = 'teacher' ORDER BY id LIMIT 1000")
+        ).scalars().all()
+    if len(students) < 2 or not teachers:
+        raise SystemExit("no synthetic users found; run `flask --app app generate-data` first")
+
+    reset_email = students.pop()  # resets revoke this user's sessions, so nobody else logs in as them
+
+    def reset_token():
+        with engine.connect() as conn:
+            return conn.execute(
+                text(
+                    "SELECT t.token FROM password_reset_token t JOIN \"user\" u ON u.id = t.user_id "
+                    "WHERE u.email = :email ORDER BY t.id DESC LIMIT 1"
+                ),
+                {"email": reset_email},
+            ).scalar() or "missing"
+
+    return {
+        "student_emails": students,
+        "teacher_emails": teachers,
+        "teacher_ids": teacher_ids,
+        "reset_email": reset_email,
+        "reset_token": reset_token,
+        "topics": synthetic.topics(500),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, workers, threads, worker_class="gthread", env=None):
+    port = free_port()
+    # gunicorn.conf.py reads the worker class from the environment to decide on monkey-patching.
+    env = dict(os.environ, EDUGLOW_DATABASE_URL=database_url, EDUGLOW_WORKER_CLASS=worker_class, **LOAD_TEST_ENV, **(env or {}))
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "--preload", "app:create_app()",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads),
+            "--worker-class", worker_class,
+            "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    return wait_until_healthy(process, port, "gunicorn")
+
+
+def start_uvicorn(database_url, workers, env=None):
+    port = free_port()
+    env = dict(os.environ, EDUGLOW_DATABASE_URL=database_url, **LOAD_TEST_ENV, **(env or {}))
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "--factory", "asgi:create_asgi_app",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    return wait_until_healthy(process, port, "uvicorn")
+
+
+def wait_until_healthy(process, port, name):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if HttpClient(port).request("GET", "/api/health") == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"{name} did not start")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {base['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {base['rps']:.1f} -> {result['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("EDUGLOW_DATABASE_URL"), required="EDUGLOW_DATABASE_URL" not in os.environ)
+    parser.add_argument("--target", choices=["flask", "gunicorn", "asgi", "both"], default="flask")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn or uvicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per gthread worker")
+    parser.add_argument("--worker-class", choices=["gthread", "gevent", "sync"], default="gthread")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    os.environ.update(LOAD_TEST_ENV, EDUGLOW_DATABASE_URL=args.database_url)
+    ctx = load_context(args.database_url)
+    selected = [s for s in scenarios(ctx) if not args.only or s.name in args.only.split(",")]
+    targets = ["flask", "gunicorn"] if args.target == "both" else [args.target]
+
+    results = {}
+    print(f"{'target':<9} {'scenario':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for target in targets:
+        process = None
+        if target == "flask":
+            from app import create_app
+
+            app = create_app()
+
+            def make_client():
+                return FlaskClient(app)
+        else:
+            if target == "asgi":
+                process, port = start_uvicorn(args.database_url, args.workers)
+            else:
+                process, port = start_gunicorn(args.database_url, args.workers, args.threads, args.worker_class)
+
+            def make_client():
+                return HttpClient(port)
+
+        try:
+            for scenario in selected:
+                result = run_scenario(scenario, make_client, ctx, args.requests, args.concurrency)
+                results[f"{target}:{scenario.name}"] = result
+                print(
+                    f"{target:<9} {scenario.name:<24} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} "
+                    f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['errors']:>7}"
+                )
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+        print(f"baseline saved to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
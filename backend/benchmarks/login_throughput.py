@@ -0,0 +1,122 @@
+"""Login throughput and tail latency under a concurrent burst.
+
+Runs each hashing mode in its own process against a scratch database and
+drives ``/api/auth/login`` from many threads while one thread keeps
+requesting ``/api/tutors`` to show how much the burst starves other routes.
+
+    python benchmarks/login_throughput.py --threads 16 --seconds 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def child(threads, seconds):
+    sys.path.insert(0, BACKEND_DIR)
+    from app import create_app, migrate_schema, seed_data
+
+    app = create_app()
+    with app.app_context():
+        migrate_schema()
+        seed_data()
+
+    latencies, busy, other = [], [0], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def login_loop():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = client.post(
+                "/api/auth/login", json={"email": "student@example.com", "password": "password123"}
+            ).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 503:
+                    busy[0] += 1
+                else:
+                    latencies.append(elapsed)
+
+    def catalog_loop():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            client.get("/api/tutors?limit=5", headers={"Cache-Control": "no-cache"})
+            other.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+    workers.append(threading.Thread(target=catalog_loop))
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(
+        json.dumps(
+            {
+                "logins_per_s": len(latencies) / seconds,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "rejected_503": busy[0],
+                "catalog_p99_ms": percentile(other, 99) * 1000,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--modes", default="inline,thread,process")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.threads, args.seconds)
+        return
+
+    print(f"{args.threads} login threads, {args.seconds:.0f}s, method {os.environ.get('EDUGLOW_PASSWORD_METHOD', 'default')}")
+    print(f"{'mode':<8} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6} {'catalog p99 ms':>15}")
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                EDUGLOW_HASH_EXECUTOR=mode,
+                EDUGLOW_DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                EDUGLOW_MAIL_DISPATCHER="external",
+                # Every login comes from one IP; this measures the hashing pool, not the rate limits.
+                EDUGLOW_RATE_LIMITS="off",
+            )
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", "--threads", str(args.threads), "--seconds", str(args.seconds)],
+                env=env,
+                cwd=BACKEND_DIR,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(
+            f"{mode:<8} {result['logins_per_s']:>9.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['rejected_503']:>6} {result['catalog_p99_ms']:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
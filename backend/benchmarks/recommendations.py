@@ -0,0 +1,151 @@
+"""Student recommendations: ``recommend.CatalogIndex`` vs. a per-row Python loop.
+
+Builds an in-memory catalog of ``--tutors`` entries (a quarter of them
+teachers with topic skills) from ``synthetic``'s subjects, topics and cities,
+then ranks it for ``--students`` random student profiles two ways:
+
+- python: score every entry in a Python loop, ``heapq.nlargest`` for the top k
+- numpy: ``CatalogIndex.top`` (array scoring + ``argpartition``)
+
+Both use the same weights and must return the same scores. It also reports the
+full build and the cost of an incremental refresh of one teacher.
+
+    python benchmarks/recommendations.py --tutors 100000
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def catalog(rng, count, synthetic, geo, recommend):
+    topic_names = synthetic.topics(240)
+    entries = []
+    for i in range(1, count + 1):
+        city = rng.choice(synthetic.CITIES)
+        latitude, longitude = geo.centroid(city)
+        latitude += rng.uniform(-0.13, 0.13)
+        longitude += rng.uniform(-0.13, 0.13)
+        subject = rng.choice(synthetic.SUBJECTS).lower()
+        kind = recommend.KIND_TEACHER if i % 4 == 0 else recommend.KIND_TUTOR
+        terms = [subject, *rng.sample(topic_names, 3)] if kind == recommend.KIND_TEACHER else [subject]
+        price = float(rng.randrange(300, 1500, 50))
+        entries.append((kind, i, round(rng.uniform(3.5, 5.0), 1), price, latitude, longitude, terms))
+    return entries, topic_names
+
+
+def students(rng, count, index, topic_names, synthetic, geo, recommend):
+    snapshot = index.snapshot
+    teachers = [entry_id for kind, entry_id in snapshot.positions if kind == recommend.KIND_TEACHER]
+    profiles = []
+    for _ in range(count):
+        trials = [rng.choice([*synthetic.SUBJECTS, *topic_names]) for _ in range(rng.randint(1, 6))]
+        bookings = [(rng.choice(teachers), rng.choice(synthetic.SUBJECTS), 600.0) for _ in range(rng.randint(0, 4))]
+        latitude, longitude = geo.centroid(rng.choice(synthetic.CITIES))
+        profiles.append((index.profile(trials, bookings, snapshot), latitude, longitude))
+    return profiles
+
+
+def python_top(entries, profile, limit, latitude, longitude, recommend, geo):
+    """The same score as ``CatalogIndex.scores``, one entry at a time."""
+    weights = recommend.WEIGHTS
+    total = sum(profile.terms.values())
+    booked = set(profile.booked_rows)
+    east_scale = geo.KM_PER_DEGREE * math.cos(math.radians(latitude))
+    reference = profile.reference_price
+    if reference is None:
+        prices = [entry[3] for entry in entries]
+        low, high = min(prices), max(prices)
+
+    def score(entry):
+        _, _, rating, price, lat, lon, term_ids = entry
+        interest = sum(profile.terms.get(term_id, 0.0) for term_id in term_ids) / total if total else 0.0
+        if reference:
+            fit = math.exp(-abs(math.log(price / reference)))
+        else:
+            fit = (high - price) / (high - low) if high > low else 1.0
+        north = (lat - latitude) * geo.KM_PER_DEGREE
+        east = (lon - longitude) * east_scale
+        return (
+            weights["interest"] * interest
+            + weights["rating"] * min(max((rating - 3.5) / 1.5, 0.0), 1.0)
+            + weights["price"] * fit
+            + weights["distance"] * math.exp(-math.hypot(north, east) / recommend.DISTANCE_SCALE_KM)
+        )
+
+    best = heapq.nlargest(
+        limit, ((score(entry), row) for row, entry in enumerate(entries) if row not in booked)
+    )
+    return [(entries[row][0], entries[row][1], round(value, 4)) for value, row in best]
+
+
+def timed(fn, runs):
+    samples, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, result
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tutors", type=int, default=100000)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    import geo
+    import recommend
+    import synthetic
+
+    if recommend.np is None:
+        raise SystemExit("numpy is not installed; pip install numpy")
+    rng = random.Random(args.seed)
+    entries, topic_names = catalog(rng, args.tutors, synthetic, geo, recommend)
+
+    index = recommend.CatalogIndex()
+    start = time.perf_counter()
+    index.upsert(entries)
+    build_ms = (time.perf_counter() - start) * 1000
+    snapshot = index.snapshot
+    # The Python path scores term ids too, so both sides skip the text matching.
+    rows = [(*entry[:6], snapshot.row_terms[row]) for row, entry in enumerate(entries)]
+    profiles = students(rng, args.students, index, topic_names, synthetic, geo, recommend)
+
+    python_ms, numpy_ms = [], []
+    for profile, latitude, longitude in profiles:
+        slow, expected = timed(lambda: python_top(rows, profile, args.limit, latitude, longitude, recommend, geo), 1)
+        fast, got = timed(lambda: index.top(profile, args.limit, latitude, longitude), 3)
+        # Ties may come back in either order; the scores must not.
+        if [entry[2] for entry in got] != [entry[2] for entry in expected]:
+            raise SystemExit(f"rankings differ: {got[:3]} vs {expected[:3]}")
+        python_ms.extend(slow)
+        numpy_ms.extend(fast)
+
+    teacher = next(entry for entry in reversed(entries) if entry[0] == recommend.KIND_TEACHER)
+    refresh_ms, _ = timed(lambda: index.upsert([(*teacher[:6], [*teacher[6], "chess openings"])]), 5)
+
+    print(f"catalog {len(snapshot)} entries, {len(snapshot.vocabulary)} terms; full build {build_ms:.0f} ms")
+    print(f"{'path':<8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, samples in [("python", python_ms), ("numpy", numpy_ms)]:
+        print(f"{label:<8} {statistics.median(samples):>8.2f} {percentile(samples, 0.99):>8.2f}")
+    print(f"one-teacher refresh: {statistics.median(refresh_ms):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""List endpoint serialization: ORM entities + stdlib JSON vs. projected rows + orjson.
+
+A scratch SQLite database gets one teacher with ``--rows`` bookings and
+``--rows`` matched trial requests, all from one student. For each list
+(teacher bookings, teacher trials, student trials) every path fetches all
+rows and encodes the response body:
+
+- orm+stdlib: full ORM entities, ``serialize_*`` per object, Flask's stdlib encoder
+- rows+stdlib: the projected page query and precomputed row serializer
+- rows+orjson: the same rows encoded by ``serialization.OrjsonProvider``
+
+It reports the median fetch+build and encode times, the per-row cost and
+the peak Python heap of one run.
+
+    python benchmarks/serialization.py --rows 10000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def populate(web, rows):
+    from sqlalchemy import text
+
+    teacher_id = web.db.session.execute(text("SELECT id FROM \"user\" WHERE role = 'teacher' ORDER BY id")).scalar()
+    student_id = web.db.session.execute(text("SELECT id FROM \"user\" WHERE role = 'student' ORDER BY id")).scalar()
+    start = datetime.utcnow() - timedelta(days=30)
+    stamps = [start + timedelta(seconds=7 * i, microseconds=i) for i in range(rows)]
+    web.db.session.execute(
+        text(
+            "INSERT INTO booking (student_id, teacher_id, subject, price, phone, status, created_at) "
+            "VALUES (:s, :t, 'Mathematics', 'INR 600/hr', '9876543210', 'requested', :c)"
+        ),
+        [{"s": student_id, "t": teacher_id, "c": stamp} for stamp in stamps],
+    )
+    web.db.session.execute(
+        text(
+            "INSERT INTO trial_request (name, phone, subject, user_id, created_at) "
+            "VALUES ('Student ' || :i, '9876543210', 'Physics', :s, :c)"
+        ),
+        [{"i": i, "s": student_id, "c": stamp} for i, stamp in enumerate(stamps)],
+    )
+    web.db.session.execute(
+        text(
+            "INSERT INTO trial_match (teacher_id, trial_id, created_at) "
+            "SELECT :t, id, created_at FROM trial_request WHERE user_id = :s"
+        ),
+        {"t": teacher_id, "s": student_id},
+    )
+    web.db.session.commit()
+    return teacher_id, student_id
+
+
+def orm_paths(web, teacher_id, student_id, rows):
+    from sqlalchemy import select
+
+    B, T, M, U = web.Booking, web.TrialRequest, web.TrialMatch, web.User
+
+    def bookings():
+        result = web.db.session.execute(
+            select(B, U.name, U.email)
+            .outerjoin(U, U.id == B.student_id)
+            .where(B.teacher_id == teacher_id)
+            .order_by(B.created_at.desc(), B.id.desc())
+        ).all()
+        return {"bookings": [web.serialize_booking(b, name, email) for b, name, email in result]}
+
+    def teacher_trials():
+        result = web.db.session.execute(
+            select(T, U.name)
+            .join(M, M.trial_id == T.id)
+            .outerjoin(U, U.id == T.user_id)
+            .where(M.teacher_id == teacher_id)
+            .order_by(M.created_at.desc(), M.trial_id.desc())
+            .limit(rows)
+        ).all()
+        return {"trials": [web.serialize_matched_trial(t, name) for t, name in result]}
+
+    def student_trials():
+        result = web.db.session.execute(
+            select(T).where(T.user_id == student_id).order_by(T.created_at.desc(), T.id.desc())
+        ).scalars().all()
+        return {
+            "trials": [
+                {"id": t.id, "name": t.name, "phone": t.phone, "subject": t.subject, "created_at": f"{t.created_at.isoformat()}Z"}
+                for t in result
+            ]
+        }
+
+    return {"teacher bookings": bookings, "teacher trials": teacher_trials, "student trials": student_trials}
+
+
+def row_paths(web, teacher_id, student_id, rows):
+    return {
+        "teacher bookings": lambda: {"bookings": web.booking_page(teacher_id)[0]},
+        "teacher trials": lambda: {"trials": web.matched_trial_page(teacher_id, limit=rows)[0]},
+        "student trials": lambda: {"trials": web.student_trial_page(student_id)[0]},
+    }
+
+
+def measure(app, build, encode, runs):
+    fetch_ms, encode_ms = [], []
+    for _ in range(runs):
+        with app.app_context():
+            start = time.perf_counter()
+            payload = build()
+            built = time.perf_counter()
+            body = encode(payload)
+            done = time.perf_counter()
+        fetch_ms.append((built - start) * 1000)
+        encode_ms.append((done - built) * 1000)
+    with app.app_context():
+        tracemalloc.start()
+        encode(build())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return statistics.median(fetch_ms), statistics.median(encode_ms), peak / 1024, len(body), len(next(iter(payload.values())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["EDUGLOW_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["EDUGLOW_JSON"] = "stdlib"
+        sys.path.insert(0, BACKEND_DIR)
+        import app as web
+        import serialization
+        from flask.json.provider import DefaultJSONProvider
+
+        if serialization.orjson is None:
+            raise SystemExit("orjson is not installed; pip install orjson")
+        app = web.create_app()
+        with app.app_context():
+            web.migrate_schema()
+            web.seed_data()
+            teacher_id, student_id = populate(web, args.rows)
+
+        stdlib = DefaultJSONProvider(app).response
+        fast = serialization.OrjsonProvider(app).response
+        paths = [
+            ("orm+stdlib", orm_paths(web, teacher_id, student_id, args.rows), stdlib),
+            ("rows+stdlib", row_paths(web, teacher_id, student_id, args.rows), stdlib),
+            ("rows+orjson", row_paths(web, teacher_id, student_id, args.rows), fast),
+        ]
+        print(f"{'list':<17} {'path':<12} {'rows':>6} {'fetch ms':>9} {'encode ms':>10} {'total ms':>9} {'us/row':>7} {'peak KB':>8} {'body KB':>8}")
+        for name in ["teacher bookings", "teacher trials", "student trials"]:
+            for label, builders, encoder in paths:
+                fetch, encode, peak, size, count = measure(
+                    app, builders[name], lambda payload: encoder(payload).get_data(), args.runs
+                )
+                total = fetch + encode
+                print(
+                    f"{name:<17} {label:<12} {count:>6} {fetch:>9.1f} {encode:>10.1f} {total:>9.1f} "
+                    f"{total * 1000 / max(count, 1):>7.1f} {peak:>8.0f} {size / 1024:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Compare WSGI (gunicorn gthread, gunicorn gevent) and ASGI (uvicorn) serving side by side.
+
+For each mode one worker process is started against the same database.
+``--streams`` teacher event streams are opened and left idle, then:
+
+- held: how many streams the worker actually serves (the rest wait in the
+  accept queue)
+- KB/conn: growth of the server's resident memory (worker, master and
+  helper processes) per held stream
+- a ``--requests`` burst of teacher dashboard requests at
+  ``--concurrency`` while the streams stay open (req/s, p50, p99, errors)
+- fan-out: time until one new booking reaches every held stream
+
+    EDUGLOW_DATABASE_URL=sqlite:////tmp/load.db flask --app app migrate
+    EDUGLOW_DATABASE_URL=sqlite:////tmp/load.db flask --app app generate-data --teachers 2000 --trials 20000
+    python benchmarks/serving_modes.py --database-url sqlite:////tmp/load.db --streams 1000
+"""
+
+import argparse
+import http.client
+import itertools
+import os
+import resource
+import select
+import socket
+import sys
+import threading
+import time
+
+from load_test import HttpClient, load_context, login, percentile, start_gunicorn, start_uvicorn
+
+MODES = ("gthread", "gevent", "asgi")
+
+
+def process_tree(pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as fh:
+                    ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(children.get(current, []))
+    return pids
+
+
+def rss_kb(pid):
+    total = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as fh:
+                total += next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+def open_streams(port, cookie, count, settle):
+    streams = []
+    request = f"GET /api/teacher/events HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n\r\n".encode()
+    for _ in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(request)
+        streams.append(sock)
+    # A stream is held once the server has answered it; queued ones stay silent.
+    held, deadline = set(), time.monotonic() + settle
+    while time.monotonic() < deadline and len(held) < count:
+        ready, _, _ = select.select([s for s in streams if s not in held], [], [], 0.2)
+        for sock in ready:
+            if sock.recv(65536):
+                held.add(sock)
+    return streams, held
+
+
+def burst(port, cookie, requests, concurrency, timeout):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker():
+        client = HttpClient(port, timeout=timeout)
+        client.cookie = cookie
+        while next(remaining) < requests:
+            start = time.perf_counter()
+            try:
+                status = client.request("GET", "/api/teacher/dashboard")
+            except (http.client.HTTPException, OSError):
+                status = None
+            with lock:
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": errors[0],
+    }
+
+
+def fan_out(streams, client, teacher_id, timeout):
+    started = time.perf_counter()
+    try:
+        client.request("POST", "/api/bookings", {"teacher_id": teacher_id, "subject": "Fan-out", "phone": "9000000000"})
+    except (http.client.HTTPException, OSError):
+        return None
+    pending, deadline = set(streams), time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        ready, _, _ = select.select(list(pending), [], [], 0.2)
+        for sock in ready:
+            if b"Fan-out" in sock.recv(65536):
+                pending.discard(sock)
+    return (time.perf_counter() - started) * 1000 if not pending else None
+
+
+def run_mode(mode, args, ctx, teacher_email, teacher_id):
+    env = {"EDUGLOW_SSE_MAX_STREAMS": str(args.streams * 2)}
+    if mode == "asgi":
+        process, port = start_uvicorn(args.database_url, 1, env=env)
+    else:
+        process, port = start_gunicorn(args.database_url, 1, args.threads, mode, env=env)
+    streams = []
+    try:
+        teacher = login(HttpClient(port), teacher_email)
+        student = login(HttpClient(port), ctx["student_emails"][0])
+        idle_rss = rss_kb(process.pid)
+        streams, held = open_streams(port, teacher.cookie, args.streams, args.settle)
+        per_conn = (rss_kb(process.pid) - idle_rss) / len(held) if held else 0.0
+        load = burst(port, teacher.cookie, args.requests, args.concurrency, args.timeout)
+        fan_out_ms = fan_out(held, student, teacher_id, args.settle) if held else None
+        return {"held": len(held), "kb_per_conn": per_conn, "fan_out_ms": fan_out_ms, **load}
+    finally:
+        for sock in streams:
+            sock.close()
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("EDUGLOW_DATABASE_URL"), required="EDUGLOW_DATABASE_URL" not in os.environ)
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {','.join(MODES)}")
+    parser.add_argument("--streams", type=int, default=1000, help="idle event streams to open")
+    parser.add_argument("--threads", type=int, default=16, help="threads of the gthread worker")
+    parser.add_argument("--requests", type=int, default=200, help="dashboard requests while streams are open")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=5.0, help="per dashboard request; slower counts as an error")
+    parser.add_argument("--settle", type=float, default=10.0, help="seconds to wait for streams and fan-out")
+    args = parser.parse_args()
+
+    # One socket per stream on each side of the connection.
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if args.streams * 2 + 100 > hard:
+        raise SystemExit(f"--streams {args.streams} needs more than the {hard} open files allowed")
+
+    ctx = load_context(args.database_url)
+    # Every dashboard request and every stream belongs to one teacher, so the fan-out reaches them all.
+    teacher_email = ctx["teacher_emails"][0]
+    from sqlalchemy import create_engine, text
+
+    with create_engine(args.database_url).connect() as conn:
+        teacher_id = conn.execute(text("SELECT id FROM \"user\" WHERE email = :e"), {"e": teacher_email}).scalar()
+
+    print(f"{'mode':<8} {'held':>6} {'KB/conn':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'fan-out ms':>11}")
+    for mode in args.modes.split(","):
+        r = run_mode(mode, args, ctx, teacher_email, teacher_id)
+        fan_out_ms = f"{r['fan_out_ms']:.0f}" if r["fan_out_ms"] is not None else "timeout"
+        print(
+            f"{mode:<8} {r['held']:>6} {r['kb_per_conn']:>8.1f} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f} {r['errors']:>7} {fan_out_ms:>11}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
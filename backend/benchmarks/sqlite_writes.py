@@ -0,0 +1,95 @@
+"""Concurrent write throughput against SQLite, default vs tuned connections.
+
+Each writer process commits small ``trial_request``-shaped inserts in a loop,
+the way ``create_trial`` does, and counts "database is locked" failures.
+
+    python benchmarks/sqlite_writes.py --writers 8 --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def make_engine(path, tuned):
+    uri = f"sqlite:///{path}"
+    if not tuned:
+        # The old setup: stock pysqlite timeout and rollback journal.
+        return create_engine(uri, connect_args={"timeout": 0.1})
+    engine = create_engine(uri, **database.engine_options(uri))
+    database.install(engine)
+    return engine
+
+
+def writer(path, tuned, seconds, results):
+    engine = make_engine(path, tuned)
+    done = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "INSERT INTO trial_request (name, phone, subject, created_at) "
+                        "VALUES ('Bench', '9999999999', 'Physics', CURRENT_TIMESTAMP)"
+                    )
+                )
+            done += 1
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((done, locked))
+
+
+def run(tuned, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_engine(path, tuned)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE trial_request (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, "
+                    "subject TEXT, user_id INTEGER, created_at TIMESTAMP)"
+                )
+            )
+        engine.dispose()
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=writer, args=(path, tuned, seconds, results)) for _ in range(writers)
+        ]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    commits = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    return commits / seconds, locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    print(f"{args.writers} writers, {args.seconds:.0f}s each")
+    print(f"{'mode':<8} {'commits/s':>10} {'locked errors':>14}")
+    for label, tuned in [("default", False), ("tuned", True)]:
+        rate, locked = run(tuned, args.writers, args.seconds)
+        print(f"{label:<8} {rate:>10.0f} {locked:>14}")
+
+
+if __name__ == "__main__":
+    main()
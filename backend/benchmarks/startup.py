@@ -0,0 +1,72 @@
+"""Worker boot cost: the app factory alone vs. the old import-time migrate + seed.
+
+Each sample is a fresh interpreter against an already migrated scratch
+database, the way a gunicorn worker restarts in production.
+
+    python benchmarks/startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode):
+    start = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+    event.listen(Engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    from app import create_app, migrate_schema, seed_data
+
+    app = create_app()
+    if mode == "migrate+seed":
+        with app.app_context():
+            migrate_schema()
+            seed_data()
+    elapsed = time.perf_counter() - start
+    ddl = [sql for sql in statements if sql.lstrip().upper().startswith(("CREATE", "ALTER")) or "TABLE_INFO" in sql.upper()]
+    print(json.dumps({"seconds": elapsed, "statements": len(statements), "ddl": len(ddl)}))
+
+
+def run(mode, env):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode], env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, EDUGLOW_DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        run("migrate+seed", env)  # first run creates and seeds the database
+        print(f"{'boot':<14} {'median ms':>10} {'max ms':>8} {'SQL stmts':>10} {'schema':>11}")
+        for mode in ["factory", "migrate+seed"]:
+            samples = [run(mode, env) for _ in range(args.runs)]
+            times = [s["seconds"] * 1000 for s in samples]
+            print(
+                f"{mode:<14} {statistics.median(times):>10.1f} {max(times):>8.1f} "
+                f"{samples[-1]['statements']:>10} {samples[-1]['ddl']:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
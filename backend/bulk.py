@@ -0,0 +1,161 @@
+"""Streaming exports and batched imports for operations.
+
+``export`` reads a table through a server-side cursor (``stream_results``
+with ``yield_per``) and yields NDJSON or CSV text one batch at a time, so
+memory stays flat whatever the row count; the HTTP endpoint and the CLI
+both just write those chunks out. ``import_tutors`` parses NDJSON or CSV
+incrementally and inserts ``BATCH_SIZE`` rows per ``executemany``, one
+transaction per batch, indexing each batch for search as it goes.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+import geo
+import search
+from pricing import parse_price
+
+
+BATCH_SIZE = 2000
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+MAX_REPORTED_ERRORS = 20
+
+# name -> (table, columns, filter); password hashes never leave the database.
+EXPORTS = {
+    "trials": ("trial_request", ("id", "name", "phone", "subject", "user_id", "created_at"), ""),
+    "bookings": (
+        "booking",
+        ("id", "student_id", "teacher_id", "subject", "price", "phone", "status", "created_at"),
+        "",
+    ),
+    "tutors": (
+        "tutor",
+        (
+            "id", "name", "subject", "level", "rating", "price", "price_amount", "currency", "unit", "city",
+            "latitude", "longitude", "image",
+        ),
+        "",
+    ),
+    "teachers": (
+        '"user"',
+        (
+            "id", "email", "name", "subject", "rating", "price", "price_amount", "currency", "unit", "city",
+            "latitude", "longitude", "image", "created_at",
+        ),
+        "WHERE role = 'teacher'",
+    ),
+}
+
+TUTOR_FIELDS = ("name", "subject", "level", "rating", "price", "city", "image")
+
+
+def _value(value):
+    # SQLite hands back DATETIME columns as strings already; other drivers as datetimes.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(columns, rows):
+    return "".join(json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + "\n" for row in rows)
+
+
+def _csv(columns, rows, header=False):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_value(v) for v in row] for row in rows)
+    return out.getvalue()
+
+
+def export(engine, name, fmt="ndjson", batch_size=BATCH_SIZE):
+    """Yield the ``name`` export as text chunks of ``batch_size`` rows each, in id order."""
+    table, columns, where = EXPORTS[name]
+    sql = text(f"SELECT {', '.join(columns)} FROM {table} {where} ORDER BY id")
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(sql)
+        if fmt == "csv":
+            yield _csv(columns, [], header=True)
+        for rows in result.partitions(batch_size):
+            yield _csv(columns, rows) if fmt == "csv" else _ndjson(columns, rows)
+
+
+def _records(stream, fmt):
+    """(line number, record) for every record of a binary stream; record is None for unparsable JSON."""
+    stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, record
+
+
+def _tutor_row(record):
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    missing = [field for field in TUTOR_FIELDS if record.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    rating = float(record["rating"])
+    if not 0 <= rating <= 5:
+        raise ValueError("rating must be between 0 and 5")
+    amount, currency, unit = parse_price(str(record["price"]))
+    row = {field: str(record[field]).strip() for field in TUTOR_FIELDS}
+    # Optional coordinates; without both, the city centre (if known) is used.
+    latitude, longitude = (None if record.get(field) in (None, "") else record[field] for field in ("latitude", "longitude"))
+    latitude, longitude, geo_cell = geo.locate(row["city"], latitude, longitude)
+    row.update(
+        rating=rating, price_amount=amount, currency=currency, unit=unit,
+        latitude=latitude, longitude=longitude, geo_cell=geo_cell,
+    )
+    return row
+
+
+def _insert_tutors(engine, batch):
+    with engine.begin() as conn:
+        last_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM tutor")).scalar()
+        conn.execute(
+            text(
+                "INSERT INTO tutor (name, subject, level, rating, price, price_amount, currency, unit, city, latitude, "
+                "longitude, geo_cell, image) VALUES (:name, :subject, :level, :rating, :price, :price_amount, "
+                ":currency, :unit, :city, :latitude, :longitude, :geo_cell, :image)"
+            ),
+            batch,
+        )
+        search.index_tutors_after(conn, last_id)
+        # Each batch is visible once committed, so the catalog version moves with it.
+        conn.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1"))
+
+
+def import_tutors(engine, stream, fmt="ndjson", batch_size=BATCH_SIZE):
+    """Insert valid records in batches; invalid ones are skipped and reported by line number."""
+    inserted, skipped, errors, batch = 0, 0, [], []
+    for line_number, record in _records(stream, fmt):
+        try:
+            batch.append(_tutor_row(record))
+        except (TypeError, ValueError) as exc:
+            skipped += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "error": str(exc) if record is not None else "invalid JSON"})
+            continue
+        if len(batch) == batch_size:
+            _insert_tutors(engine, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        _insert_tutors(engine, batch)
+        inserted += len(batch)
+    return {"inserted": inserted, "skipped": skipped, "errors": errors}
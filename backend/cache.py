@@ -0,0 +1,103 @@
+"""Response cache keyed by a data version.
+
+``VersionedCache`` remembers the current version for a short TTL so hot
+reads skip the database, and stores serialized bodies under
+``<namespace>:<version>:<key>``. Bumping the version orphans old entries,
+which then age out of the backend.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisBackend:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("redis package required for EDUGLOW_CACHE_URL") from exc
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def make_backend(url=None):
+    url = url if url is not None else os.environ.get("EDUGLOW_CACHE_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+class VersionedCache:
+    def __init__(self, namespace, load_version, backend=None, version_ttl=2.0, entry_ttl=300):
+        self.namespace = namespace
+        self.load_version = load_version
+        self.backend = backend or MemoryBackend()
+        self.version_ttl = version_ttl
+        self.entry_ttl = entry_ttl
+        self._version = None
+        self._version_expires = 0.0
+        self._lock = threading.Lock()
+
+    def version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now < self._version_expires:
+                return self._version
+        version = self.load_version()
+        with self._lock:
+            self._version = version
+            self._version_expires = now + self.version_ttl
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def _key(self, version, key):
+        return f"{self.namespace}:{version}:{key}"
+
+    def get(self, version, key):
+        return self.backend.get(self._key(version, key))
+
+    def set(self, version, key, value):
+        self.backend.set(self._key(version, key), value, self.entry_ttl)
@@ -0,0 +1,207 @@
+"""Engine setup, read-replica routing and schema migrations.
+
+The primary database comes from ``EDUGLOW_DATABASE_URL`` (SQLite by
+default, PostgreSQL supported). SQLite connections get WAL journaling and a
+busy timeout on connect so several gunicorn workers can commit without
+"database is locked" errors. Views marked ``read_replica`` run their queries
+against ``EDUGLOW_DATABASE_REPLICA_URL`` when one is configured. Schema
+changes are applied once, in order, and recorded in ``schema_migrations``.
+"""
+
+import logging
+import os
+from datetime import datetime
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+
+log = logging.getLogger(__name__)
+
+SQLITE_PRAGMAS = {
+    # Must precede journal_mode, which writes the header of a new file. Existing
+    # files keep their mode until `flask --app app janitor --enable-incremental-vacuum`.
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.environ.get("EDUGLOW_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.environ.get("EDUGLOW_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB: 64 MiB of page cache per connection.
+    "cache_size": int(os.environ.get("EDUGLOW_SQLITE_CACHE_SIZE", "-65536")),
+    "temp_store": "MEMORY",
+}
+
+
+REPLICA_BIND = "replica"
+
+
+def _normalize_url(url):
+    # Heroku/Railway style URLs use the scheme SQLAlchemy dropped in 1.4.
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def database_url(default):
+    return _normalize_url(os.environ.get("EDUGLOW_DATABASE_URL") or default)
+
+
+def replica_url():
+    url = os.environ.get("EDUGLOW_DATABASE_REPLICA_URL")
+    return _normalize_url(url) if url else None
+
+
+def dialect_name(conn):
+    # Works for Connections, Engines and (routing) Sessions alike.
+    dialect = getattr(conn, "dialect", None)
+    if dialect is None:
+        dialect = conn.get_bind().dialect
+    return dialect.name
+
+
+def engine_options(uri):
+    if not uri.startswith("sqlite"):
+        return {
+            "pool_pre_ping": True,
+            "pool_size": int(os.environ.get("EDUGLOW_DB_POOL_SIZE", "5")),
+            "max_overflow": int(os.environ.get("EDUGLOW_DB_MAX_OVERFLOW", "10")),
+            "pool_recycle": 1800,
+        }
+    options = {
+        "connect_args": {
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+            # Pooled connections are handed between request and dispatcher threads.
+            "check_same_thread": False,
+        },
+    }
+    if ":memory:" not in uri:
+        options.update(
+            pool_size=int(os.environ.get("EDUGLOW_DB_POOL_SIZE", "5")),
+            max_overflow=int(os.environ.get("EDUGLOW_DB_MAX_OVERFLOW", "10")),
+            pool_timeout=30,
+        )
+    return options
+
+
+# Sync driver scheme -> the async driver ASGI mode uses for the same database.
+ASYNC_DRIVERS = {
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+}
+
+
+def async_url(url):
+    scheme, _, rest = url.partition("://")
+    driver, module = ASYNC_DRIVERS.get(scheme.split("+")[0], (None, None))
+    if driver is None:
+        raise RuntimeError(f"no async driver for {scheme}:// URLs")
+    try:
+        __import__(module)
+    except ImportError as exc:
+        raise RuntimeError(f"{module} package required for ASGI mode with {scheme.split('+')[0]}") from exc
+    return f"{driver}://{rest}"
+
+
+def async_engine(url, read_only=False):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(async_url(url), **engine_options(url))
+    install(engine.sync_engine, read_only=read_only)
+    return engine
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def apply_sqlite_read_only(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def normalize_text(value):
+    """Lowercase and collapse whitespace; registered as SQLite's ``normalize_text()``."""
+    return " ".join((value or "").lower().split())
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None):
+    # aiosqlite wraps the sqlite3 connection; both expose create_function.
+    dbapi_connection.create_function("normalize_text", 1, normalize_text, deterministic=True)
+
+
+def install(engine, read_only=False):
+    if engine.dialect.name != "sqlite":
+        return
+    if not event.contains(engine, "connect", apply_sqlite_pragmas):
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        event.listen(engine, "connect", register_sqlite_functions)
+    if read_only and not event.contains(engine, "connect", apply_sqlite_read_only):
+        event.listen(engine, "connect", apply_sqlite_read_only)
+
+
+class RoutingSession(Session):
+    """Sends reads from ``read_replica`` views to the replica bind; flushes always go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("use_replica"):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def has_column(conn, table, column):
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+
+def applied_versions(conn):
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(120) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        )
+    )
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def migrate(engine, migrations):
+    """Apply each ``(version, name, fn)`` not yet recorded, one transaction per step."""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    applied = []
+    for version, name, fn in sorted(migrations, key=lambda m: m[0]):
+        if version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                fn(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {"v": version, "n": name, "t": datetime.utcnow()},
+                )
+        except IntegrityError:
+            # Another worker recorded this step first; every step is idempotent.
+            continue
+        log.info("applied migration %s %s", version, name)
+        applied.append(version)
+    return applied
@@ -0,0 +1,227 @@
+"""Teacher dashboard events over Server-Sent Events.
+
+Writers append rows to ``teacher_event`` in the same transaction as the
+booking or trial they describe, then, after commit, ``publish`` the
+affected teacher ids. The broker only wakes streams up; each stream reads
+its deltas from the table (``id > last seen``), so a reconnect with
+``Last-Event-ID`` resumes exactly where it left off and a missed wake-up
+costs at most one heartbeat of latency.
+
+``MemoryBroker`` wakes streams in the same process. ``RedisBroker`` relays
+wake-ups between workers over one Redis pub/sub channel. ``stream`` serves
+WSGI workers; ``astream`` does the same on an asyncio event loop (ASGI
+mode), with writers in other threads waking it through ``AsyncSubscription``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "eduglow:teacher-events"
+BATCH_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, teacher_id):
+        self.teacher_id = teacher_id
+        self._event = threading.Event()
+
+    def notify(self):
+        self._event.set()
+
+    def wait(self, timeout):
+        woke = self._event.wait(timeout)
+        self._event.clear()
+        return woke
+
+
+class AsyncSubscription:
+    def __init__(self, teacher_id):
+        self.teacher_id = teacher_id
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self):
+        # Publishers run on request threads, not on the loop.
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:  # loop already closed
+            pass
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            woke = True
+        except asyncio.TimeoutError:
+            woke = False
+        self._event.clear()
+        return woke
+
+
+class MemoryBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, teacher_id, subscription_class=Subscription):
+        subscription = subscription_class(teacher_id)
+        with self._lock:
+            self._subscribers.setdefault(teacher_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.teacher_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.teacher_id]
+
+    def active(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, teacher_ids):
+        with self._lock:
+            targets = [sub for teacher_id in set(teacher_ids) for sub in self._subscribers.get(teacher_id, ())]
+        for subscription in targets:
+            subscription.notify()
+
+
+class RedisBroker(MemoryBroker):
+    def __init__(self, url):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("redis package required for EDUGLOW_EVENTS_URL") from exc
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+        self._listener_pid = None
+
+    def _ensure_listener(self):
+        # One listener per worker process, started after the fork.
+        if self._listener is not None and self._listener_pid == os.getpid() and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(target=self._listen, name="teacher-events", daemon=True)
+        self._listener_pid = os.getpid()
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    super().publish(json.loads(message["data"]))
+            except Exception:
+                log.exception("teacher event listener failed; reconnecting")
+                time.sleep(1)
+
+    def subscribe(self, teacher_id, subscription_class=Subscription):
+        self._ensure_listener()
+        return super().subscribe(teacher_id, subscription_class)
+
+    def publish(self, teacher_ids):
+        if teacher_ids:
+            self._client.publish(CHANNEL, json.dumps(sorted(set(teacher_ids))))
+
+
+def make_broker(url=None):
+    url = url if url is not None else os.environ.get("EDUGLOW_EVENTS_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return MemoryBroker()
+
+
+def record(conn, teacher_id, kind, payload):
+    conn.execute(
+        text("INSERT INTO teacher_event (teacher_id, kind, payload, created_at) VALUES (:t, :k, :p, :c)"),
+        {"t": teacher_id, "k": kind, "p": json.dumps(payload), "c": datetime.utcnow()},
+    )
+
+
+def record_trial_matches(conn, trial_id, payload):
+    """One ``trial`` event for every teacher ``matching.match_trial`` linked the trial to."""
+    rows = conn.execute(
+        text(
+            "INSERT INTO teacher_event (teacher_id, kind, payload, created_at) "
+            "SELECT teacher_id, 'trial', :p, :c FROM trial_match WHERE trial_id = :trial_id"
+        ),
+        {"p": json.dumps(payload), "c": datetime.utcnow(), "trial_id": trial_id},
+    )
+    return rows.rowcount
+
+
+_LATEST = text("SELECT coalesce(max(id), 0) FROM teacher_event WHERE teacher_id = :t")
+
+
+def latest_id(conn, teacher_id):
+    return conn.execute(_LATEST, {"t": teacher_id}).scalar()
+
+
+async def alatest_id(conn, teacher_id):
+    return (await conn.execute(_LATEST, {"t": teacher_id})).scalar()
+
+
+_SINCE = text(
+    "SELECT id, kind, payload FROM teacher_event WHERE teacher_id = :t AND id > :last ORDER BY id LIMIT :limit"
+)
+
+
+def since(conn, teacher_id, last_id, limit=BATCH_SIZE):
+    return conn.execute(_SINCE, {"t": teacher_id, "last": last_id, "limit": limit}).all()
+
+
+def format_event(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+def stream(engine, broker, teacher_id, last_id, lifetime=300.0, heartbeat=15.0, retry_ms=3000):
+    """Yield SSE frames for one teacher until ``lifetime`` runs out; the browser then reconnects."""
+    subscription = broker.subscribe(teacher_id)
+    deadline = time.monotonic() + lifetime
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        while time.monotonic() < deadline:
+            # Short-lived connection: idle streams hold no pooled connection.
+            with engine.connect() as conn:
+                rows = since(conn, teacher_id, last_id)
+            for event_id, kind, payload in rows:
+                last_id = event_id
+                yield format_event(event_id, kind, payload)
+            if len(rows) == BATCH_SIZE:
+                continue
+            if not subscription.wait(min(heartbeat, max(deadline - time.monotonic(), 0))):
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def astream(engine, broker, teacher_id, last_id, lifetime=300.0, heartbeat=15.0, retry_ms=3000):
+    """``stream`` for an ``AsyncEngine``: an idle stream is one parked coroutine."""
+    subscription = broker.subscribe(teacher_id, AsyncSubscription)
+    deadline = time.monotonic() + lifetime
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        while time.monotonic() < deadline:
+            async with engine.connect() as conn:
+                rows = (await conn.execute(_SINCE, {"t": teacher_id, "last": last_id, "limit": BATCH_SIZE})).all()
+            for event_id, kind, payload in rows:
+                last_id = event_id
+                yield format_event(event_id, kind, payload)
+            if len(rows) == BATCH_SIZE:
+                continue
+            if not await subscription.wait(min(heartbeat, max(deadline - time.monotonic(), 0))):
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
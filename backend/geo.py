@@ -0,0 +1,144 @@
+"""Tutor and teacher locations for "near me" search.
+
+A location is the profile's own latitude/longitude or, failing that, the
+centre of its city from ``CITY_CENTROIDS``, an offline table, so no
+geocoding service is involved. Every located row also stores ``geo_cell``,
+its cell in a fixed ``GRID_DEGREES`` latitude/longitude grid numbered row
+by row. A radius query covers its bounding box with one contiguous
+``geo_cell`` range per grid row (``cell_ranges``), so the database probes
+the ``geo_cell`` index over a bounded set of cells and never scans the
+catalog. Boxes are clamped at the poles and the antimeridian.
+"""
+
+import math
+
+
+GRID_DEGREES = 0.1
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+GRID_ROWS = round(180 / GRID_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# lower-case city name -> (latitude, longitude) of its centre
+CITY_CENTROIDS = {
+    "agra": (27.1767, 78.0081),
+    "ahmedabad": (23.0225, 72.5714),
+    "amritsar": (31.6340, 74.8723),
+    "bengaluru": (12.9716, 77.5946),
+    "bhopal": (23.2599, 77.4126),
+    "bhubaneswar": (20.2961, 85.8245),
+    "chandigarh": (30.7333, 76.7794),
+    "chennai": (13.0827, 80.2707),
+    "coimbatore": (11.0168, 76.9558),
+    "dehradun": (30.3165, 78.0322),
+    "delhi": (28.6139, 77.2090),
+    "gurugram": (28.4595, 77.0266),
+    "guwahati": (26.1445, 91.7362),
+    "hyderabad": (17.3850, 78.4867),
+    "indore": (22.7196, 75.8577),
+    "jaipur": (26.9124, 75.7873),
+    "kanpur": (26.4499, 80.3319),
+    "kochi": (9.9312, 76.2673),
+    "kolkata": (22.5726, 88.3639),
+    "lucknow": (26.8467, 80.9462),
+    "ludhiana": (30.9010, 75.8573),
+    "madurai": (9.9252, 78.1198),
+    "mumbai": (19.0760, 72.8777),
+    "mysuru": (12.2958, 76.6394),
+    "nagpur": (21.1458, 79.0882),
+    "nashik": (19.9975, 73.7898),
+    "navi mumbai": (19.0330, 73.0297),
+    "noida": (28.5355, 77.3910),
+    "patna": (25.5941, 85.1376),
+    "pune": (18.5204, 73.8567),
+    "raipur": (21.2514, 81.6296),
+    "ranchi": (23.3441, 85.3096),
+    "surat": (21.1702, 72.8311),
+    "thane": (19.2183, 72.9781),
+    "thiruvananthapuram": (8.5241, 76.9366),
+    "vadodara": (22.3072, 73.1812),
+    "varanasi": (25.3176, 82.9739),
+    "visakhapatnam": (17.6868, 83.2185),
+}
+CITY_ALIASES = {
+    "bangalore": "bengaluru",
+    "bombay": "mumbai",
+    "calcutta": "kolkata",
+    "gurgaon": "gurugram",
+    "madras": "chennai",
+    "mysore": "mysuru",
+    "new delhi": "delhi",
+    "trivandrum": "thiruvananthapuram",
+}
+
+
+def city_key(city):
+    key = " ".join(city.lower().split()) if isinstance(city, str) else ""
+    return CITY_ALIASES.get(key, key)
+
+
+def centroid(city):
+    return CITY_CENTROIDS.get(city_key(city))
+
+
+def cell(latitude, longitude):
+    row = min(int((latitude + 90) / GRID_DEGREES), GRID_ROWS - 1)
+    column = min(int((longitude + 180) / GRID_DEGREES), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+
+def coordinates(latitude, longitude):
+    """Validated ``(latitude, longitude)`` floats; raises ValueError."""
+    try:
+        if isinstance(latitude, bool) or isinstance(longitude, bool):
+            raise TypeError
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers") from None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within -90..90 and longitude within -180..180")
+    return latitude, longitude
+
+
+def locate(city, latitude=None, longitude=None):
+    """``(latitude, longitude, geo_cell)`` from explicit coordinates or the city centre; all None if unknown."""
+    if latitude is not None and longitude is not None:
+        latitude, longitude = coordinates(latitude, longitude)
+    else:
+        found = centroid(city)
+        if found is None:
+            return None, None, None
+        latitude, longitude = found
+    return latitude, longitude, cell(latitude, longitude)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """``(south, north, west, east)`` in degrees around a point."""
+    lat_span = radius_km / KM_PER_DEGREE
+    south, north = max(latitude - lat_span, -90.0), min(latitude + lat_span, 90.0)
+    widest = max(abs(south), abs(north))
+    if widest >= 89.9:
+        return south, north, -180.0, 180.0
+    lon_span = lat_span / math.cos(math.radians(widest))
+    return south, north, max(longitude - lon_span, -180.0), min(longitude + lon_span, 180.0)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Inclusive ``(first, last)`` geo_cell ranges covering the radius, one per grid row."""
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    first_column, last_column = cell(south, west) % GRID_COLUMNS, cell(south, east) % GRID_COLUMNS
+    first_row, last_row = cell(south, west) // GRID_COLUMNS, cell(north, west) // GRID_COLUMNS
+    return [
+        (row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+        for row in range(first_row, last_row + 1)
+    ]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
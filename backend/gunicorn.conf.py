@@ -0,0 +1,38 @@
+"""gunicorn settings; picked up automatically when gunicorn runs from backend/.
+
+The default ``gthread`` worker serves each request on a real thread, so a
+SQLite call that waits on the busy timeout, a janitor batch or a matching
+backfill blocks only that thread. Each open ``/api/teacher/events`` stream
+holds a thread too, so streams are capped at half the threads per worker;
+past that the dashboard falls back to polling, as it always does under
+sync. For thousands of open dashboards serve the app with the ASGI entry
+point (see README).
+
+``EDUGLOW_WORKER_CLASS=gevent`` is an opt-in for PostgreSQL deployments:
+every request runs on a greenlet of one OS thread, and SQLite calls do not
+yield, so one slow statement stalls every request and stream in the worker.
+``--preload`` imports the app in the master before forking, so the stdlib
+has to be patched here, before that import, not by the worker afterwards.
+"""
+
+import os
+
+worker_class = os.environ.get("EDUGLOW_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("EDUGLOW_WORKER_THREADS", "32"))
+if worker_class != "gevent":
+    # Read by the app at import; keeps threads free for ordinary requests. A
+    # sync worker has one, so its dashboards always poll.
+    streams = max(threads // 2, 1) if worker_class == "gthread" else 0
+    os.environ.setdefault("EDUGLOW_SSE_MAX_STREAMS", str(streams))
+# Concurrent connections per gevent worker, event streams included.
+worker_connections = int(os.environ.get("EDUGLOW_WORKER_CONNECTIONS", "2000"))
+# With sync workers this also cuts event streams short; gevent and gthread
+# workers heartbeat independently of open requests.
+timeout = int(os.environ.get("EDUGLOW_WORKER_TIMEOUT", "30"))
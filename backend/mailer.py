@@ -0,0 +1,294 @@
+"""Outbound email: a durable outbox table drained by a background dispatcher.
+
+Request handlers only ``enqueue`` rows (inside their own transaction). The
+``Dispatcher`` claims due rows in batches, sends them over pooled,
+already-authenticated SMTP connections and reschedules failures with
+exponential backoff.
+"""
+
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import and_, or_, select
+
+
+log = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class SMTPSettings:
+    def __init__(self, host, port, user, password, from_email, use_tls, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_email = from_email
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        user = os.environ.get("EDUGLOW_SMTP_USER")
+        return cls(
+            host=os.environ.get("EDUGLOW_SMTP_HOST"),
+            port=int(os.environ.get("EDUGLOW_SMTP_PORT", "587")),
+            user=user,
+            password=os.environ.get("EDUGLOW_SMTP_PASS"),
+            from_email=os.environ.get("EDUGLOW_SMTP_FROM", user),
+            use_tls=os.environ.get("EDUGLOW_SMTP_TLS", "true").lower() in {"1", "true", "yes"},
+            timeout=float(os.environ.get("EDUGLOW_SMTP_TIMEOUT", "10")),
+        )
+
+    @property
+    def configured(self):
+        return bool(self.host and self.from_email)
+
+
+def build_message(from_email, to_email, subject, text_body, html_body=None):
+    msg = EmailMessage()
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(text_body)
+    if html_body:
+        msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+class SMTPPool:
+    """Keeps up to ``size`` logged-in SMTP connections for reuse."""
+
+    def __init__(self, settings, size=2, idle_timeout=60.0):
+        self.settings = settings
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        settings = self.settings
+        server = smtplib.SMTP(settings.host, settings.port, timeout=settings.timeout)
+        try:
+            if settings.use_tls:
+                server.starttls()
+            if settings.user and settings.password:
+                server.login(settings.user, settings.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return self._connect()
+            server, last_used = item
+            if time.monotonic() - last_used > self.idle_timeout:
+                self._quit(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            server = self._checkout()
+            try:
+                yield server
+            except (smtplib.SMTPServerDisconnected, OSError):
+                server.close()
+                raise
+            except smtplib.SMTPException:
+                # The connection is still usable after a per-message rejection.
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+                raise
+            else:
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._quit(server)
+
+
+def enqueue(conn, table, to_email, subject, text_body, html_body=None):
+    enqueue_many(
+        conn,
+        table,
+        [{"to_email": to_email, "subject": subject, "text_body": text_body, "html_body": html_body}],
+    )
+
+
+def enqueue_many(conn, table, messages):
+    now = datetime.utcnow()
+    rows = [
+        {
+            "to_email": message["to_email"],
+            "subject": message["subject"],
+            "text_body": message["text_body"],
+            "html_body": message.get("html_body"),
+            "status": STATUS_PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        for message in messages
+    ]
+    if rows:
+        conn.execute(table.insert(), rows)
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        engine,
+        table,
+        pool,
+        batch_size=20,
+        poll_interval=5.0,
+        max_attempts=5,
+        backoff=30.0,
+        lease=120.0,
+    ):
+        self.engine = engine
+        self.table = table
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="email-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.pool.close()
+
+    def wake(self):
+        self._wake.set()
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.run_once()
+            except Exception:
+                log.exception("email dispatch failed")
+                sent = 0
+            if sent < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self):
+        table = self.table
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = or_(
+            and_(table.c.status == STATUS_PENDING, table.c.next_attempt_at <= now),
+            and_(table.c.status == STATUS_SENDING, table.c.locked_until < now),
+        )
+        with self.engine.begin() as conn:
+            ids = conn.execute(
+                select(table.c.id).where(due).order_by(table.c.next_attempt_at).limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                return []
+            conn.execute(
+                table.update()
+                .where(table.c.id.in_(ids), due)
+                .values(status=STATUS_SENDING, claim=token, locked_until=now + timedelta(seconds=self.lease))
+            )
+            return conn.execute(select(table).where(table.c.claim == token)).all()
+
+    def _retry_at(self, attempts):
+        delay = min(self.backoff * (2 ** (attempts - 1)), 3600)
+        return datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def run_once(self):
+        rows = self._claim()
+        if not rows:
+            return 0
+        results = {}
+        try:
+            with self.pool.connection() as server:
+                for row in rows:
+                    msg = build_message(
+                        self.pool.settings.from_email, row.to_email, row.subject, row.text_body, row.html_body
+                    )
+                    try:
+                        server.send_message(msg)
+                        results[row.id] = None
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as exc:
+                        results[row.id] = str(exc)
+        except (smtplib.SMTPException, OSError) as exc:
+            log.warning("SMTP connection failed: %s", exc)
+            for row in rows:
+                results.setdefault(row.id, str(exc))
+
+        table = self.table
+        with self.engine.begin() as conn:
+            for row in rows:
+                error = results[row.id]
+                attempts = row.attempts + 1
+                if error is None:
+                    values = {"status": STATUS_SENT, "sent_at": datetime.utcnow(), "last_error": None}
+                elif attempts >= self.max_attempts:
+                    values = {"status": STATUS_FAILED, "last_error": error[:500]}
+                else:
+                    values = {
+                        "status": STATUS_PENDING,
+                        "next_attempt_at": self._retry_at(attempts),
+                        "last_error": error[:500],
+                    }
+                conn.execute(
+                    table.update()
+                    .where(table.c.id == row.id, table.c.claim == row.claim)
+                    .values(attempts=attempts, claim=None, locked_until=None, **values)
+                )
+        return len(rows)
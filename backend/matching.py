@@ -0,0 +1,154 @@
+"""Precomputed teacher <-> trial request matches.
+
+A trial request matches a teacher when one of the teacher's terms (their
+subject or a skill name, normalized) appears in the request subject. Terms
+live once in ``match_term``; ``teacher_term`` links teachers to them and
+``trial_match`` stores the resulting pairs so the dashboard reads an index
+instead of scanning ``trial_request``.
+"""
+
+from sqlalchemy import text
+
+from database import dialect_name, normalize_text as normalize
+
+
+def _position(conn):
+    # instr(haystack, needle) on SQLite, strpos(haystack, needle) on PostgreSQL.
+    return "strpos" if dialect_name(conn) == "postgresql" else "instr"
+
+
+def _normalized(conn, column):
+    # The SQL side of normalize(), so set-based backfills match exactly what match_trial does.
+    if dialect_name(conn) == "postgresql":
+        return f"btrim(regexp_replace(lower({column}), '\\s+', ' ', 'g'))"
+    return f"normalize_text({column})"
+
+
+def teacher_terms(conn, teacher_id):
+    subject = conn.execute(
+        text("SELECT subject FROM \"user\" WHERE id = :id AND role = 'teacher'"), {"id": teacher_id}
+    ).scalar()
+    skills = conn.execute(
+        text("SELECT name FROM teacher_skill WHERE teacher_id = :id"), {"id": teacher_id}
+    ).scalars()
+    return {term for term in (normalize(v) for v in [subject, *skills]) if term}
+
+
+def _term_id(conn, term):
+    conn.execute(
+        text("INSERT INTO match_term (term) VALUES (:term) ON CONFLICT (term) DO NOTHING"), {"term": term}
+    )
+    return conn.execute(text("SELECT id FROM match_term WHERE term = :term"), {"term": term}).scalar()
+
+
+def _backfill_term(conn, term_id, term):
+    # One pass over trial_request per newly linked term, for every teacher holding it.
+    conn.execute(
+        text(
+            "INSERT INTO trial_match (teacher_id, trial_id, created_at) "
+            "SELECT tt.teacher_id, r.id, r.created_at "
+            "FROM trial_request r JOIN teacher_term tt ON tt.term_id = :term_id "
+            f"WHERE {_position(conn)}({_normalized(conn, 'r.subject')}, :term) > 0 "
+            "ON CONFLICT DO NOTHING"
+        ),
+        {"term_id": term_id, "term": term},
+    )
+
+
+def sync_teacher(conn, teacher_id):
+    """Bring one teacher's terms and matches in line with their subject and skills."""
+    wanted = teacher_terms(conn, teacher_id)
+    current = dict(
+        conn.execute(
+            text(
+                "SELECT t.term, t.id FROM teacher_term tt JOIN match_term t ON t.id = tt.term_id "
+                "WHERE tt.teacher_id = :id"
+            ),
+            {"id": teacher_id},
+        ).all()
+    )
+
+    removed = [current[term] for term in current if term not in wanted]
+    for term_id in removed:
+        conn.execute(
+            text("DELETE FROM teacher_term WHERE teacher_id = :teacher_id AND term_id = :term_id"),
+            {"teacher_id": teacher_id, "term_id": term_id},
+        )
+        conn.execute(
+            text(
+                "DELETE FROM match_term WHERE id = :term_id "
+                "AND NOT EXISTS (SELECT 1 FROM teacher_term WHERE term_id = :term_id)"
+            ),
+            {"term_id": term_id},
+        )
+    if removed:
+        if wanted:
+            params = {f"t{i}": term for i, term in enumerate(sorted(wanted))}
+            position, subject = _position(conn), _normalized(conn, "r.subject")
+            still_matches = " OR ".join(f"{position}({subject}, :{name}) > 0" for name in params)
+            conn.execute(
+                text(
+                    "DELETE FROM trial_match WHERE teacher_id = :teacher_id AND trial_id IN ("
+                    "SELECT m.trial_id FROM trial_match m JOIN trial_request r ON r.id = m.trial_id "
+                    f"WHERE m.teacher_id = :teacher_id AND NOT ({still_matches}))"
+                ),
+                {"teacher_id": teacher_id, **params},
+            )
+        else:
+            conn.execute(text("DELETE FROM trial_match WHERE teacher_id = :id"), {"id": teacher_id})
+
+    for term in wanted - set(current):
+        term_id = _term_id(conn, term)
+        conn.execute(
+            text("INSERT INTO teacher_term (teacher_id, term_id) VALUES (:teacher_id, :term_id)"),
+            {"teacher_id": teacher_id, "term_id": term_id},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO trial_match (teacher_id, trial_id, created_at) "
+                "SELECT :teacher_id, r.id, r.created_at FROM trial_request r "
+                f"WHERE {_position(conn)}({_normalized(conn, 'r.subject')}, :term) > 0 "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"teacher_id": teacher_id, "term": term},
+        )
+
+
+def match_trial(conn, trial_id):
+    """Fan a freshly inserted trial request out to every teacher with a matching term."""
+    subject = conn.execute(
+        text("SELECT subject FROM trial_request WHERE id = :id"), {"id": trial_id}
+    ).scalar()
+    conn.execute(
+        text(
+            "INSERT INTO trial_match (teacher_id, trial_id, created_at) "
+            "SELECT DISTINCT tt.teacher_id, r.id, r.created_at "
+            "FROM match_term t JOIN teacher_term tt ON tt.term_id = t.id "
+            "JOIN trial_request r ON r.id = :trial_id "
+            f"WHERE {_position(conn)}(:subject, t.term) > 0 "
+            "ON CONFLICT DO NOTHING"
+        ),
+        {"trial_id": trial_id, "subject": normalize(subject)},
+    )
+
+
+def rebuild(conn):
+    conn.execute(text("DELETE FROM trial_match"))
+    conn.execute(text("DELETE FROM teacher_term"))
+    conn.execute(text("DELETE FROM match_term"))
+    teachers = conn.execute(text("SELECT id FROM \"user\" WHERE role = 'teacher'")).scalars().all()
+    for teacher_id in teachers:
+        for term in teacher_terms(conn, teacher_id):
+            conn.execute(
+                text("INSERT INTO teacher_term (teacher_id, term_id) VALUES (:teacher_id, :term_id)"),
+                {"teacher_id": teacher_id, "term_id": _term_id(conn, term)},
+            )
+    for term_id, term in conn.execute(text("SELECT id, term FROM match_term")).all():
+        _backfill_term(conn, term_id, term)
+
+
+def ensure_matches(conn):
+    empty = conn.execute(text("SELECT count(*) FROM teacher_term")).scalar() == 0
+    has_teachers = conn.execute(text("SELECT 1 FROM \"user\" WHERE role = 'teacher' LIMIT 1")).first()
+    if empty and has_teachers:
+        rebuild(conn)
@@ -0,0 +1,339 @@
+"""Request and SQL metrics in Prometheus text format, plus a slow-request profiler.
+
+``install(app, engines)`` wraps every request: latency per endpoint, status
+codes, in-flight requests, and the number and total time of SQL statements
+executed while it ran (captured with engine cursor events). A request that
+runs the same statement ``EDUGLOW_N_PLUS_ONE_THRESHOLD`` times or more is
+counted and logged as a likely N+1. Values are per process; with several
+gunicorn workers, scrape each one or aggregate upstream.
+
+Set ``EDUGLOW_PROFILE_SLOW_MS`` to sample the stacks of in-flight requests
+every ``EDUGLOW_PROFILE_INTERVAL_MS`` and log the hottest ones for requests
+slower than the threshold.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # gevent is only needed by the default gunicorn worker
+    gevent_monkey = None
+
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("EDUGLOW_N_PLUS_ONE_THRESHOLD", "5"))
+PROFILE_SLOW_MS = float(os.environ.get("EDUGLOW_PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("EDUGLOW_PROFILE_INTERVAL_MS", "5"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, value):
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            le = _labels(self.labelnames, key, [("le", _number(bound))])
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = _labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+REQUEST_LATENCY = registry.register(
+    Histogram("eduglow_request_duration_seconds", "Request latency by endpoint.", ["method", "endpoint"])
+)
+REQUESTS = registry.register(
+    Counter("eduglow_requests_total", "Requests by endpoint and status code.", ["method", "endpoint", "status"])
+)
+IN_FLIGHT = registry.register(Gauge("eduglow_requests_in_flight", "Requests currently being served."))
+REQUEST_QUERIES = registry.register(
+    Histogram(
+        "eduglow_request_sql_queries",
+        "SQL statements executed per request.",
+        ["method", "endpoint"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+REQUEST_SQL_TIME = registry.register(
+    Histogram("eduglow_request_sql_duration_seconds", "Total SQL time per request.", ["method", "endpoint"])
+)
+N_PLUS_ONE = registry.register(
+    Counter("eduglow_n_plus_one_total", "Requests that repeated one SQL statement past the threshold.", ["endpoint"])
+)
+SLOW_PROFILES = registry.register(Counter("eduglow_slow_request_profiles_total", "Slow requests profiled.", ["endpoint"]))
+RETENTION_ROWS = registry.register(
+    Counter("eduglow_retention_rows_total", "Rows purged or archived by the retention janitor.", ["table", "action"])
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = StackCounter()
+
+
+def _greenlets_patched():
+    return gevent_monkey is not None and gevent_monkey.is_module_patched("threading")
+
+
+class SamplingProfiler:
+    """One background OS thread that samples the stacks of registered requests.
+
+    Under gevent's monkey patching a request is a greenlet rather than a
+    thread: a suspended one is sampled from its own frame, the running one
+    from its OS thread's frame. The sampler itself stays a real thread, so it
+    keeps ticking while a request holds the hub with CPU work.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._greenlets = _greenlets_patched()
+        if self._greenlets:
+            self._get_ident = gevent_monkey.get_original("_thread", "get_ident")
+            self._start_thread = gevent_monkey.get_original("_thread", "start_new_thread")
+            self._sleep = gevent_monkey.get_original("time", "sleep")
+            self._lock = gevent_monkey.get_original("_thread", "allocate_lock")()
+        else:
+            self._get_ident = threading.get_ident
+            self._start_thread = None
+            self._sleep = time.sleep
+            self._lock = threading.Lock()
+        self._active = {}
+        self._thread_pid = None
+
+    def _ensure_thread(self):
+        # One sampler per process; a forked worker starts its own.
+        if self._thread_pid != os.getpid():
+            self._thread_pid = os.getpid()
+            if self._start_thread is not None:
+                self._start_thread(self._run, ())
+            else:
+                threading.Thread(target=self._run, name="request-profiler", daemon=True).start()
+
+    def _key(self):
+        if self._greenlets:
+            from greenlet import getcurrent
+
+            task = getcurrent()
+            return id(task), task
+        return self._get_ident(), None
+
+    def start(self):
+        key, task = self._key()
+        with self._lock:
+            self._active[key] = (task, self._get_ident(), StackCounter())
+            self._ensure_thread()
+
+    def stop(self):
+        key, _ = self._key()
+        with self._lock:
+            entry = self._active.pop(key, None)
+        return entry[2] if entry else StackCounter()
+
+    def _run(self):
+        while True:
+            self._sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for task, thread_id, samples in self._active.values():
+                    # gr_frame is None only while the greenlet is the one running.
+                    frame = task.gr_frame if task is not None else None
+                    if frame is None:
+                        frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_start", None)
+    if started is None or not has_request_context():
+        return
+    stats = g.get("request_stats")
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - started
+        stats.statements[statement] += 1
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time.
+    if context.connection is not None:
+        context.connection.info.pop("query_start", None)
+
+
+def install_engine(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def install(app, engines):
+    for engine in engines:
+        install_engine(engine)
+    profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000) if PROFILE_SLOW_MS > 0 else None
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_stats = RequestStats()
+        g.request_started = time.perf_counter()
+        IN_FLIGHT.inc()
+        if profiler is not None:
+            profiler.start()
+
+    @app.teardown_request
+    def finish_request_metrics(exc=None):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - g.pop("request_started")
+        IN_FLIGHT.dec()
+        endpoint = _endpoint()
+        method = request.method
+        status = getattr(g, "response_status", 500 if exc is not None else 200)
+        REQUEST_LATENCY.observe(elapsed, method=method, endpoint=endpoint)
+        REQUESTS.inc(method=method, endpoint=endpoint, status=status)
+        REQUEST_QUERIES.observe(stats.queries, method=method, endpoint=endpoint)
+        REQUEST_SQL_TIME.observe(stats.sql_seconds, method=method, endpoint=endpoint)
+
+        statement, repeats = stats.statements.most_common(1)[0] if stats.statements else (None, 0)
+        if repeats >= N_PLUS_ONE_THRESHOLD:
+            N_PLUS_ONE.inc(endpoint=endpoint)
+            log.warning("possible N+1 on %s %s: %d x %s", method, endpoint, repeats, " ".join(statement.split()))
+
+        if profiler is not None:
+            samples = profiler.stop()
+            if elapsed * 1000 >= PROFILE_SLOW_MS and samples:
+                SLOW_PROFILES.inc(endpoint=endpoint)
+                hottest = "\n".join(f"{count} {stack}" for stack, count in samples.most_common(10))
+                log.warning("slow request %s %s took %.0f ms; hottest stacks:\n%s", method, endpoint, elapsed * 1000, hottest)
+
+    @app.after_request
+    def record_status(response):
+        g.response_status = response.status_code
+        return response
@@ -0,0 +1,167 @@
+"""Ordered schema migrations, applied by ``database.migrate``.
+
+Steps run after ``db.create_all()`` and must be idempotent: a fresh database
+already has every ORM column, an old one may be missing some.
+"""
+
+from sqlalchemy import text
+
+import geo
+import matching
+import search
+import stats
+from database import has_column
+from pricing import parse_price
+
+
+def add_legacy_columns(conn):
+    if not has_column(conn, "trial_request", "user_id"):
+        conn.execute(text("ALTER TABLE trial_request ADD COLUMN user_id INTEGER"))
+    if not has_column(conn, "booking", "phone"):
+        conn.execute(text("ALTER TABLE booking ADD COLUMN phone TEXT"))
+
+
+def add_catalog_indexes(conn):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_tutor_rating ON tutor (rating)",
+        "CREATE INDEX IF NOT EXISTS ix_tutor_subject_lower ON tutor (lower(subject))",
+        "CREATE INDEX IF NOT EXISTS ix_tutor_city_lower ON tutor (lower(city))",
+        "CREATE INDEX IF NOT EXISTS ix_user_role_rating ON \"user\" (role, rating)",
+        "CREATE INDEX IF NOT EXISTS ix_user_subject_lower ON \"user\" (lower(subject))",
+        "CREATE INDEX IF NOT EXISTS ix_user_city_lower ON \"user\" (lower(city))",
+        "CREATE INDEX IF NOT EXISTS ix_teacher_skill_teacher_name ON teacher_skill (teacher_id, name)",
+    ]:
+        conn.execute(text(statement))
+
+
+def add_foreign_key_indexes(conn):
+    # user.role and teacher_skill.teacher_id are covered by the leading
+    # columns of ix_user_role_rating and ix_teacher_skill_teacher_name.
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_booking_teacher_created ON booking (teacher_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_booking_student_id ON booking (student_id)",
+        "CREATE INDEX IF NOT EXISTS ix_trial_request_user_created ON trial_request (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_trial_request_created_at ON trial_request (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_password_reset_token_user_id ON password_reset_token (user_id)",
+    ]:
+        conn.execute(text(statement))
+
+
+def create_catalog_version(conn):
+    conn.execute(text("INSERT INTO catalog_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING"))
+
+
+def add_structured_prices(conn):
+    for table in ["tutor", "\"user\""]:
+        bare = table.strip('"')
+        for column, ddl in [("price_amount", "FLOAT"), ("currency", "VARCHAR(3)"), ("unit", "VARCHAR(10)")]:
+            if not has_column(conn, bare, column):
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text(
+                    f"SELECT id, price FROM {table} WHERE id > :last_id AND price IS NOT NULL "
+                    "AND price_amount IS NULL ORDER BY id LIMIT 1000"
+                ),
+                {"last_id": last_id},
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for row_id, price in rows:
+                amount, currency, unit = parse_price(price)
+                if amount is not None:
+                    updates.append({"id": row_id, "amount": amount, "currency": currency, "unit": unit})
+            if updates:
+                conn.execute(
+                    text(f"UPDATE {table} SET price_amount = :amount, currency = :currency, unit = :unit WHERE id = :id"),
+                    updates,
+                )
+            last_id = rows[-1][0]
+    # Subject and city equality, then a price bound, narrow the index range; filters the range
+    # cannot use are still checked on index entries. Rating order always needs a sort afterwards.
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_tutor_subject_city_price_rating "
+            "ON tutor (lower(subject), lower(city), price_amount, rating)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_user_role_subject_city_price_rating "
+            "ON \"user\" (role, lower(subject), lower(city), price_amount, rating)"
+        )
+    )
+
+
+def add_profile_version(conn):
+    if not has_column(conn, "user", "profile_version"):
+        conn.execute(text("ALTER TABLE \"user\" ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def add_locations(conn):
+    for table in ["tutor", "\"user\""]:
+        bare = table.strip('"')
+        for column, ddl in [("latitude", "FLOAT"), ("longitude", "FLOAT"), ("geo_cell", "INTEGER")]:
+            if not has_column(conn, bare, column):
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        teachers_only = " AND role = 'teacher'" if bare == "user" else ""
+        # One indexed UPDATE per known city name (ix_*_city_lower); unknown cities stay unlocated.
+        names = list(geo.CITY_CENTROIDS) + list(geo.CITY_ALIASES)
+        for name in names:
+            latitude, longitude, cell = geo.locate(name)
+            conn.execute(
+                text(
+                    f"UPDATE {table} SET latitude = :latitude, longitude = :longitude, geo_cell = :cell "
+                    f"WHERE lower(city) = :name AND latitude IS NULL{teachers_only}"
+                ),
+                {"latitude": latitude, "longitude": longitude, "cell": cell, "name": name},
+            )
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tutor_geo_cell ON tutor (geo_cell)"))
+    # Only teachers are ever located, so students add nothing to this index's ranges.
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_geo_cell ON \"user\" (geo_cell)"))
+
+
+def add_retention_indexes(conn):
+    # The janitor finds old and expired rows by these columns; trial_match is
+    # also looked up by trial alone when a trial is matched or archived.
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_booking_created_at ON booking (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_trial_match_trial_id ON trial_match (trial_id)",
+        "CREATE INDEX IF NOT EXISTS ix_teacher_event_created_at ON teacher_event (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_auth_session_expires_at ON auth_session (expires_at)",
+        "CREATE INDEX IF NOT EXISTS ix_password_reset_token_expires_at ON password_reset_token (expires_at)",
+    ]:
+        conn.execute(text(statement))
+
+
+def add_skill_prefix_index(conn):
+    # The catalog's subject filter also matches teacher skills by prefix.
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_teacher_skill_name_lower ON teacher_skill (lower(name), teacher_id)")
+    )
+
+
+def analyze(conn):
+    conn.execute(text("ANALYZE"))
+
+
+MIGRATIONS = [
+    (1, "legacy trial_request.user_id and booking.phone columns", add_legacy_columns),
+    (2, "catalog filter indexes", add_catalog_indexes),
+    (3, "tutor search index", search.ensure_index),
+    (4, "teacher trial matches", matching.ensure_matches),
+    (5, "catalog version row", create_catalog_version),
+    (6, "foreign key and created_at indexes", add_foreign_key_indexes),
+    (7, "planner statistics", analyze),
+    (8, "structured price columns", add_structured_prices),
+    (9, "planner statistics for price indexes", analyze),
+    (10, "user profile version", add_profile_version),
+    (11, "teacher stats rollup", stats.ensure_stats),
+    (12, "tutor and teacher locations", add_locations),
+    (13, "planner statistics for location indexes", analyze),
+    (14, "retention indexes", add_retention_indexes),
+    (15, "planner statistics for retention indexes", analyze),
+    (16, "teacher skill prefix index", add_skill_prefix_index),
+]
@@ -0,0 +1,101 @@
+"""Password hashing on a bounded worker pool.
+
+Hashing is CPU-bound, so it runs on a process pool (or a thread pool, since
+hashlib releases the GIL) capped at ``EDUGLOW_HASH_QUEUE`` in-flight jobs.
+Past that cap callers get ``HashingBusy`` immediately instead of queueing,
+as do callers whose job outlives ``EDUGLOW_HASH_TIMEOUT``; the app turns
+that into a 503 with ``Retry-After``.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+# Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+HASH_METHOD = os.environ.get("EDUGLOW_PASSWORD_METHOD", "scrypt:32768:8:1")
+# "process", "thread" or "inline" (no pool, no backpressure).
+EXECUTOR = os.environ.get("EDUGLOW_HASH_EXECUTOR", "process")
+WORKERS = int(os.environ.get("EDUGLOW_HASH_WORKERS", str(os.cpu_count() or 2)))
+MAX_PENDING = int(os.environ.get("EDUGLOW_HASH_QUEUE", str(WORKERS * 4)))
+TIMEOUT = float(os.environ.get("EDUGLOW_HASH_TIMEOUT", "10"))
+RETRY_AFTER = 1
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def canonical_method(method):
+    """The prefix werkzeug stores for ``method``, defaults filled in ("scrypt" -> "scrypt:32768:8:1")."""
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        args = [str(2**15), "8", "1"]
+    elif name == "pbkdf2" and len(args) < 2:
+        args = [args[0] if args else "sha256", str(DEFAULT_PBKDF2_ITERATIONS)]
+    return ":".join([name, *args])
+
+
+HASH_PREFIX = canonical_method(HASH_METHOD)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _executor():
+    # Created lazily so each forked gunicorn worker gets its own pool.
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if EXECUTOR == "thread":
+                _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="password-hash")
+            else:
+                _pool = ProcessPoolExecutor(max_workers=WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _run(fn, *args):
+    if EXECUTOR == "inline":
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        future = _executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=TIMEOUT)
+    except TimeoutError:
+        # The job keeps its slot until it finishes; the caller is told to retry.
+        raise HashingBusy() from None
+    except BrokenProcessPool:
+        # A pool worker died; start a fresh pool for the next caller.
+        _reset_pool()
+        raise
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    return _run(check_password_hash, stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    return stored_hash.split("$", 1)[0] != HASH_PREFIX
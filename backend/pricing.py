@@ -0,0 +1,33 @@
+"""Parse free-form price strings such as ``"INR 600/hr"`` into columns."""
+
+import re
+
+
+DEFAULT_CURRENCY = "INR"
+DEFAULT_UNIT = "hr"
+CURRENCY_SYMBOLS = {"₹": "INR", "RS": "INR", "RS.": "INR", "$": "USD", "€": "EUR", "£": "GBP"}
+UNIT_ALIASES = {"h": "hr", "hour": "hr", "hours": "hr", "hrs": "hr", "session": "session", "class": "session"}
+
+_PRICE_RE = re.compile(
+    r"^\s*(?P<currency>[A-Za-z]{1,3}\.?|[^\w\s\d])?\s*"
+    r"(?P<amount>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?:(?:/|per)\s*(?P<unit>[A-Za-z]+))?",
+    re.IGNORECASE,
+)
+
+
+def parse_price(value):
+    """Return ``(amount, currency, unit)``; ``amount`` is None when no number is found."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = format(value, "f")  # a bare JSON number, in the default currency and unit
+    if not isinstance(value, str):
+        return None, None, None
+    match = _PRICE_RE.match(value)
+    if not match:
+        return None, None, None
+    amount = float(match.group("amount").replace(",", ""))
+    currency = (match.group("currency") or DEFAULT_CURRENCY).upper()
+    currency = CURRENCY_SYMBOLS.get(currency, currency)
+    unit = (match.group("unit") or DEFAULT_UNIT).lower()
+    unit = UNIT_ALIASES.get(unit, unit)
+    return amount, currency, unit
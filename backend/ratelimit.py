@@ -0,0 +1,182 @@
+"""Token-bucket rate limits and concurrency caps for abusable routes.
+
+A limit is a list of rules such as ``ip:20/60``: a bucket of 20 tokens per
+client IP, refilled evenly over 60 seconds. The scope is ``ip``, ``account``
+(the email being logged in to, or the signed-in user) or ``route`` (one
+bucket for everyone). A request takes a token from every bucket that
+applies, or from none of them; while any is empty the caller gets
+``RateLimited`` with the seconds until it refills, which the app turns into
+a 429 with ``Retry-After``.
+
+Buckets are kept per process by default. With ``EDUGLOW_RATE_LIMIT_URL``
+(``redis://``) they are shared by every worker, and one Lua script checks
+and takes all of a request's tokens atomically.
+
+``ConcurrencyCap`` bounds how many requests of one kind run at once in a
+process; past it callers get ``Busy`` (a 503) immediately instead of
+queueing behind the slow ones.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+SCOPES = ("ip", "account", "route")
+# name -> rules; EDUGLOW_RATE_LIMIT_<NAME> overrides one, EDUGLOW_RATE_LIMITS=off disables them all.
+DEFAULT_LIMITS = {
+    "login": "ip:30/60,account:10/300",
+    "register": "ip:10/600",
+    "forgot": "ip:5/600,account:3/3600",
+    "reset": "ip:10/600",
+    "trials": "ip:10/600,account:10/600,route:300/60",
+    "bookings": "ip:30/600,account:30/600",
+}
+# name -> in-flight requests per process; EDUGLOW_CONCURRENCY_<NAME> overrides.
+DEFAULT_CONCURRENCY = {"password": 32, "email": 8}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class Busy(Exception):
+    retry_after = 1
+
+
+def parse_rules(spec):
+    """``"ip:10/60,route:100/1"`` -> ``[("ip", 10, 60.0), ("route", 100, 1.0)]``; raises ValueError."""
+    rules = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        scope, _, quota = part.partition(":")
+        burst, _, period = quota.partition("/")
+        if scope not in SCOPES:
+            raise ValueError(f"unknown rate limit scope {scope!r} in {spec!r}")
+        burst, period = int(burst), float(period)
+        if burst < 1 or not period > 0:
+            raise ValueError(f"rate limit {part!r} must allow at least 1 request per positive period")
+        rules.append((scope, burst, period))
+    return rules
+
+
+class MemoryStore:
+    def __init__(self, max_buckets=100_000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Take one token from each ``(key, burst, period)`` bucket; returns 0 or the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            levels, wait = [], 0.0
+            for key, burst, period in buckets:
+                rate = burst / period
+                tokens, updated = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+            if wait:
+                return wait
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            # Least recently used buckets go first; a forgotten bucket is simply full again.
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+_TAKE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local burst, period = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local rate = burst / period
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+    levels[i] = tokens
+    if tokens < 1 then wait = math.max(wait, (1 - tokens) / rate) end
+end
+if wait > 0 then return tostring(wait) end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(tonumber(ARGV[2 * i])))
+end
+return '0'
+"""
+
+
+class RedisStore:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("redis package required for EDUGLOW_RATE_LIMIT_URL") from exc
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, buckets):
+        args = [value for _, burst, period in buckets for value in (burst, period)]
+        return float(self._take(keys=[key for key, _, _ in buckets], args=args))
+
+
+def make_store(url=None):
+    url = url if url is not None else os.environ.get("EDUGLOW_RATE_LIMIT_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    return MemoryStore()
+
+
+class RateLimiter:
+    def __init__(self, store=None, limits=None, enabled=True):
+        self.store = store if store is not None else MemoryStore()
+        self.limits = {name: parse_rules(spec) for name, spec in (limits or {}).items()}
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls):
+        limits = {
+            name: os.environ.get(f"EDUGLOW_RATE_LIMIT_{name.upper()}", spec) for name, spec in DEFAULT_LIMITS.items()
+        }
+        return cls(make_store(), limits, enabled=os.environ.get("EDUGLOW_RATE_LIMITS", "on") != "off")
+
+    def check(self, name, ip, account=None):
+        """Spend one request of limit ``name``; raises ``RateLimited`` when a bucket is empty."""
+        if not self.enabled:
+            return
+        keys = {"ip": ip, "account": account, "route": ""}
+        buckets = [
+            (f"ratelimit:{name}:{scope}:{keys[scope]}", burst, period)
+            for scope, burst, period in self.limits.get(name, ())
+            if keys[scope] is not None
+        ]
+        if buckets:
+            wait = self.store.take(buckets)
+            if wait:
+                raise RateLimited(max(math.ceil(wait), 1))
+
+
+class ConcurrencyCap:
+    def __init__(self, limit):
+        self._slots = threading.BoundedSemaphore(limit)
+
+    @classmethod
+    def from_env(cls, name):
+        return cls(int(os.environ.get(f"EDUGLOW_CONCURRENCY_{name.upper()}", str(DEFAULT_CONCURRENCY[name]))))
+
+    def __enter__(self):
+        if not self._slots.acquire(blocking=False):
+            raise Busy()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
@@ -0,0 +1,294 @@
+"""Tutor recommendations for students, scored with NumPy.
+
+``CatalogIndex`` holds every tutor and teacher as one row of per-process
+arrays (rating, price, location) plus an inverted index from subject and
+skill terms to rows. It is loaded once per worker and then refreshed
+incrementally whenever the catalog version moves. New tutors are appended,
+and only teachers whose ``profile_version`` changed are re-read. A refresh
+builds a new ``Snapshot`` and swaps it in, so scoring never takes a lock.
+
+A student's profile is read per request with two indexed queries: terms
+from their trial requests and bookings, the teachers they booked and the
+prices they paid. Scoring is a handful of array operations over the whole
+catalog, and ``argpartition`` picks the top k without sorting the rest.
+"""
+
+import math
+import threading
+from dataclasses import dataclass, field
+
+from sqlalchemy import bindparam, text
+
+import geo
+
+try:
+    import numpy as np
+except ImportError:  # optional: recommendations report themselves unavailable
+    np = None
+
+
+KIND_TUTOR = 0
+KIND_TEACHER = 1
+# score = sum of weight * component, each component in 0..1
+WEIGHTS = {"interest": 3.0, "rating": 1.0, "price": 0.5, "distance": 1.0}
+DISTANCE_SCALE_KM = 25.0
+MAX_TERM_WORDS = 4
+HISTORY_LIMIT = 50
+# Older trial requests and bookings count for less: weight * RECENCY_DECAY ** position.
+RECENCY_DECAY = 0.9
+BOOKING_WEIGHT = 2.0
+LOAD_CHUNK = 500
+
+
+def normalize(value):
+    # Same normalization as matching.normalize, so terms line up with trial matches.
+    return " ".join((value or "").lower().split())
+
+
+@dataclass
+class Profile:
+    terms: dict = field(default_factory=dict)  # term id -> weight
+    booked_rows: list = field(default_factory=list)
+    reference_price: float = None
+
+
+@dataclass
+class Snapshot:
+    kinds: object
+    ids: object
+    rating: object
+    price: object
+    latitude: object
+    longitude: object
+    positions: dict  # (kind, id) -> row
+    row_terms: list  # row -> frozenset of term ids
+    postings: dict  # term id -> array of rows
+    vocabulary: dict  # term -> term id
+    teacher_versions: dict  # teacher id -> profile_version
+    max_tutor_id: int = 0
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty(0, np.int8), np.empty(0, np.int64), *(np.empty(0) for _ in range(4)), {}, [], {}, {}, {}, 0
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CatalogIndex:
+    def __init__(self, default_rating=4.5, default_price=None):
+        self.default_rating = default_rating
+        self.default_price = default_price
+        self.version = None
+        self.snapshot = None
+        self._lock = threading.Lock()
+
+    def upsert(self, entries, teacher_versions=None):
+        """Add or replace ``(kind, id, rating, price, latitude, longitude, terms)`` entries in a new snapshot."""
+        if np is None:
+            raise RuntimeError("numpy package required for recommendations")
+        old = self.snapshot or Snapshot.empty()
+        positions, row_terms, vocabulary = dict(old.positions), list(old.row_terms), dict(old.vocabulary)
+        columns = [old.rating.copy(), old.price.copy(), old.latitude.copy(), old.longitude.copy()]
+        new_kinds, new_ids, new_values = [], [], []
+        added, removed = {}, {}  # term id -> rows
+        max_tutor_id = old.max_tutor_id
+        for kind, entry_id, rating, price, latitude, longitude, terms in entries:
+            term_ids = frozenset(vocabulary.setdefault(term, len(vocabulary)) for term in terms if term)
+            values = (rating, price, latitude, longitude)
+            row = positions.get((kind, entry_id))
+            if row is None:
+                row = len(old) + len(new_ids)
+                positions[(kind, entry_id)] = row
+                row_terms.append(frozenset())
+                new_kinds.append(kind)
+                new_ids.append(entry_id)
+                new_values.append(values)
+            elif row < len(old):
+                for column, value in zip(columns, values):
+                    column[row] = value
+            else:
+                new_values[row - len(old)] = values
+            for term_id in row_terms[row] - term_ids:
+                removed.setdefault(term_id, []).append(row)
+            for term_id in term_ids - row_terms[row]:
+                added.setdefault(term_id, []).append(row)
+            row_terms[row] = term_ids
+            if kind == KIND_TUTOR:
+                max_tutor_id = max(max_tutor_id, entry_id)
+        if new_ids:
+            appended = np.array(new_values, dtype=float).reshape(-1, 4)
+            columns = [np.concatenate([column, appended[:, i]]) for i, column in enumerate(columns)]
+        postings = dict(old.postings)
+        for term_id in removed.keys() | added.keys():
+            rows = postings.get(term_id, np.empty(0, np.int64))
+            if term_id in removed:
+                rows = rows[~np.isin(rows, removed[term_id])]
+            if term_id in added:
+                rows = np.concatenate([rows, np.array(added[term_id], dtype=np.int64)])
+            postings[term_id] = rows
+        self.snapshot = Snapshot(
+            np.concatenate([old.kinds, np.array(new_kinds, dtype=np.int8)]),
+            np.concatenate([old.ids, np.array(new_ids, dtype=np.int64)]),
+            *columns,
+            positions=positions,
+            row_terms=row_terms,
+            postings=postings,
+            vocabulary=vocabulary,
+            teacher_versions={**old.teacher_versions, **(teacher_versions or {})},
+            max_tutor_id=max_tutor_id,
+        )
+
+    def sync(self, conn, version):
+        """Bring the index up to catalog ``version``; only the first call per worker loads everything."""
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            if np is None:
+                raise RuntimeError("numpy package required for recommendations")
+            snapshot = self.snapshot or Snapshot.empty()
+            entries = list(self._tutors(conn, snapshot.max_tutor_id))
+            versions = dict(conn.execute(text("SELECT id, profile_version FROM \"user\" WHERE role = 'teacher'")).all())
+            changed = [tid for tid, v in versions.items() if snapshot.teacher_versions.get(tid) != v]
+            if self.snapshot is None:
+                entries.extend(self._teachers(conn))
+            else:
+                for start in range(0, len(changed), LOAD_CHUNK):
+                    entries.extend(self._teachers(conn, changed[start:start + LOAD_CHUNK]))
+            if entries or self.snapshot is None:
+                self.upsert(entries, {tid: versions[tid] for tid in changed})
+            self.version = version
+
+    def _tutors(self, conn, after_id):
+        rows = conn.execute(
+            text(
+                "SELECT id, rating, price_amount, latitude, longitude, subject FROM tutor WHERE id > :after ORDER BY id"
+            ),
+            {"after": after_id},
+        )
+        for tutor_id, rating, price, latitude, longitude, subject in rows:
+            yield KIND_TUTOR, tutor_id, rating, price, latitude, longitude, [normalize(subject)]
+
+    def _teachers(self, conn, ids=None):
+        # ids=None loads every teacher (first sync); otherwise just those teachers.
+        where = "role = 'teacher'" + (" AND id IN :ids" if ids is not None else "")
+        skill_where = "" if ids is None else "WHERE teacher_id IN :ids"
+        params = {"rating": self.default_rating, "price": self.default_price}
+        query = text(
+            "SELECT id, coalesce(rating, :rating), coalesce(price_amount, :price), latitude, longitude, subject "
+            f"FROM \"user\" WHERE {where}"
+        )
+        skills_query = text(f"SELECT teacher_id, name FROM teacher_skill {skill_where}")
+        if ids is not None:
+            query = query.bindparams(bindparam("ids", expanding=True))
+            skills_query = skills_query.bindparams(bindparam("ids", expanding=True))
+            params["ids"] = ids
+        skills = {}
+        for teacher_id, name in conn.execute(skills_query, {"ids": ids} if ids is not None else {}):
+            skills.setdefault(teacher_id, []).append(normalize(name))
+        for teacher_id, rating, price, latitude, longitude, subject in conn.execute(query, params):
+            terms = [normalize(subject), *skills.get(teacher_id, ())]
+            yield KIND_TEACHER, teacher_id, rating, price, latitude, longitude, terms
+
+    def match_terms(self, value, snapshot=None):
+        """Term ids of every known subject or skill phrase in ``value`` (whole words, up to MAX_TERM_WORDS)."""
+        vocabulary = (snapshot or self.snapshot).vocabulary
+        words = normalize(value).split()
+        found = set()
+        for size in range(1, min(MAX_TERM_WORDS, len(words)) + 1):
+            for start in range(len(words) - size + 1):
+                term_id = vocabulary.get(" ".join(words[start:start + size]))
+                if term_id is not None:
+                    found.add(term_id)
+        return found
+
+    def profile(self, trial_subjects, bookings, snapshot=None):
+        """Profile from trial subjects and ``(teacher_id, subject, price)`` bookings, newest first."""
+        snapshot = snapshot or self.snapshot
+        profile = Profile()
+
+        def add(term_ids, weight):
+            for term_id in term_ids:
+                profile.terms[term_id] = profile.terms.get(term_id, 0.0) + weight
+
+        for position, subject in enumerate(trial_subjects):
+            add(self.match_terms(subject, snapshot), RECENCY_DECAY ** position)
+        prices = []
+        for position, (teacher_id, subject, price) in enumerate(bookings):
+            weight = RECENCY_DECAY ** position
+            add(self.match_terms(subject, snapshot), BOOKING_WEIGHT * weight)
+            row = snapshot.positions.get((KIND_TEACHER, teacher_id))
+            if row is not None:
+                profile.booked_rows.append(row)
+                add(snapshot.row_terms[row], weight)
+            if price:
+                prices.append(price)
+        if prices:
+            profile.reference_price = sorted(prices)[len(prices) // 2]
+        return profile
+
+    def student_profile(self, conn, student_id, snapshot=None):
+        trials = conn.execute(
+            text("SELECT subject FROM trial_request WHERE user_id = :id ORDER BY created_at DESC LIMIT :limit"),
+            {"id": student_id, "limit": HISTORY_LIMIT},
+        ).scalars().all()
+        bookings = conn.execute(
+            text(
+                "SELECT b.teacher_id, b.subject, u.price_amount FROM booking b "
+                "LEFT JOIN \"user\" u ON u.id = b.teacher_id "
+                "WHERE b.student_id = :id ORDER BY b.created_at DESC LIMIT :limit"
+            ),
+            {"id": student_id, "limit": HISTORY_LIMIT},
+        ).all()
+        return self.profile(trials, bookings, snapshot)
+
+    def scores(self, profile, latitude=None, longitude=None, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        interest = np.zeros(len(snapshot))
+        total = sum(profile.terms.values())
+        for term_id, weight in profile.terms.items():
+            rows = snapshot.postings.get(term_id)
+            if rows is not None:
+                interest[rows] += weight / total
+        score = WEIGHTS["interest"] * interest
+        score += WEIGHTS["rating"] * np.clip((np.nan_to_num(snapshot.rating, nan=3.5) - 3.5) / 1.5, 0.0, 1.0)
+        price = snapshot.price
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if profile.reference_price:
+                fit = np.exp(-np.abs(np.log(price / profile.reference_price)))
+            else:
+                low, high = np.nanmin(price, initial=np.inf), np.nanmax(price, initial=-np.inf)
+                fit = (high - price) / (high - low) if high > low else np.ones_like(price)
+        score += WEIGHTS["price"] * np.nan_to_num(fit, nan=0.5, posinf=0.5, neginf=0.5)
+        if latitude is not None and longitude is not None:
+            north = (snapshot.latitude - latitude) * geo.KM_PER_DEGREE
+            east = (snapshot.longitude - longitude) * geo.KM_PER_DEGREE * math.cos(math.radians(latitude))
+            nearness = np.exp(-np.sqrt(north * north + east * east) / DISTANCE_SCALE_KM)
+            score += WEIGHTS["distance"] * np.nan_to_num(nearness, nan=0.0)
+        if profile.booked_rows:
+            score[profile.booked_rows] = -np.inf
+        return score
+
+    def top(self, profile, limit, latitude=None, longitude=None, snapshot=None):
+        """``[(kind, id, score), ...]`` of the ``limit`` best entries, best first."""
+        snapshot = snapshot or self.snapshot
+        score = self.scores(profile, latitude, longitude, snapshot)
+        count = min(limit, len(score))
+        if count == 0:
+            return []
+        best = np.argpartition(score, len(score) - count)[len(score) - count:]
+        best = best[np.argsort(-score[best], kind="stable")]
+        return [
+            (int(snapshot.kinds[row]), int(snapshot.ids[row]), round(float(score[row]), 4))
+            for row in best
+            if np.isfinite(score[row])
+        ]
+
+    def recommend(self, conn, student_id, limit, latitude=None, longitude=None):
+        snapshot = self.snapshot
+        profile = self.student_profile(conn, student_id, snapshot)
+        return self.top(profile, limit, latitude, longitude, snapshot)
@@ -0,0 +1,240 @@
+"""Retention janitor: expire, archive and compact the hot tables.
+
+Each pass
+- deletes expired password reset tokens and login sessions, dashboard
+  events older than ``events`` days and sent or failed outbox emails older
+  than ``emails`` days;
+- moves trial requests (with their matches) and bookings older than
+  ``archive`` days into ``*_archive`` tables in the same database, so the
+  dashboards' list queries only ever walk recent rows;
+- gives the freed pages back (SQLite incremental vacuum) and refreshes
+  planner statistics (``PRAGMA optimize`` / ``ANALYZE``).
+
+Work is done in transactions of at most ``batch_size`` rows with a short
+pause between them, so a pass never holds SQLite's write lock for long.
+Copies use ``ON CONFLICT DO NOTHING`` and every step is safe to repeat. The
+newest row of ``trial_request``, ``booking`` and ``teacher_event`` is always
+kept: SQLite hands out ``max(id) + 1``, and ids must never be reused while
+archived rows or ``Last-Event-ID`` cursors still refer to them.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text
+
+import metrics
+from database import dialect_name
+
+
+log = logging.getLogger(__name__)
+
+# name -> days kept; EDUGLOW_RETENTION_<NAME>_DAYS overrides, 0 keeps rows forever.
+DEFAULT_RETENTION_DAYS = {"archive": 365, "events": 7, "emails": 30}
+BATCH_SIZE = 500
+VACUUM_PAGES = 1000
+
+# table -> (condition on :cutoff, retention name; None means the cutoff is now)
+PURGES = {
+    "password_reset_token": ("expires_at < :cutoff", None),
+    "auth_session": ("expires_at < :cutoff", None),
+    "teacher_event": ("created_at < :cutoff", "events"),
+    "email_outbox": ("status IN ('sent', 'failed') AND created_at < :cutoff", "emails"),
+}
+# Tables whose newest row must survive a purge (see above).
+KEEP_NEWEST = {"teacher_event", "trial_request", "booking"}
+
+TRIAL_COLUMNS = ("id", "name", "phone", "subject", "user_id", "created_at")
+MATCH_COLUMNS = ("teacher_id", "trial_id", "created_at")
+BOOKING_COLUMNS = ("id", "student_id", "teacher_id", "subject", "price", "phone", "status", "created_at")
+# hot table -> (archive table, columns, dependents moved first as (table, archive, columns, key))
+ARCHIVES = {
+    "trial_request": (
+        "trial_request_archive", TRIAL_COLUMNS, [("trial_match", "trial_match_archive", MATCH_COLUMNS, "trial_id")]
+    ),
+    "booking": ("booking_archive", BOOKING_COLUMNS, []),
+}
+ANALYZE_TABLES = ("trial_request", "trial_match", "booking", "teacher_event", "auth_session", "email_outbox")
+
+
+def _ids_query(table, where, order_by="id"):
+    keep = f" AND id < (SELECT max(id) FROM {table})" if table in KEEP_NEWEST else ""
+    return text(f"SELECT id FROM {table} WHERE {where}{keep} ORDER BY {order_by} LIMIT :limit")
+
+
+def _in_ids(sql):
+    return text(sql).bindparams(bindparam("ids", expanding=True))
+
+
+def purge_batch(conn, table, cutoff, batch_size):
+    """Delete up to ``batch_size`` rows of ``table`` past ``cutoff``; returns how many went."""
+    ids = conn.execute(_ids_query(table, PURGES[table][0]), {"cutoff": cutoff, "limit": batch_size}).scalars().all()
+    if ids:
+        conn.execute(_in_ids(f"DELETE FROM {table} WHERE id IN :ids"), {"ids": ids})
+    return len(ids)
+
+
+def _move(conn, table, archive, columns, key, ids, now):
+    names = ", ".join(columns)
+    conn.execute(
+        _in_ids(
+            f"INSERT INTO {archive} ({names}, archived_at) SELECT {names}, :now FROM {table} "
+            f"WHERE {key} IN :ids ON CONFLICT DO NOTHING"
+        ),
+        {"ids": ids, "now": now},
+    )
+    conn.execute(_in_ids(f"DELETE FROM {table} WHERE {key} IN :ids"), {"ids": ids})
+
+
+def archive_batch(conn, table, before, now, batch_size):
+    """Move up to ``batch_size`` rows created before ``before`` (and their dependents) to the archive."""
+    archive, columns, dependents = ARCHIVES[table]
+    ids = conn.execute(
+        _ids_query(table, "created_at < :before", order_by="created_at"), {"before": before, "limit": batch_size}
+    ).scalars().all()
+    if ids:
+        for child, child_archive, child_columns, key in dependents:
+            _move(conn, child, child_archive, child_columns, key, ids, now)
+        _move(conn, table, archive, columns, "id", ids, now)
+    return len(ids)
+
+
+class Janitor:
+    def __init__(
+        self,
+        engine,
+        retention_days=None,
+        batch_size=BATCH_SIZE,
+        interval=3600.0,
+        pause=0.05,
+        vacuum_pages=VACUUM_PAGES,
+    ):
+        self.engine = engine
+        self.retention_days = {**DEFAULT_RETENTION_DAYS, **(retention_days or {})}
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, engine):
+        days = {
+            name: float(os.environ.get(f"EDUGLOW_RETENTION_{name.upper()}_DAYS", str(default)))
+            for name, default in DEFAULT_RETENTION_DAYS.items()
+        }
+        return cls(
+            engine,
+            days,
+            batch_size=int(os.environ.get("EDUGLOW_RETENTION_BATCH", str(BATCH_SIZE))),
+            interval=float(os.environ.get("EDUGLOW_JANITOR_INTERVAL", "3600")),
+            vacuum_pages=int(os.environ.get("EDUGLOW_VACUUM_PAGES", str(VACUUM_PAGES))),
+        )
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="retention-janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self, delay=None):
+        # Workers start together; a random first delay keeps their passes apart.
+        delay = random.uniform(0.1, 1.0) * self.interval if delay is None else delay
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception:
+                log.exception("retention pass failed")
+            delay = self.interval
+
+    def cutoff(self, name, now):
+        if name is None:
+            return now
+        days = self.retention_days[name]
+        return now - timedelta(days=days) if days > 0 else None
+
+    def _batches(self, step):
+        total = 0
+        while not self._stop.is_set():
+            with self.engine.begin() as conn:
+                count = step(conn)
+            total += count
+            if count < self.batch_size:
+                break
+            time.sleep(self.pause)
+        return total
+
+    def run_once(self):
+        """One full pass; returns ``{"<action> <table>": rows}`` plus the vacuumed page count."""
+        now = datetime.utcnow()
+        counts = {}
+        for table, (_, name) in PURGES.items():
+            cutoff = self.cutoff(name, now)
+            if cutoff is None:
+                continue
+            counts[f"purged {table}"] = count = self._batches(
+                lambda conn: purge_batch(conn, table, cutoff, self.batch_size)
+            )
+            metrics.RETENTION_ROWS.inc(count, table=table, action="purged")
+        before = self.cutoff("archive", now)
+        if before is not None:
+            for table in ARCHIVES:
+                counts[f"archived {table}"] = count = self._batches(
+                    lambda conn: archive_batch(conn, table, before, now, self.batch_size)
+                )
+                metrics.RETENTION_ROWS.inc(count, table=table, action="archived")
+        counts["vacuumed pages"] = self.compact()
+        log.info("retention pass: %s", counts)
+        return counts
+
+    def compact(self):
+        """Release free pages in steps of ``vacuum_pages`` and refresh planner statistics."""
+        freed = 0
+        with self.engine.connect() as conn:
+            if dialect_name(conn) != "sqlite":
+                # PostgreSQL reclaims space with autovacuum; only the statistics need a nudge.
+                conn.execute(text(f"ANALYZE {', '.join(ANALYZE_TABLES)}"))
+                conn.commit()
+                return 0
+            # Only databases created (or VACUUMed) with auto_vacuum=INCREMENTAL can give pages back.
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+                free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                while freed < free and not self._stop.is_set():
+                    step = min(free - freed, self.vacuum_pages)
+                    # The pragma frees one page per sqlite3_step; executescript steps it
+                    # to the end, where cursor.execute would stop after the first page.
+                    conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({step});")
+                    freed += step
+                    time.sleep(self.pause)
+            conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+            conn.exec_driver_sql("PRAGMA optimize")
+            conn.commit()
+        return freed
+
+
+def enable_incremental_vacuum(engine):
+    """Switch an existing SQLite file to incremental auto-vacuum; rewrites the whole file under an exclusive lock."""
+    with engine.connect() as conn:
+        if dialect_name(conn) != "sqlite":
+            return False
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.commit()
+        conn.exec_driver_sql("VACUUM")
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
@@ -0,0 +1,150 @@
+"""Full-text index over the tutor catalog.
+
+SQLite uses an FTS5 table, PostgreSQL a GIN-indexed ``tsvector`` table.
+Each catalog entry gets one row keyed by ``id * 2 + kind`` so a tutor or
+teacher can be replaced with a single key lookup. Writers call
+``index_tutor``/``index_teacher`` inside their own transaction so the index
+never drifts from the base tables.
+"""
+
+import re
+
+from sqlalchemy import text
+
+from database import dialect_name
+
+
+SEARCH_TABLE = "tutor_search"
+KIND_TUTOR = 0
+KIND_TEACHER = 1
+# bm25 weights for name, subject, level, city, skills
+RANK_WEIGHTS = (5.0, 3.0, 1.0, 1.0, 2.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_TUTOR_SOURCE = f"""
+    SELECT id * 2 + {KIND_TUTOR} AS doc_id, name, subject, level, city, '' AS skills
+    FROM tutor
+"""
+
+_TEACHER_SOURCE = f"""
+    SELECT u.id * 2 + {KIND_TEACHER} AS doc_id,
+           coalesce(u.name, '') AS name,
+           coalesce(u.subject, '') AS subject,
+           '' AS level,
+           coalesce(u.city, '') AS city,
+           coalesce((SELECT {{skills}} FROM teacher_skill s WHERE s.teacher_id = u.id), '') AS skills
+    FROM "user" u
+    WHERE u.role = 'teacher'
+"""
+
+_POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', src.name), 'A') || "
+    "setweight(to_tsvector('simple', src.subject), 'B') || "
+    "setweight(to_tsvector('simple', src.skills), 'B') || "
+    "setweight(to_tsvector('simple', src.level || ' ' || src.city), 'C')"
+)
+
+
+def _postgres(conn):
+    return dialect_name(conn) == "postgresql"
+
+
+def _key_column(conn):
+    return "doc_id" if _postgres(conn) else "rowid"
+
+
+def _insert(conn, source):
+    if _postgres(conn):
+        source = source.format(skills="string_agg(s.name, ' ')")
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (doc_id, document) "
+            f"SELECT src.doc_id, {_POSTGRES_DOCUMENT} FROM ({source}) src"
+        )
+    source = source.format(skills="group_concat(s.name, ' ')")
+    return f"INSERT INTO {SEARCH_TABLE} (rowid, name, subject, level, city, skills) {source}"
+
+
+def ensure_index(conn):
+    if _postgres(conn):
+        conn.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (doc_id BIGINT PRIMARY KEY, document TSVECTOR NOT NULL)")
+        )
+        conn.execute(
+            text(f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)")
+        )
+    else:
+        conn.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "name, subject, level, city, skills, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+            )
+        )
+    if conn.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar() == 0:
+        rebuild(conn)
+
+
+def rebuild(conn):
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    conn.execute(text(_insert(conn, _TUTOR_SOURCE)))
+    conn.execute(text(_insert(conn, _TEACHER_SOURCE)))
+
+
+def index_tutor(conn, tutor_id):
+    key = _key_column(conn)
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :key"), {"key": tutor_id * 2 + KIND_TUTOR})
+    conn.execute(text(_insert(conn, _TUTOR_SOURCE + " WHERE id = :id")), {"id": tutor_id})
+
+
+def index_tutors_after(conn, last_id):
+    # Bulk imports: every tutor above ``last_id`` is new, so there is nothing to delete first.
+    conn.execute(text(_insert(conn, _TUTOR_SOURCE + " WHERE id > :id")), {"id": last_id})
+
+
+def index_teacher(conn, teacher_id):
+    key = _key_column(conn)
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :key"), {"key": teacher_id * 2 + KIND_TEACHER})
+    conn.execute(text(_insert(conn, _TEACHER_SOURCE + " AND u.id = :id")), {"id": teacher_id})
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+def match_expression(query):
+    # Every word must match, the last one (still being typed) as a prefix.
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return " AND ".join(terms)
+
+
+def tsquery_expression(query):
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+    return " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+
+
+def search(conn, query, limit, offset=0):
+    """Return ``[(kind, id), ...]`` for the best matches, best first."""
+    if _postgres(conn):
+        expression = tsquery_expression(query)
+        sql = (
+            f"SELECT doc_id FROM {SEARCH_TABLE}, to_tsquery('simple', :expression) q "
+            "WHERE document @@ q ORDER BY ts_rank(document, q) DESC, doc_id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        expression = match_expression(query)
+        weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :expression "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT :limit OFFSET :offset"
+        )
+    if expression is None:
+        return []
+    rows = conn.execute(text(sql), {"expression": expression, "limit": limit, "offset": offset}).all()
+    return [(row[0] % 2, row[0] // 2) for row in rows]
@@ -0,0 +1,88 @@
+"""JSON encoding and row serializers for list endpoints.
+
+List queries select only the columns a response needs, as plain rows, and
+``row_serializer`` turns each row into its JSON object with one precomputed
+``dict(zip(...))``. Timestamps are selected as the database's own text
+(``timestamp_text``) and only reformatted, which skips parsing a
+``datetime`` per row just to print it again.
+
+``install`` swaps Flask's JSON provider for ``OrjsonProvider`` when orjson
+is importable (``EDUGLOW_JSON``: ``auto`` (default), ``orjson`` or
+``stdlib``). Output is the same JSON, without the stdlib's ASCII escaping.
+"""
+
+import os
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import String, cast
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib provider is used instead
+    orjson = None
+
+
+def timestamp_text(column):
+    # "YYYY-MM-DD HH:MM:SS[.ffffff]" on SQLite and PostgreSQL alike.
+    return cast(column, String)
+
+
+def utc_timestamp(value):
+    """Timestamp text as ISO-8601 UTC, the format the API has always returned."""
+    return f"{value.replace(' ', 'T')}Z" if value else value
+
+
+def row_serializer(fields, timestamps=("created_at",)):
+    """Row -> dict for rows selected as ``fields`` in order; trailing extra columns are ignored."""
+    fields = tuple(fields)
+    positions = [fields.index(name) for name in timestamps if name in fields]
+    if not positions:
+        return lambda row: dict(zip(fields, row))
+
+    def serialize(row):
+        values = list(row)
+        for position in positions:
+            values[position] = utc_timestamp(values[position])
+        return dict(zip(fields, values))
+
+    return serialize
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """``DefaultJSONProvider`` on orjson; anything orjson cannot encode goes through Flask's ``default``."""
+
+    # Dates and dataclasses keep Flask's encoding (HTTP dates, asdict) rather than orjson's.
+    base_options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def _options(self, indent=False):
+        options = self.base_options
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def install(app, name=None):
+    """Use orjson for ``jsonify`` and ``request.get_json`` when available; returns the provider name."""
+    name = name or os.environ.get("EDUGLOW_JSON", "auto")
+    if name not in {"auto", "orjson", "stdlib"}:
+        raise RuntimeError("EDUGLOW_JSON must be auto, orjson or stdlib")
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("orjson package required for EDUGLOW_JSON=orjson")
+    if name == "stdlib" or orjson is None:
+        return "stdlib"
+    app.json = OrjsonProvider(app)
+    return "orjson"
@@ -0,0 +1,53 @@
+"""Server-side login sessions and the cached principal behind them.
+
+The signed cookie only carries an opaque session id. Each authenticated
+request checks that id against ``auth_session`` with one primary-key join,
+so logout and password resets revoke access immediately on every worker.
+The user's public profile and skills are cached per ``(user_id,
+profile_version)``; writers bump ``profile_version`` so stale snapshots are
+never read, whichever worker or store served them.
+"""
+
+import json
+import os
+
+from cache import make_backend
+
+
+class Principal:
+    def __init__(self, user, skills=None):
+        self.user = user
+        self.skills = skills or []
+
+    @property
+    def id(self):
+        return self.user["id"]
+
+    @property
+    def role(self):
+        return self.user["role"]
+
+    def to_json(self):
+        return json.dumps({"user": self.user, "skills": self.skills})
+
+    @classmethod
+    def from_json(cls, raw):
+        data = json.loads(raw)
+        return cls(data["user"], data["skills"])
+
+
+class PrincipalCache:
+    def __init__(self, backend=None, ttl=300):
+        self.backend = backend if backend is not None else make_backend(os.environ.get("EDUGLOW_SESSION_STORE_URL", ""))
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id, version):
+        return f"principal:{user_id}:{version}"
+
+    def get(self, user_id, version):
+        raw = self.backend.get(self._key(user_id, version))
+        return Principal.from_json(raw) if raw is not None else None
+
+    def put(self, version, principal):
+        self.backend.set(self._key(principal.id, version), principal.to_json(), self.ttl)
@@ -0,0 +1,156 @@
+"""Per-teacher counters rolled up by day, week and all time.
+
+``teacher_stat`` holds one row per (teacher, period, bucket, metric), where
+period is ``day``, ``week`` (bucket = the Monday) or ``total`` (bucket
+``""``). Metrics are ``bookings``, ``bookings_<status>`` and
+``trials_matched``. Writers bump the rows inside their own transaction, so
+reading a teacher's stats is a primary-key range scan whose cost depends on
+the window asked for, not on the size of ``booking`` or ``trial_request``.
+``rebuild`` recomputes everything from the raw tables and their archives
+(``retention``), so archiving old rows never changes a teacher's counts.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from database import dialect_name
+
+
+PERIODS = ("day", "week", "total")
+BOOKINGS = "bookings"
+TRIALS_MATCHED = "trials_matched"
+
+_UPSERT = (
+    "INSERT INTO teacher_stat (teacher_id, period, bucket, metric, count) "
+    "VALUES (:teacher_id, :period, :bucket, :metric, :count) "
+    "ON CONFLICT (teacher_id, period, bucket, metric) DO UPDATE SET count = teacher_stat.count + excluded.count"
+)
+
+
+def buckets(created_at):
+    day = created_at.date()
+    return {
+        "day": day.isoformat(),
+        "week": (day - timedelta(days=day.weekday())).isoformat(),
+        "total": "",
+    }
+
+
+def _bucket_sql(conn, period, column):
+    if period == "total":
+        return "''"
+    if dialect_name(conn) == "postgresql":
+        if period == "week":
+            return f"to_char(date_trunc('week', {column}), 'YYYY-MM-DD')"
+        return f"to_char({column}, 'YYYY-MM-DD')"
+    if period == "week":
+        # Next Sunday (or today if Sunday), back six days: the Monday of that week.
+        return f"date({column}, 'weekday 0', '-6 days')"
+    return f"date({column})"
+
+
+def record_booking(conn, teacher_id, status, created_at):
+    conn.execute(
+        text(_UPSERT),
+        [
+            {"teacher_id": teacher_id, "period": period, "bucket": bucket, "metric": metric, "count": 1}
+            for period, bucket in buckets(created_at).items()
+            for metric in (BOOKINGS, f"{BOOKINGS}_{status}")
+        ],
+    )
+
+
+def record_trial_matches(conn, trial_id, created_at):
+    """Count a freshly matched trial for every teacher ``matching.match_trial`` linked it to."""
+    for period, bucket in buckets(created_at).items():
+        conn.execute(
+            text(
+                "INSERT INTO teacher_stat (teacher_id, period, bucket, metric, count) "
+                "SELECT teacher_id, :period, :bucket, :metric, 1 FROM trial_match WHERE trial_id = :trial_id "
+                "ON CONFLICT (teacher_id, period, bucket, metric) DO UPDATE SET count = teacher_stat.count + 1"
+            ),
+            {"period": period, "bucket": bucket, "metric": TRIALS_MATCHED, "trial_id": trial_id},
+        )
+
+
+def _with_archive(table, columns, where=""):
+    # The filter goes into both arms so each one can use its own index.
+    return (
+        f"(SELECT {columns} FROM {table} {where} UNION ALL SELECT {columns} FROM {table}_archive {where}) {table}"
+    )
+
+
+def _insert_trial_counts(conn, where="", params=None):
+    matches = _with_archive("trial_match", "teacher_id, created_at", where)
+    for period in PERIODS:
+        bucket = _bucket_sql(conn, period, "created_at")
+        conn.execute(
+            text(
+                "INSERT INTO teacher_stat (teacher_id, period, bucket, metric, count) "
+                f"SELECT teacher_id, '{period}', {bucket}, '{TRIALS_MATCHED}', count(*) FROM {matches} "
+                f"GROUP BY teacher_id, {bucket}"
+            ),
+            params or {},
+        )
+
+
+def refresh_teacher_trials(conn, teacher_id):
+    # Skill and subject changes re-match old trials, so recount this teacher's matches.
+    # Archived matches stay as they were when archived.
+    conn.execute(
+        text("DELETE FROM teacher_stat WHERE teacher_id = :id AND metric = :metric"),
+        {"id": teacher_id, "metric": TRIALS_MATCHED},
+    )
+    _insert_trial_counts(conn, "WHERE teacher_id = :id", {"id": teacher_id})
+
+
+def rebuild(conn):
+    conn.execute(text("DELETE FROM teacher_stat"))
+    bookings = _with_archive("booking", "teacher_id, status, created_at")
+    for period in PERIODS:
+        bucket = _bucket_sql(conn, period, "created_at")
+        conn.execute(
+            text(
+                "INSERT INTO teacher_stat (teacher_id, period, bucket, metric, count) "
+                f"SELECT teacher_id, '{period}', {bucket}, '{BOOKINGS}', count(*) FROM {bookings} "
+                f"GROUP BY teacher_id, {bucket}"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO teacher_stat (teacher_id, period, bucket, metric, count) "
+                f"SELECT teacher_id, '{period}', {bucket}, '{BOOKINGS}_' || status, count(*) FROM {bookings} "
+                f"GROUP BY teacher_id, {bucket}, status"
+            )
+        )
+    _insert_trial_counts(conn)
+
+
+def ensure_stats(conn):
+    empty = conn.execute(text("SELECT 1 FROM teacher_stat LIMIT 1")).first() is None
+    has_data = conn.execute(
+        text("SELECT 1 FROM booking UNION ALL SELECT 1 FROM trial_match LIMIT 1")
+    ).first()
+    if empty and has_data:
+        rebuild(conn)
+
+
+def series(conn, teacher_id, period, since):
+    """Totals plus the ``period`` buckets from ``since`` on, as {bucket: {metric: count}}."""
+    rows = conn.execute(
+        text(
+            "SELECT period, bucket, metric, count FROM teacher_stat "
+            "WHERE teacher_id = :id AND period = :period AND bucket >= :since "
+            "UNION ALL SELECT period, bucket, metric, count FROM teacher_stat "
+            "WHERE teacher_id = :id AND period = 'total'"
+        ),
+        {"id": teacher_id, "period": period, "since": since},
+    ).all()
+    totals, by_bucket = {}, {}
+    for row_period, bucket, metric, count in rows:
+        if row_period == "total":
+            totals[metric] = count
+        else:
+            by_bucket.setdefault(bucket, {})[metric] = count
+    return totals, by_bucket
@@ -0,0 +1,291 @@
+"""Reproducible synthetic data for load testing at production-like volume.
+
+``generate`` bulk-inserts teachers with skills, students, tutors, trial
+requests and bookings in batches, then brings the derived tables (search
+index, match terms, trial matches, teacher stats, catalog version) in line.
+The same seed always yields the same rows.
+
+Trial subjects are drawn from a topic vocabulary (``"algebra 017"``) and
+teachers teach a handful of topics, so matches can be filled with one
+equality join instead of a substring scan per term. Every generated
+teacher and student can log in with ``PASSWORD``.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import geo
+import matching
+import search
+import stats
+from pricing import parse_price
+
+
+PASSWORD = "password123"
+EMAIL_DOMAIN = "synthetic.eduglow.test"
+BATCH_SIZE = 5000
+
+SUBJECTS = [
+    "Mathematics", "Physics", "Chemistry", "Biology", "English", "Hindi",
+    "History", "Geography", "Economics", "Computer Science", "Accountancy", "French",
+]
+# No stem contains a subject name or another stem, so "stem NNN" topics only
+# ever match themselves.
+TOPIC_STEMS = [
+    "algebra", "calculus", "trigonometry", "probability", "statistics", "mechanics",
+    "optics", "thermodynamics", "stoichiometry", "genetics", "ecology", "grammar",
+    "essay writing", "poetry", "phonetics", "world wars", "civics", "cartography",
+    "market theory", "python", "data structures", "bookkeeping", "taxation", "conjugation",
+]
+CITIES = ["Delhi", "Mumbai", "Bengaluru", "Kolkata", "Chennai", "Hyderabad", "Pune", "Jaipur", "Lucknow", "Ahmedabad"]
+LEVELS = ["Class 1-5", "Class 6-10", "Class 9-12", "Class 11-12", "College", "All"]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Neha", "Amit", "Sakshi", "Vikram", "Ananya", "Karan", "Isha", "Arjun", "Meera"]
+LAST_NAMES = ["Sharma", "Verma", "Gupta", "Joshi", "Rao", "Patel", "Iyer", "Singh", "Khan", "Das", "Nair", "Mehta"]
+BOOKING_STATUSES = ["requested", "accepted", "completed", "cancelled"]
+
+
+def topics(count):
+    per_stem = max(1, math.ceil(count / len(TOPIC_STEMS)))
+    return [f"{stem} {n:03d}" for n in range(1, per_stem + 1) for stem in TOPIC_STEMS][:count]
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(engine, sql, rows):
+    inserted = 0
+    for batch in _batches(rows):
+        with engine.begin() as conn:
+            conn.execute(text(sql), batch)
+        inserted += len(batch)
+    return inserted
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _phone(rng):
+    return f"9{rng.randrange(10 ** 9):09d}"
+
+
+def _price(rng):
+    return f"INR {rng.randrange(200, 1500, 50)}/hr"
+
+
+def _location(rng, city):
+    # Scattered up to ~15 km around the city centre, so nearby search has distances to rank.
+    latitude, longitude = geo.centroid(city)
+    latitude = round(latitude + rng.uniform(-0.13, 0.13), 5)
+    longitude = round(longitude + rng.uniform(-0.13, 0.13), 5)
+    return {"latitude": latitude, "longitude": longitude, "geo_cell": geo.cell(latitude, longitude)}
+
+
+def _created_at(rng, now, days):
+    return now - timedelta(seconds=rng.randrange(days * 86400))
+
+
+def _user_ids(engine, role):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT id FROM \"user\" WHERE role = :role AND email LIKE :pattern ORDER BY id"),
+            {"role": role, "pattern": f"%@{EMAIL_DOMAIN}"},
+        ).scalars().all()
+
+
+def generate(
+    engine,
+    password_hash,
+    teachers=100_000,
+    students=100_000,
+    tutors=10_000,
+    trials=1_000_000,
+    bookings=1_000_000,
+    skills_per_teacher=3,
+    topic_count=5000,
+    days=365,
+    seed=42,
+    progress=print,
+):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    vocabulary = topics(topic_count)
+
+    with engine.connect() as conn:
+        if conn.execute(
+            text("SELECT 1 FROM \"user\" WHERE email LIKE :pattern LIMIT 1"), {"pattern": f"%@{EMAIL_DOMAIN}"}
+        ).first():
+            raise RuntimeError("synthetic data already present; generate into an empty database")
+        last_trial_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM trial_request")).scalar()
+        existing_terms = conn.execute(text("SELECT id, term FROM match_term")).all()
+
+    def user_rows(role, count):
+        for i in range(1, count + 1):
+            row = {
+                "email": f"{role}{i:06d}@{EMAIL_DOMAIN}",
+                "password_hash": password_hash,
+                "role": role,
+                "name": _name(rng),
+                "subject": None,
+                "rating": None,
+                "price": None,
+                "price_amount": None,
+                "currency": None,
+                "unit": None,
+                "city": None,
+                "latitude": None,
+                "longitude": None,
+                "geo_cell": None,
+                "image": None,
+                "created_at": _created_at(rng, now, days),
+            }
+            if role == "teacher":
+                price = _price(rng)
+                amount, currency, unit = parse_price(price)
+                row.update(
+                    subject=rng.choice(SUBJECTS),
+                    rating=round(rng.uniform(3.5, 5.0), 1),
+                    price=price,
+                    price_amount=amount,
+                    currency=currency,
+                    unit=unit,
+                    city=rng.choice(CITIES),
+                    image=f"http://static.photos/people/200x200/{rng.randrange(1, 100)}",
+                )
+                row.update(_location(rng, row["city"]))
+            yield row
+
+    user_sql = (
+        "INSERT INTO \"user\" (email, password_hash, role, name, subject, rating, price, price_amount, "
+        "currency, unit, city, latitude, longitude, geo_cell, image, profile_version, created_at) VALUES (:email, "
+        ":password_hash, :role, :name, :subject, :rating, :price, :price_amount, :currency, :unit, :city, :latitude, "
+        ":longitude, :geo_cell, :image, 0, :created_at)"
+    )
+    progress(f"teachers: {_insert(engine, user_sql, user_rows('teacher', teachers))}")
+    progress(f"students: {_insert(engine, user_sql, user_rows('student', students))}")
+    teacher_ids = _user_ids(engine, "teacher")
+    student_ids = _user_ids(engine, "student")
+
+    skill_rows = (
+        {"teacher_id": teacher_id, "name": name}
+        for teacher_id in teacher_ids
+        for name in rng.sample(vocabulary, min(skills_per_teacher, len(vocabulary)))
+    )
+    progress(f"skills: {_insert(engine, 'INSERT INTO teacher_skill (teacher_id, name) VALUES (:teacher_id, :name)', skill_rows)}")
+
+    def tutor_rows():
+        for _ in range(tutors):
+            price = _price(rng)
+            amount, currency, unit = parse_price(price)
+            city = rng.choice(CITIES)
+            yield {
+                "name": _name(rng),
+                "subject": rng.choice(SUBJECTS),
+                "level": rng.choice(LEVELS),
+                "rating": round(rng.uniform(3.5, 5.0), 1),
+                "price": price,
+                "price_amount": amount,
+                "currency": currency,
+                "unit": unit,
+                "city": city,
+                "image": f"http://static.photos/people/200x200/{rng.randrange(1, 100)}",
+                **_location(rng, city),
+            }
+
+    tutor_sql = (
+        "INSERT INTO tutor (name, subject, level, rating, price, price_amount, currency, unit, city, latitude, "
+        "longitude, geo_cell, image) VALUES (:name, :subject, :level, :rating, :price, :price_amount, :currency, "
+        ":unit, :city, :latitude, :longitude, :geo_cell, :image)"
+    )
+    progress(f"tutors: {_insert(engine, tutor_sql, tutor_rows())}")
+
+    def trial_rows():
+        for _ in range(trials):
+            yield {
+                "name": _name(rng),
+                "phone": _phone(rng),
+                "subject": rng.choice(vocabulary),
+                "user_id": rng.choice(student_ids) if student_ids and rng.random() < 0.8 else None,
+                "created_at": _created_at(rng, now, days),
+            }
+
+    trial_sql = (
+        "INSERT INTO trial_request (name, phone, subject, user_id, created_at) "
+        "VALUES (:name, :phone, :subject, :user_id, :created_at)"
+    )
+    progress(f"trial requests: {_insert(engine, trial_sql, trial_rows())}")
+
+    def booking_rows():
+        for _ in range(bookings if teacher_ids and student_ids else 0):
+            yield {
+                "student_id": rng.choice(student_ids),
+                "teacher_id": rng.choice(teacher_ids),
+                "subject": rng.choice(SUBJECTS),
+                "price": _price(rng),
+                "phone": _phone(rng),
+                "status": rng.choice(BOOKING_STATUSES),
+                "created_at": _created_at(rng, now, days),
+            }
+
+    booking_sql = (
+        "INSERT INTO booking (student_id, teacher_id, subject, price, phone, status, created_at) "
+        "VALUES (:student_id, :teacher_id, :subject, :price, :phone, :status, :created_at)"
+    )
+    progress(f"bookings: {_insert(engine, booking_sql, booking_rows())}")
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO match_term (term) VALUES (:term) ON CONFLICT (term) DO NOTHING"),
+            [{"term": term} for term in sorted({*(s.lower() for s in SUBJECTS), *vocabulary})],
+        )
+        for source in [
+            "SELECT id AS teacher_id, lower(subject) AS term FROM \"user\" WHERE role = 'teacher' AND email LIKE :pattern",
+            "SELECT s.teacher_id, lower(s.name) AS term FROM teacher_skill s JOIN \"user\" u ON u.id = s.teacher_id "
+            "WHERE u.email LIKE :pattern",
+        ]:
+            conn.execute(
+                text(
+                    "INSERT INTO teacher_term (teacher_id, term_id) "
+                    f"SELECT src.teacher_id, t.id FROM ({source}) src JOIN match_term t ON t.term = src.term "
+                    "ON CONFLICT DO NOTHING"
+                ),
+                {"pattern": f"%@{EMAIL_DOMAIN}"},
+            )
+    with engine.begin() as conn:
+        # Generated trials x generated terms: topics only ever match themselves.
+        conn.execute(
+            text(
+                "INSERT INTO trial_match (teacher_id, trial_id, created_at) "
+                "SELECT tt.teacher_id, r.id, r.created_at FROM trial_request r "
+                "JOIN match_term t ON t.term = lower(r.subject) JOIN teacher_term tt ON tt.term_id = t.id "
+                "WHERE r.id > :last_trial_id ON CONFLICT DO NOTHING"
+            ),
+            {"last_trial_id": last_trial_id},
+        )
+        # Terms that existed before (e.g. the demo teacher's) still match by substring.
+        for term_id, term in existing_terms:
+            matching._backfill_term(conn, term_id, term)
+        for trial_id in conn.execute(
+            text("SELECT id FROM trial_request WHERE id <= :id"), {"id": last_trial_id}
+        ).scalars().all():
+            matching.match_trial(conn, trial_id)
+        progress(f"trial matches: {conn.execute(text('SELECT count(*) FROM trial_match')).scalar()}")
+
+    with engine.begin() as conn:
+        stats.rebuild(conn)
+        search.rebuild(conn)
+        conn.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1"))
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    progress("teacher stats, search index, catalog version and planner statistics updated")
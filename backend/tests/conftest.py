@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# app.py reads these at import and load_dotenv never overrides a set variable,
+# so a developer's backend/.env cannot point the suite at a real SMTP server.
+os.environ.update(
+    {
+        "EDUGLOW_SMTP_HOST": "",
+        "EDUGLOW_SMTP_USER": "",
+        "EDUGLOW_SMTP_PASS": "",
+        "EDUGLOW_MAIL_DISPATCHER": "external",
+        "EDUGLOW_JANITOR": "external",
+        "EDUGLOW_RATE_LIMITS": "off",
+        "EDUGLOW_HASH_EXECUTOR": "inline",
+        "EDUGLOW_PASSWORD_METHOD": "pbkdf2:sha256:1000",
+    }
+)
+
+import app as web  # noqa: E402
+import cache  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Every test has its own database, so nothing cached for another one may leak in.
+    monkeypatch.setattr(web.catalog_cache, "backend", cache.MemoryBackend())
+    monkeypatch.setattr(web.principal_cache, "backend", cache.MemoryBackend())
+    web.catalog_cache.invalidate()
+    flask_app = web.create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'eduglow.db'}", "TESTING": True})
+    with flask_app.app_context():
+        web.migrate_schema()
+        web.seed_data()
+        yield flask_app
+        web.db.session.remove()
+        for engine in web.db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
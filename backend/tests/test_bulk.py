@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+import app as web
+import bulk
+import search
+
+
+def roster(count):
+    records = [
+        {
+            "name": f"Tutor {i}",
+            "subject": "Physics",
+            "level": "Class 11-12",
+            "rating": 4.5,
+            "price": "INR 500/hr",
+            "city": "Pune",
+            "image": "http://static.photos/people/200x200/1",
+        }
+        for i in range(count)
+    ]
+    return io.BytesIO("\n".join(json.dumps(record) for record in records).encode())
+
+
+def tutor_count():
+    return web.db.session.execute(select(func.count()).select_from(web.Tutor)).scalar()
+
+
+def test_failed_batch_keeps_version_of_committed_ones(app, monkeypatch):
+    version, tutors = web.load_catalog_version(), tutor_count()
+    index = search.index_tutors_after
+    calls = []
+
+    def fail_second_batch(conn, last_id):
+        calls.append(last_id)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        index(conn, last_id)
+
+    monkeypatch.setattr(search, "index_tutors_after", fail_second_batch)
+    with pytest.raises(RuntimeError):
+        bulk.import_tutors(web.db.engine, roster(3), batch_size=2)
+
+    web.db.session.rollback()
+    assert tutor_count() == tutors + 2
+    assert web.load_catalog_version() == version + 1
+
+
+def test_admin_import_reports_and_skips_bad_lines(app, client, monkeypatch):
+    monkeypatch.setenv("EDUGLOW_ADMIN_TOKEN", "secret")
+    body = roster(2).getvalue() + b"\nnot json\n" + json.dumps({"name": "No subject"}).encode()
+    response = client.post(
+        "/api/admin/import/tutors?format=ndjson", data=body, headers={"Authorization": "Bearer secret"}
+    )
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result["inserted"], result["skipped"]) == (2, 2)
+    assert [error["line"] for error in result["errors"]] == [3, 4]
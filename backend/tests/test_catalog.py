@@ -0,0 +1,36 @@
+import app as web
+
+
+def test_catalog_cache_invalidated_only_after_commit(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(web.catalog_cache, "invalidate", lambda: calls.append("invalidated"))
+
+    web.bump_catalog_version()
+    assert calls == []
+    web.db.session.commit()
+    assert calls == ["invalidated"]
+
+    web.bump_catalog_version()
+    web.db.session.rollback()
+    web.db.session.commit()
+    assert calls == ["invalidated"]
+
+
+def test_subject_filter_matches_teacher_skills_and_pages(app, client):
+    # The seeded teacher teaches Mathematics and lists Algebra as a skill.
+    names = [tutor["name"] for tutor in client.get("/api/tutors?subject=algebra").get_json()["tutors"]]
+    assert names == ["John Doe"]
+
+    # "Math" covers both "Maths" and "Mathematics"; two per page still reaches every one.
+    first = client.get("/api/tutors?subject=Math&limit=100").get_json()
+    expected = [tutor["id"] for tutor in first["tutors"]]
+    assert {tutor["subject"] for tutor in first["tutors"]} == {"Maths", "Mathematics"}
+    seen, cursor = [], None
+    while True:
+        query = "/api/tutors?subject=Math&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(query).get_json()
+        seen += [tutor["id"] for tutor in page["tutors"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected
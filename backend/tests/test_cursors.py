@@ -0,0 +1,100 @@
+import pytest
+
+import app as web
+import search
+
+
+def add_tutors(*rows):
+    for name, rating, price in rows:
+        tutor = web.Tutor(
+            name=name,
+            subject="Geography",
+            level="Class 9-10",
+            rating=rating,
+            city="Pune",
+            image="http://static.photos/people/200x200/2",
+        )
+        tutor.set_price(price)
+        tutor.set_location()
+        web.db.session.add(tutor)
+        web.db.session.flush()
+        search.index_tutor(web.db.session, tutor.id)
+    web.bump_catalog_version()
+    web.db.session.commit()
+
+
+def walk(client, query, limit):
+    seen, cursor = [], None
+    while True:
+        page = client.get(f"/api/tutors?{query}&limit={limit}" + (f"&cursor={cursor}" if cursor else ""))
+        assert page.status_code == 200
+        body = page.get_json()
+        assert len(body["tutors"]) <= limit
+        seen += body["tutors"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def order_key(sort, tutor):
+    # Ties go tutors first, then teachers, each by id.
+    kind, row_id = (1, int(tutor["id"].split("-")[1])) if isinstance(tutor["id"], str) else (0, tutor["id"])
+    if sort == "rating":
+        key = -tutor["rating"]
+    elif sort == "price":
+        key = web.UNPRICED_SORT_AMOUNT if tutor["price_amount"] is None else tutor["price_amount"]
+    else:
+        key = tutor["name"]
+    return key, kind, row_id
+
+
+@pytest.mark.parametrize("sort", sorted(web.TUTOR_SORTS))
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_keyset_pages_visit_every_entry_once_in_order(app, client, sort, limit):
+    # Equal ratings, prices and names across rows, plus prices that do not parse.
+    add_tutors(
+        ("Asha Rao", 4.5, "INR 500/hr"),
+        ("Asha Rao", 4.5, "INR 500/hr"),
+        ("Bela Sen", 4.5, "Negotiable"),
+        ("Chitra Iyer", 4.0, "Negotiable"),
+        ("Dev Kumar", 4.0, "INR 300/hr"),
+    )
+    full = client.get(f"/api/tutors?subject=Geo&sort={sort}&limit=100").get_json()
+    assert full["next_cursor"] is None
+    assert len(full["tutors"]) == 5
+    assert full["tutors"] == sorted(full["tutors"], key=lambda tutor: order_key(sort, tutor))
+
+    paged = walk(client, f"subject=Geo&sort={sort}", limit)
+    assert [tutor["id"] for tutor in paged] == [tutor["id"] for tutor in full["tutors"]]
+
+
+def test_keyset_pages_span_tutors_and_teachers(app, client):
+    everything = client.get("/api/tutors?limit=100").get_json()["tutors"]
+    assert any(isinstance(tutor["id"], str) for tutor in everything)
+    assert [tutor["id"] for tutor in walk(client, "sort=rating", 2)] == [tutor["id"] for tutor in everything]
+
+
+@pytest.mark.parametrize(
+    "sort, values",
+    [
+        ("rating", "not-json"),
+        ("rating", ["Asha", 0, 1]),
+        ("name", [4.5, 0, 1]),
+        ("rating", [True, 0, 1]),
+        ("rating", [4.5, 0]),
+        ("rating", [4.5, 2, 1]),
+        ("rating", [4.5, 0, "1"]),
+    ],
+)
+def test_bad_cursor_is_rejected(app, client, sort, values):
+    token = "%%%" if values == "not-json" else web.encode_cursor(values)
+    response = client.get(f"/api/tutors?sort={sort}&cursor={token}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "invalid cursor"}
+
+
+def test_cursor_from_a_page_round_trips(app, client):
+    first = client.get("/api/tutors?sort=name&limit=1").get_json()
+    values = web.decode_cursor(first["next_cursor"], 3, str)
+    assert values[0] == first["tutors"][0]["name"]
+    assert values[1] in {web.CATALOG_TUTOR, web.CATALOG_TEACHER}
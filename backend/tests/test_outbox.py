@@ -0,0 +1,131 @@
+import socket
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select
+
+import app as web
+import mailer
+
+
+class Recorder:
+    """aiosmtpd handler that keeps every message and refuses ``reject_prefix`` recipients."""
+
+    def __init__(self, reject_prefix="bounce"):
+        self.messages = []
+        self.reject_prefix = reject_prefix
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith(self.reject_prefix):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 Message accepted"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = Recorder()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def make_dispatcher(port, **kwargs):
+    settings = mailer.SMTPSettings("127.0.0.1", port, None, None, "noreply@eduglow.test", use_tls=False, timeout=2)
+    return mailer.Dispatcher(web.db.engine, web.OutboxEmail.__table__, mailer.SMTPPool(settings), **kwargs)
+
+
+def enqueue(*recipients):
+    mailer.enqueue_many(
+        web.db.session,
+        web.OutboxEmail.__table__,
+        [{"to_email": to, "subject": "Hello", "text_body": "Body"} for to in recipients],
+    )
+    web.db.session.commit()
+
+
+def outbox():
+    web.db.session.expire_all()
+    return {row.to_email: row for row in web.db.session.execute(select(web.OutboxEmail)).scalars()}
+
+
+def test_sends_pending_rows(app, smtp):
+    controller, handler = smtp
+    enqueue("a@example.com", "b@example.com")
+    dispatcher = make_dispatcher(controller.port)
+
+    assert dispatcher.run_once() == 2
+    dispatcher.pool.close()
+
+    assert sorted(to for tos, _ in handler.messages for to in tos) == ["a@example.com", "b@example.com"]
+    assert {row.status for row in outbox().values()} == {mailer.STATUS_SENT}
+    assert dispatcher.run_once() == 0
+
+
+def test_refused_recipient_backs_off_then_fails(app, smtp):
+    controller, handler = smtp
+    enqueue("ok@example.com", "bounce@example.com")
+    dispatcher = make_dispatcher(controller.port, max_attempts=2, backoff=30)
+
+    before = datetime.utcnow()
+    dispatcher.run_once()
+    rows = outbox()
+    assert rows["ok@example.com"].status == mailer.STATUS_SENT
+    bounced = rows["bounce@example.com"]
+    assert (bounced.status, bounced.attempts) == (mailer.STATUS_PENDING, 1)
+    assert "550" in bounced.last_error
+    # 30 s backoff with +-20% jitter.
+    assert before + timedelta(seconds=23) <= bounced.next_attempt_at <= datetime.utcnow() + timedelta(seconds=37)
+    assert dispatcher.run_once() == 0
+
+    bounced.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    web.db.session.commit()
+    dispatcher.run_once()
+    dispatcher.pool.close()
+    bounced = outbox()["bounce@example.com"]
+    assert (bounced.status, bounced.attempts) == (mailer.STATUS_FAILED, 2)
+    assert len(handler.messages) == 1
+
+
+def test_unreachable_server_keeps_rows_pending(app):
+    enqueue("a@example.com")
+    dispatcher = make_dispatcher(free_port())
+
+    dispatcher.run_once()
+
+    row = outbox()["a@example.com"]
+    assert (row.status, row.attempts, row.claim) == (mailer.STATUS_PENDING, 1, None)
+    assert row.next_attempt_at > datetime.utcnow()
+
+
+def test_first_request_starts_dispatcher_for_leftover_rows(app, client, smtp, monkeypatch):
+    controller, handler = smtp
+    enqueue("left@example.com")
+    dispatcher = make_dispatcher(controller.port, poll_interval=0.05)
+    monkeypatch.setitem(app.extensions, "email_dispatcher", dispatcher)
+    monkeypatch.setattr(web, "EMAIL_DISPATCH_MODE", "thread")
+    monkeypatch.setattr(web.smtp_settings, "host", "127.0.0.1")
+    monkeypatch.setattr(web.smtp_settings, "from_email", "noreply@eduglow.test")
+
+    try:
+        assert client.get("/api/health").status_code == 200
+        deadline = time.monotonic() + 5
+        while not handler.messages and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        dispatcher.stop()
+
+    assert handler.messages and handler.messages[0][0] == ["left@example.com"]
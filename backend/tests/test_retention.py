@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+import app as web
+import mailer
+import retention
+
+
+def days_ago(days):
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def count(model):
+    return web.db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def teacher_id():
+    return web.db.session.execute(select(web.User.id).where(web.User.email == "teacher@example.com")).scalar_one()
+
+
+def run_janitor(**kwargs):
+    web.db.session.commit()
+    janitor = retention.Janitor(web.db.engine, batch_size=2, pause=0, **kwargs)
+    counts = janitor.run_once()
+    web.db.session.expire_all()
+    return counts
+
+
+def test_purges_in_batches_and_keeps_the_newest_event(app):
+    teacher = teacher_id()
+    web.db.session.execute(web.TeacherEvent.__table__.delete())
+    # Five events past the 7 day retention; the newest of them has to stay for Last-Event-ID.
+    for age in (30, 20, 15, 10, 8):
+        web.db.session.add(web.TeacherEvent(teacher_id=teacher, kind="trial", payload="{}", created_at=days_ago(age)))
+    web.db.session.add_all(
+        [
+            web.AuthSession(id="expired", user_id=teacher, expires_at=days_ago(1)),
+            web.AuthSession(id="live", user_id=teacher, expires_at=days_ago(-1)),
+        ]
+    )
+    mailer.enqueue_many(
+        web.db.session,
+        web.OutboxEmail.__table__,
+        [{"to_email": to, "subject": "Hi", "text_body": "Body"} for to in ("sent@x.test", "pending@x.test")],
+    )
+    web.db.session.flush()
+    web.db.session.execute(web.OutboxEmail.__table__.update().values(created_at=days_ago(60)))
+    web.db.session.execute(
+        web.OutboxEmail.__table__.update()
+        .where(web.OutboxEmail.to_email == "sent@x.test")
+        .values(status=mailer.STATUS_SENT)
+    )
+
+    counts = run_janitor()
+
+    assert counts["purged teacher_event"] == 4
+    events = web.db.session.execute(select(web.TeacherEvent)).scalars().all()
+    assert len(events) == 1 and events[0].created_at < days_ago(7)
+    assert web.db.session.get(web.AuthSession, "expired") is None
+    assert web.db.session.get(web.AuthSession, "live") is not None
+    # Pending mail is never purged, however old.
+    emails = web.db.session.execute(select(web.OutboxEmail.to_email)).scalars().all()
+    assert emails == ["pending@x.test"]
+
+    assert run_janitor()["purged teacher_event"] == 0
+
+
+def test_archives_old_trials_with_their_matches(app):
+    teacher = teacher_id()
+    for age in (800, 700, 600, 500, 10):
+        trial = web.TrialRequest(name=f"Student {age}", phone="9999999999", subject="Maths", created_at=days_ago(age))
+        web.db.session.add(trial)
+        web.db.session.flush()
+        web.db.session.add(web.TrialMatch(teacher_id=teacher, trial_id=trial.id, created_at=trial.created_at))
+    hot_before = count(web.TrialRequest)
+
+    counts = run_janitor()
+
+    # 4 old trials in batches of 2; the recent one stays.
+    assert counts["archived trial_request"] == 4
+    assert count(web.TrialRequest) == hot_before - 4
+    assert count(web.TrialRequestArchive) == 4
+    assert count(web.TrialMatchArchive) == 4
+    archived = web.db.session.execute(select(web.TrialRequestArchive.name)).scalars().all()
+    assert sorted(archived) == ["Student 500", "Student 600", "Student 700", "Student 800"]
+    remaining = web.db.session.execute(select(web.TrialMatch.trial_id)).scalars().all()
+    assert all(web.db.session.get(web.TrialRequest, trial_id) for trial_id in remaining)
+
+    # A second pass finds nothing left to move, and nothing is copied twice.
+    assert run_janitor()["archived trial_request"] == 0
+    assert count(web.TrialRequestArchive) == 4
+
+
+def test_zero_days_keeps_rows_forever(app):
+    teacher = teacher_id()
+    for age in (30, 20):
+        web.db.session.add(web.TeacherEvent(teacher_id=teacher, kind="trial", payload="{}", created_at=days_ago(age)))
+    events = count(web.TeacherEvent)
+
+    counts = run_janitor(retention_days={"events": 0, "archive": 0})
+
+    assert "purged teacher_event" not in counts and "archived trial_request" not in counts
+    assert count(web.TeacherEvent) == events
@@ -0,0 +1,56 @@
+import app as web
+import search
+
+
+def names(client, query):
+    response = client.get(f"/api/tutors/search?q={query}")
+    assert response.status_code == 200
+    return [tutor["name"] for tutor in response.get_json()["tutors"]]
+
+
+def test_last_word_matches_as_a_prefix(app, client):
+    assert names(client, "vik") == ["Vikram Patel"]
+    assert names(client, "rohan phy") == ["Rohan Verma"]
+    # Only the last word is a prefix.
+    assert names(client, "phy verma") == []
+
+
+def test_teacher_skills_are_searchable(app, client):
+    assert names(client, "calc") == ["John Doe"]
+
+
+def test_name_matches_rank_above_subject_matches(app, client):
+    tutor = web.Tutor(
+        name="Physics Wala",
+        subject="Chemistry",
+        level="Class 11-12",
+        rating=4.0,
+        city="Pune",
+        image="http://static.photos/people/200x200/7",
+    )
+    tutor.set_price("INR 400/hr")
+    tutor.set_location()
+    web.db.session.add(tutor)
+    web.db.session.flush()
+    search.index_tutor(web.db.session, tutor.id)
+    web.bump_catalog_version()
+    web.db.session.commit()
+
+    assert names(client, "physics") == ["Physics Wala", "Rohan Verma"]
+
+
+def test_profile_update_reindexes_the_teacher(app, client):
+    login = client.post("/api/auth/login", json={"email": "teacher@example.com", "password": "password123"})
+    assert login.status_code == 200
+    response = client.put("/api/teacher/profile", json={"name": "Meera Nair"})
+    assert response.status_code == 200
+
+    assert names(client, "meera") == ["Meera Nair"]
+    assert "John Doe" not in names(client, "john")
+
+
+def test_query_is_required(app, client):
+    assert client.get("/api/tutors/search?q=%20").status_code == 400
+    assert client.get("/api/tutors/search?q=math&limit=x").status_code == 400
+    # Punctuation alone has no words to match.
+    assert names(client, "%22*") == []